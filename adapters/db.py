@@ -4,11 +4,13 @@ from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
+from config import settings
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite+aiosqlite:///./ci.db"
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(DATABASE_URL, echo=settings.DB_ECHO)
 
 async_session_factory = async_sessionmaker(
     bind=engine,
@@ -24,3 +26,31 @@ class Base(DeclarativeBase):
 async def get_db_session() -> AsyncSession:
     async with async_session_factory() as session:
         yield session
+
+
+class RequestSession:
+    """
+    Unit-of-work на один HTTP-запрос: сессия создаётся при первом обращении
+    (соединение из пула берётся ещё позже — на первом запросе к БД)
+    и закрывается ровно один раз, когда ответ полностью отправлен.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self) -> None:
+        self._session: AsyncSession | None = None
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = async_session_factory()
+        return self._session
+
+    async def close(self) -> None:
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from adapters.metrics import password_hash_duration
+from adapters.security import hash_password, verify_password
+from adapters.timing import span
+from config import settings
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Очередь пула хеширования переполнена — запрос нужно отклонить (503)."""
+
+
+class PasswordHasherPool:
+    """
+    Ограниченный пул для bcrypt: хеширование уходит с event loop в потоки
+    (bcrypt отпускает GIL), а число ожидающих задач ограничено queue_size.
+    Счётчики меняются только из event loop, поэтому блокировки не нужны.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0  # принято в пул, но ещё не завершено
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="pwd-hash"
+            )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        # задачи сверх числа воркеров ждут свободный поток
+        return max(self._pending - self.workers, 0)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise PasswordHasherBusy("password hashing queue is full")
+
+        loop = asyncio.get_running_loop()
+        op = getattr(fn, "__name__", "other")
+        enqueued = time.perf_counter()
+        started: list[float] = []
+
+        def _job() -> Any:
+            started.append(time.perf_counter())
+            return fn(*args)
+
+        def _done(_: Future) -> None:
+            # в потоке пула (или в отменившем задачу) — счётчики правим в loop;
+            # отмена ожидающей корутины не освобождает слот, пока bcrypt идёт
+            finished = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(self._finish, op, enqueued, started, finished)
+            except RuntimeError:
+                pass  # loop уже закрыт
+
+        future = self._get_executor().submit(_job)
+        self._pending += 1
+        self.submitted += 1
+        future.add_done_callback(_done)  # раньше wrap_future: слот свободен до возврата
+        with span("bcrypt"):  # вместе с ожиданием свободного потока
+            return await asyncio.wrap_future(future, loop=loop)
+
+    def _finish(
+        self, op: str, enqueued: float, started: list[float], finished: float
+    ) -> None:
+        self._pending -= 1
+        if started:
+            wait = started[0] - enqueued
+            self.wait_time_total += wait
+            self.wait_time_max = max(self.wait_time_max, wait)
+            self.run_time_total += finished - started[0]
+            password_hash_duration.labels(op).observe(finished - started[0])
+            self.completed += 1
+
+    def stats(self) -> dict[str, Any]:
+        done = self.completed or 1
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self._pending,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(self.wait_time_total / done * 1000, 3),
+            "wait_ms_max": round(self.wait_time_max * 1000, 3),
+            "run_ms_avg": round(self.run_time_total / done * 1000, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hasher_pool = PasswordHasherPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hasher_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hasher_pool.run(verify_password, plain_password, hashed_password)
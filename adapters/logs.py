@@ -0,0 +1,177 @@
+"""
+Логирование без блокировки event loop.
+
+В потоке запроса запись только подставляет аргументы в сообщение и кладёт
+LogRecord в ограниченную очередь; форматирование (JSON или key=value) и
+запись в stdout делает фоновый поток QueueListener. При переполнении
+очереди записи отбрасываются и считаются — запрос не ждёт stdout.
+
+Поля записи — всё, что передано через extra=..., плюс cid и user_id
+текущего запроса (RequestContextFilter).
+"""
+
+import copy
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional, TextIO
+
+import orjson
+
+# атрибуты самого LogRecord — всё остальное пришло через extra
+_RECORD_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+    | {"message", "asctime", "taskName"}
+)
+
+# state текущего HTTP-запроса (scope["state"]): correlation_id, user
+_request_state: ContextVar[Optional[dict]] = ContextVar(
+    "log_request_state", default=None
+)
+
+
+def bind_request_state(state: dict):
+    """Привязать state запроса к логам; вернуть токен для reset_request_state."""
+    return _request_state.set(state)
+
+
+def reset_request_state(token) -> None:
+    _request_state.reset(token)
+
+
+def record_fields(record: logging.LogRecord) -> dict[str, Any]:
+    return {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS}
+
+
+class RequestContextFilter(logging.Filter):
+    """cid и user_id запроса в каждую запись (если не заданы явно)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        state = _request_state.get()
+        if state is not None:
+            if not hasattr(record, "cid"):
+                record.cid = state.get("correlation_id")
+            if not hasattr(record, "user_id"):
+                user = state.get("user")
+                record.user_id = user.get("id") if isinstance(user, dict) else None
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return orjson.dumps(payload, default=str).decode()
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Человекочитаемый вариант для локальной разработки: поля как key=value."""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = record_fields(record)
+        if fields:
+            line += "".join(f" {k}={v}" for k, v in fields.items())
+        return line
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # в потоке запроса — только то, что нельзя отложить: подстановка args
+        # (объекты могут измениться) и текст traceback'а (кадры уйдут)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AsyncLogging:
+    """Очередь + фоновый поток вывода; один экземпляр на процесс."""
+
+    def __init__(self) -> None:
+        self.handler: Optional[_DroppingQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self._target: Optional[logging.Logger] = None
+
+    @property
+    def running(self) -> bool:
+        return self.listener is not None
+
+    def configure(
+        self,
+        *,
+        level: str = "INFO",
+        fmt: str = "json",
+        queue_size: int = 10_000,
+        stream: Optional[TextIO] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        target = logger or logging.getLogger()
+        if self.running:
+            return
+        # root уже настроен снаружи (pytest, --log-config uvicorn) — не трогаем
+        if logger is None and target.handlers:
+            return
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter() if fmt == "json" else KeyValueFormatter())
+        self.handler = _DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = QueueListener(self.handler.queue, output)
+
+        target.addHandler(self.handler)
+        self._target = target
+        target.setLevel(getattr(logging, level.upper(), logging.INFO))
+        self.listener.start()
+
+    def shutdown(self) -> None:
+        """Дописать очередь и остановить поток (lifespan shutdown)."""
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        if self._target is not None and self.handler is not None:
+            self._target.removeHandler(self.handler)
+            self._target = None
+
+    def stats(self) -> dict[str, Any]:
+        if self.handler is None:
+            return {"running": False}
+        return {
+            "running": self.running,
+            "queued": self.handler.queue.qsize(),
+            "queue_size": self.handler.queue.maxsize,
+            "dropped": self.handler.dropped,
+        }
+
+
+async_logging = AsyncLogging()
@@ -0,0 +1,354 @@
+"""
+Метрики процесса в текстовом формате Prometheus (exposition 0.0.4).
+
+Без внешних зависимостей и без блокировок: все наблюдения делаются из
+потока event loop (middleware, события SQLAlchemy внутри greenlet, итог задачи
+пула bcrypt), поэтому счётчики — обычные int/float. Гистограммы заранее
+разложены по корзинам: observe — bisect и два сложения.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from adapters import query_recorder
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# секунды: от 1 мс до 10 с — HTTP-запросы и bcrypt
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# отдельные SQL-запросы и ожидание соединения — на порядок короче
+DB_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self.labels()  # без меток — одна серия, видна сразу с нулём
+
+    def labels(self, *values: Any):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        head = (
+            f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        )
+        return head + "".join(line + "\n" for line in self.samples())
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterable[str]:
+        for key, child in self._children.items():
+            yield f"{self.name}_total{_labels(self.labelnames, key)} {_num(child.value)}"
+
+
+class Gauge(_Metric):
+    """Значение по меткам; с callback — считывается в момент выдачи /metrics."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ):
+        self.callback = callback
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def samples(self) -> Iterable[str]:
+        if self.callback is not None:
+            value = self.callback()
+            if value is not None:
+                yield f"{self.name} {_num(value)}"
+            return
+        for key, child in self._children.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(child.value)}"
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # последняя корзина — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterable[str]:
+        bounds = (*self.buckets, float("inf"))
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                le = _labels(self.labelnames, key, f'le="{_num(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_num(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames=(), callback=None
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "".join(m.render() for m in self._metrics.values())
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."
+)
+db_statement_duration = registry.histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time by operation.",
+    ("operation",),
+    buckets=DB_BUCKETS,
+)
+db_pool_checkouts = registry.counter(
+    "db_pool_checkouts", "Connections checked out from the pool."
+)
+db_pool_connect = registry.histogram(
+    "db_pool_connect_seconds",
+    "Time to open a new database connection for the pool.",
+    buckets=DB_BUCKETS,
+)
+db_pool_hold = registry.histogram(
+    "db_pool_hold_seconds",
+    "Time a connection stays checked out of the pool.",
+)
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "bcrypt time in the hashing pool by operation.",
+    ("op",),
+)
+
+_OPERATIONS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"))
+
+
+def statement_operation(statement: str) -> str:
+    # метка без параметров и идентификаторов: первое ключевое слово
+    head = statement.lstrip()[:8].split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb.lower() if verb in _OPERATIONS else "other"
+
+
+def _observe_statement(statement: str, elapsed: float) -> None:
+    db_statement_duration.labels(statement_operation(statement)).observe(elapsed)
+
+
+def instrument_statements() -> None:
+    """Длительность SQL всех движков процесса (включая тестовые)."""
+    # замер общий с учётом SQL на запрос — один хук на statement
+    query_recorder.add_statement_listener(_observe_statement)
+
+
+def _on_do_connect(dialect, connection_record, cargs, cparams) -> None:
+    connection_record.info["metrics_connect_started"] = time.perf_counter()
+
+
+def _on_connect(dbapi_connection, connection_record) -> None:
+    started = connection_record.info.pop("metrics_connect_started", None)
+    if started is not None:
+        db_pool_connect.observe(time.perf_counter() - started)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    db_pool_checkouts.inc()
+    connection_record.info["metrics_checked_out"] = time.perf_counter()
+
+
+def _on_checkin(dbapi_connection, connection_record) -> None:
+    started = connection_record.info.pop("metrics_checked_out", None)
+    if started is not None:
+        db_pool_hold.observe(time.perf_counter() - started)
+
+
+def _pool_value(engine: AsyncEngine, attr: str) -> Optional[float]:
+    # size/checkedout/overflow есть только у QueuePool; StaticPool и т.п. — пропуск
+    method = getattr(engine.sync_engine.pool, attr, None)
+    return method() if callable(method) else None
+
+
+def instrument_pool(engine: AsyncEngine) -> None:
+    """
+    Счётчики и gauge пула engine через события SQLAlchemy. Ожидание в очереди
+    пула событиями не видно (события до checkout нет): исчерпание пула видно
+    по db_pool_checked_out против db_pool_size и по db_pool_hold_seconds.
+    """
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine.pool, "checkout", _on_checkout):
+        return
+    # do_connect — событие диалекта, слушается на engine; остальные — на пуле
+    # (recreate() при dispose переносит их на новый пул)
+    event.listen(sync_engine, "do_connect", _on_do_connect)
+    event.listen(sync_engine.pool, "connect", _on_connect)
+    event.listen(sync_engine.pool, "checkout", _on_checkout)
+    event.listen(sync_engine.pool, "checkin", _on_checkin)
+
+    for name, attr, doc in (
+        ("db_pool_size", "size", "Configured pool size."),
+        ("db_pool_checked_out", "checkedout", "Connections currently checked out."),
+        (
+            "db_pool_overflow",
+            "overflow",
+            "Connections above pool size (negative: idle slots).",
+        ),
+    ):
+        registry.gauge(name, doc, callback=lambda attr=attr: _pool_value(engine, attr))
@@ -3,6 +3,7 @@
 from datetime import datetime, timezone
 
 from sqlalchemy import (
+    DDL,
     Boolean,
     Column,
     DateTime,
@@ -11,6 +12,7 @@ from sqlalchemy import (
     Index,
     Integer,
     String,
+    event,
 )
 from sqlalchemy.orm import relationship
 
@@ -27,9 +29,30 @@ class Entry(Base):
     link = Column(String, nullable=True)
     status = Column(Enum(EntryStatus), nullable=False, default=EntryStatus.planned)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # версия строки для ETag/If-Match: ORM сам делает UPDATE/DELETE ... AND version=?
+    version = Column(Integer, nullable=False, server_default="1")
 
     owner = relationship("User", back_populates="entries")
 
+    # списки: WHERE owner_id=? [AND status=?] ORDER BY id DESC (+ админский по status)
+    __table_args__ = (
+        Index("ix_entries_owner_id_id", "owner_id", id.desc()),
+        Index("ix_entries_owner_status_id", "owner_id", "status", id.desc()),
+        Index("ix_entries_status_id", "status", id.desc()),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+class EntryListVersion(Base):
+    """Счётчик изменений записей владельца: ETag списков без чтения строк."""
+
+    __tablename__ = "entry_list_versions"
+
+    owner_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    version = Column(Integer, nullable=False, server_default="0")
+
 
 class User(Base):
     __tablename__ = "users"
@@ -39,9 +62,54 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(String, default="user")
     is_active = Column(Boolean, default=True, nullable=False)
+    # поколение токенов: +1 отзывает все ранее выданные (logout-all, блокировка, роль)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     entries = relationship("Entry", back_populates="owner")
 
+    # поиск по подстроке email (services/search.py): ILIKE '%q%' на PostgreSQL
+    __table_args__ = (
+        Index(
+            "ix_users_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# SQLite: FTS5-индекс триграмм поверх users.email (external content),
+# синхронизируется триггерами; на PostgreSQL его заменяет ix_users_email_trgm
+USERS_EMAIL_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_email_fts USING fts5("
+    "email, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_email_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_email_fts(rowid, email) VALUES (new.id, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_email_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_email_fts(users_email_fts, rowid, email) "
+    "VALUES ('delete', old.id, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_email_fts_au AFTER UPDATE OF email ON users "
+    "BEGIN "
+    "INSERT INTO users_email_fts(users_email_fts, rowid, email) "
+    "VALUES ('delete', old.id, old.email); "
+    "INSERT INTO users_email_fts(rowid, email) VALUES (new.id, new.email); END",
+)
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+for _statement in USERS_EMAIL_FTS_DDL:
+    event.listen(
+        User.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    User.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS users_email_fts").execute_if(dialect="sqlite"),
+)
+
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
@@ -59,7 +127,11 @@ class RefreshToken(Base):
         nullable=False,
     )
 
-    __table_args__ = (Index("ix_refresh_user_device", "user_id", "device_id"),)
+    __table_args__ = (
+        Index("ix_refresh_user_device", "user_id", "device_id"),
+        # services/purge.py: keyset-обход просроченных строк
+        Index("ix_refresh_tokens_expires_at_id", "expires_at", "id"),
+    )
 
 
 class RevokedToken(Base):
@@ -75,3 +147,6 @@ class RevokedToken(Base):
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
     )
+
+    # services/purge.py: keyset-обход просроченных строк
+    __table_args__ = (Index("ix_revoked_tokens_expires_at_id", "expires_at", "id"),)
@@ -0,0 +1,222 @@
+"""
+Профилирование живого воркера.
+
+1) SamplingProfiler — поток, который раз в interval снимает стек потока
+   event loop через sys._current_frames() и копит collapsed stacks
+   (`a;b;c <count>` — вход flamegraph.pl / speedscope). Пока не запущен,
+   ничего не стоит: потока нет.
+2) Детерминированный профиль одного запроса (cProfile) по подписанному
+   заголовку X-Profile: `<expires>.<hmac-sha256(secret, "expires:METHOD:path")>`.
+   Результат — в ограниченном хранилище по id, id — в заголовке ответа.
+   Пока секрет не задан, middleware не подключается вовсе.
+
+    python -m adapters.profiling sign GET /api/v1/entries [--ttl 300]
+"""
+
+import argparse
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Optional
+
+from config import settings
+
+_MAX_DEPTH = 128
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    # путь относительно репозитория/site-packages короче и стабилен между машинами
+    for marker in ("site-packages" + os.sep, os.getcwd() + os.sep):
+        idx = path.find(marker)
+        if idx != -1:
+            path = path[idx + len(marker) :]
+            break
+    return f"{path}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self, max_seconds: float):
+        self.max_seconds = max_seconds
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._samples: Counter[str] = Counter()
+        self.sample_count = 0  # отдельно: Counter меняется из потока сэмплера
+        self.target_thread: Optional[int] = None
+        self.interval = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float, thread_id: Optional[int] = None) -> None:
+        """Сэмплировать поток thread_id (по умолчанию — текущий, т.е. event loop)."""
+        if self.running:
+            raise ValueError("PROFILER_RUNNING")
+        self._samples = Counter()
+        self.sample_count = 0
+        self._stop.clear()
+        self.interval = interval_ms / 1000
+        self.target_thread = thread_id or threading.get_ident()
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        frames = sys._current_frames
+        samples = self._samples
+        while not self._stop.wait(self.interval):
+            frame = frames().get(self.target_thread)
+            if frame is None:
+                break  # поток завершился
+            stack = []
+            while frame is not None and len(stack) < _MAX_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+            if time.monotonic() >= deadline:
+                break
+        self.stopped_at = time.time()
+
+    async def stop(self) -> str:
+        """Остановить и вернуть collapsed stacks."""
+        thread = self._thread
+        if thread is None:
+            raise ValueError("PROFILER_NOT_RUNNING")
+        self._stop.set()
+        # join не на event loop: поток может быть посреди снятия стека
+        await asyncio.to_thread(thread.join)
+        self._thread = None
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self._samples.most_common())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.sample_count,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "max_seconds": self.max_seconds,
+        }
+
+
+def sign_profile_request(
+    secret: str, method: str, path: str, ttl: float = 300.0, now: Optional[float] = None
+) -> str:
+    expires = int((now if now is not None else time.time()) + ttl)
+    return f"{expires}.{_signature(secret, expires, method, path)}"
+
+
+def _signature(secret: str, expires: int, method: str, path: str) -> str:
+    msg = f"{expires}:{method.upper()}:{path}".encode()
+    return hmac.new(secret.encode(), msg, hashlib.sha256).hexdigest()
+
+
+def verify_profile_header(
+    secret: str, header: str, method: str, path: str, now: Optional[float] = None
+) -> bool:
+    """Подпись привязана к методу и пути и ограничена по времени."""
+    if not secret:
+        return False
+    expires_raw, _, signature = header.partition(".")
+    try:
+        expires = int(expires_raw)
+    except ValueError:
+        return False
+    if expires < (now if now is not None else time.time()):
+        return False
+    return hmac.compare_digest(signature, _signature(secret, expires, method, path))
+
+
+class RequestProfiles:
+    """
+    Профили отдельных запросов: не больше одного одновременно (cProfile
+    вешается на поток event loop), последние max_items хранятся по id.
+    В профиль попадают и соседние задачи того же loop — на нагруженном
+    воркере это шум, который стоит учитывать.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: OrderedDict[str, tuple[str, cProfile.Profile]] = OrderedDict()
+        self._active: Optional[cProfile.Profile] = None
+
+    @property
+    def busy(self) -> bool:
+        return self._active is not None
+
+    def begin(self) -> Optional[cProfile.Profile]:
+        if self._active is not None:
+            return None
+        self._active = cProfile.Profile()
+        self._active.enable()
+        return self._active
+
+    def end(
+        self, profiler: cProfile.Profile, label: str, profile_id: Optional[str] = None
+    ) -> str:
+        profiler.disable()
+        self._active = None
+        profile_id = profile_id or uuid.uuid4().hex
+        self._items[profile_id] = (label, profiler)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return profile_id
+
+    def report(self, profile_id: str, limit: int = 60, sort: str = "cumulative") -> str:
+        item = self._items.get(profile_id)
+        if item is None:
+            raise ValueError("PROFILE_NOT_FOUND")
+        label, profiler = item
+        out = io.StringIO()
+        out.write(f"# {label}\n")
+        pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def ids(self) -> list[str]:
+        return list(self._items)
+
+
+sampling_profiler = SamplingProfiler(max_seconds=settings.PROFILER_MAX_SECONDS)
+request_profiles = RequestProfiles(max_items=settings.PROFILE_STORE_SIZE)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sign an X-Profile header")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sign = sub.add_parser("sign")
+    sign.add_argument("method")
+    sign.add_argument("path")
+    sign.add_argument("--ttl", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if not settings.PROFILING_SECRET:
+        parser.error("PROFILING_SECRET is not set")
+    print(
+        sign_profile_request(
+            settings.PROFILING_SECRET, args.method, args.path, args.ttl
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Учёт SQL в пределах запроса (или блока кода): число statement'ов, время в БД
+и повторы одного и того же текста — типичный признак N+1.
+
+Рекордер живёт в contextvar: события SQLAlchemy выполняются в greenlet того же
+контекста, что и хендлер, поэтому параллельные запросы не смешиваются. Без
+активного рекордера и подписчиков хук стоит одного ContextVar.get().
+
+Хук замера здесь один на процесс: время старта лежит на ExecutionContext
+statement'а (не в общем conn.info), длительность получают и рекордер, и
+подписчики add_statement_listener (гистограмма adapters.metrics).
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current: ContextVar[Optional["QueryRecorder"]] = ContextVar(
+    "query_recorder", default=None
+)
+
+
+class QueryRecorder:
+    """Счётчики одного запроса; вложенный рекордер передаёт всё и родителю."""
+
+    __slots__ = ("count", "duration", "statements", "capture", "parent", "_repeats")
+
+    def __init__(self, capture: bool = False, parent: Optional["QueryRecorder"] = None):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: list[str] = []
+        self.capture = capture
+        self.parent = parent
+        self._repeats: dict[str, int] = {}
+
+    def add(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        self._repeats[statement] = self._repeats.get(statement, 0) + 1
+        if self.capture:
+            self.statements.append(statement)
+        if self.parent is not None:
+            self.parent.add(statement, elapsed)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement'ы, выполненные threshold и больше раз (executemany — один раз)."""
+        return [(s, n) for s, n in self._repeats.items() if n >= threshold]
+
+
+def current_recorder() -> Optional[QueryRecorder]:
+    return _current.get()
+
+
+@contextmanager
+def record_queries(capture: bool = False) -> Iterator[QueryRecorder]:
+    recorder = QueryRecorder(capture=capture, parent=_current.get())
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+_listeners: list[Callable[[str, float], None]] = []
+
+
+def add_statement_listener(listener: Callable[[str, float], None]) -> None:
+    """listener(statement, seconds) на каждый успешно выполненный statement."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+    install()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # context нет у низкоуровневых exec_driver_sql без компиляции — не замеряем
+    if context is not None and (_listeners or _current.get() is not None):
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    context._query_started = None
+    elapsed = time.perf_counter() - started
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.add(statement, elapsed)
+    for listener in _listeners:
+        listener(statement, elapsed)
+
+
+def _handle_error(exception_context) -> None:
+    # упавший statement не учитываем, и его старт не должен дожить до следующего
+    context = exception_context.execution_context
+    if context is not None:
+        context._query_started = None
+
+
+def install() -> None:
+    """Хуки на все движки процесса (приложение, тесты, CLI)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
@@ -1,10 +1,14 @@
+import hashlib
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import jwt
 from passlib.context import CryptContext
 
+from adapters.timing import span
 from config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -22,13 +26,16 @@ def _now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def create_access_token(*, subject: int | str, role: str, device: str) -> str:
+def create_access_token(
+    *, subject: int | str, role: str, device: str, version: int = 0
+) -> str:
     now = _now()
     payload: dict[str, Any] = {
         "sub": str(subject),
         "role": role,
         "type": "access",
         "device": device,  # привязка к устройству
+        "ver": version,  # users.token_version на момент выдачи
         "jti": uuid.uuid4().hex,  # уникальный ID токена
         "iss": settings.JWT_ISSUER,
         "iat": int(now.timestamp()),
@@ -39,12 +46,15 @@ def create_access_token(*, subject: int | str, role: str, device: str) -> str:
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
 
-def create_refresh_payload(*, subject: int | str, device: str) -> dict[str, Any]:
+def create_refresh_payload(
+    *, subject: int | str, device: str, version: int = 0
+) -> dict[str, Any]:
     now = _now()
     return {
         "sub": str(subject),
         "type": "refresh",
         "device": device,  # привязка к устройству
+        "ver": version,
         "jti": uuid.uuid4().hex,
         "iss": settings.JWT_ISSUER,
         "iat": int(now.timestamp()),
@@ -66,3 +76,69 @@ def decode_token(token: str) -> dict[str, Any]:
         options={"require": ["exp", "iat", "sub", "iss", "type", "jti"]},
         issuer=settings.JWT_ISSUER,
     )
+
+
+class VerifiedClaimsCache:
+    """
+    LRU-кэш уже проверенных claims, ключ — sha256 от сырого токена.
+    Запись живёт не дольше exp токена, так что просроченный токен из кэша
+    не вернётся. Невалидные токены не кэшируются.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> dict[str, Any] | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        exp, claims = item
+        if exp <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, key: bytes, claims: dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (float(claims["exp"]), claims)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+claims_cache = VerifiedClaimsCache(maxsize=settings.JWT_CACHE_SIZE)
+
+
+def decode_token_cached(token: str) -> dict[str, Any]:
+    """decode_token с кэшем: подпись и claims проверяются один раз на токен."""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = claims_cache.get(key)
+    if claims is None:
+        with span("jwt"):
+            claims = decode_token(token)
+        claims_cache.put(key, claims)
+    # отдаём копию: вызывающий код не должен портить закэшированный dict
+    return dict(claims)
@@ -0,0 +1,78 @@
+"""
+Фазы запроса для Server-Timing и строки лога.
+
+    with span("jwt"):
+        claims = decode_token(token)
+
+Сборщик (Timings) живёт в contextvar и ставится middleware на запрос; вне
+запроса span — один ContextVar.get() и пустой выход. Одноимённые span'ы
+суммируются (несколько bcrypt или SQL за запрос — одна фаза).
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_current: ContextVar[Optional["Timings"]] = ContextVar("timings", default=None)
+
+
+class Timings:
+    __slots__ = ("started", "spans")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self, **extra: float) -> str:
+        """Значение Server-Timing: `name;dur=<ms>`, через запятую."""
+        spans = {**self.spans, **extra}
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in spans.items()
+        )
+
+    def log_fields(self) -> dict[str, float]:
+        """Поля строки лога запроса: <фаза>_ms."""
+        return {
+            f"{name}_ms": round(seconds * 1000, 2)
+            for name, seconds in self.spans.items()
+        }
+
+
+class span:
+    """Контекстный менеджер фазы; класс, а не генератор — дешевле на горячем пути."""
+
+    __slots__ = ("name", "_timings", "_started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "span":
+        self._timings = _current.get()
+        if self._timings is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._timings is not None:
+            self._timings.add(self.name, time.perf_counter() - self._started)
+
+
+def current_timings() -> Optional[Timings]:
+    return _current.get()
+
+
+@contextmanager
+def record_timings() -> Iterator[Timings]:
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
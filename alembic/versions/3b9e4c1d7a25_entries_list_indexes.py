@@ -0,0 +1,48 @@
+"""entries list indexes
+
+Revision ID: 3b9e4c1d7a25
+Revises: e2ca1d917c3a
+Create Date: 2026-10-17 19:05:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9e4c1d7a25"
+down_revision: Union[str, Sequence[str], None] = "e2ca1d917c3a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_entries_owner_id_id",
+        "entries",
+        ["owner_id", sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_entries_owner_status_id",
+        "entries",
+        ["owner_id", "status", sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_entries_status_id",
+        "entries",
+        ["status", sa.text("id DESC")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_entries_status_id", table_name="entries")
+    op.drop_index("ix_entries_owner_status_id", table_name="entries")
+    op.drop_index("ix_entries_owner_id_id", table_name="entries")
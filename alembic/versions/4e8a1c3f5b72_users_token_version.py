@@ -0,0 +1,32 @@
+"""users token_version
+
+Revision ID: 4e8a1c3f5b72
+Revises: 9d4f2a6b8c13
+Create Date: 2026-10-17 22:40:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4e8a1c3f5b72"
+down_revision: Union[str, Sequence[str], None] = "9d4f2a6b8c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "token_version")
@@ -0,0 +1,40 @@
+"""entry versions for etags
+
+Revision ID: 5a7e3c9d1b46
+Revises: 4e8a1c3f5b72
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5a7e3c9d1b46"
+down_revision: Union[str, Sequence[str], None] = "4e8a1c3f5b72"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "entries",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.create_table(
+        "entry_list_versions",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("entry_list_versions")
+    op.drop_column("entries", "version")
@@ -0,0 +1,58 @@
+"""users email search indexes
+
+Revision ID: 7c2d5e8f1a40
+Revises: 3b9e4c1d7a25
+Create Date: 2026-10-17 20:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from adapters.models import USERS_EMAIL_FTS_DDL
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c2d5e8f1a40"
+down_revision: Union[str, Sequence[str], None] = "3b9e4c1d7a25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# DDL общий с create_all (adapters.models), чтобы копии не разошлись
+SQLITE_FTS = (
+    *USERS_EMAIL_FTS_DDL,
+    # проиндексировать уже существующих пользователей
+    "INSERT INTO users_email_fts(users_email_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_users_email_trgm",
+        "users",
+        ["email"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"email": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in (
+            "users_email_fts_ai",
+            "users_email_fts_ad",
+            "users_email_fts_au",
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS users_email_fts")
+        return
+
+    op.drop_index("ix_users_email_trgm", table_name="users")
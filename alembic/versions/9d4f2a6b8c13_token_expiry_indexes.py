@@ -0,0 +1,39 @@
+"""token expiry indexes
+
+Revision ID: 9d4f2a6b8c13
+Revises: 7c2d5e8f1a40
+Create Date: 2026-10-17 21:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4f2a6b8c13"
+down_revision: Union[str, Sequence[str], None] = "7c2d5e8f1a40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_refresh_tokens_expires_at_id",
+        "refresh_tokens",
+        ["expires_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_revoked_tokens_expires_at_id",
+        "revoked_tokens",
+        ["expires_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_revoked_tokens_expires_at_id", table_name="revoked_tokens")
+    op.drop_index("ix_refresh_tokens_expires_at_id", table_name="refresh_tokens")
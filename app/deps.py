@@ -1,33 +1,89 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Optional
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from adapters.db import get_db_session
+from adapters.db import RequestSession, get_db_session
 from adapters.models import User
-from adapters.security import decode_token
+from adapters.security import decode_token_cached
+from services.pagination import decode_cursor
+from services.user_state import UserState, get_user_state, token_is_current
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-async def get_session() -> AsyncSession:
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # одна сессия на запрос: её же использует AuthMiddleware,
+    # закрывает DBSessionMiddleware после отправки ответа
+    uow: RequestSession | None = getattr(request.state, "db", None)
+    if uow is not None:
+        yield uow.session
+        return
+
     async for s in get_db_session():
         yield s
 
 
-async def get_current_user(
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Аутентифицированный пользователь без загрузки ORM User."""
+
+    id: int
+    role: str
+    claims: dict[str, Any]
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+async def get_principal(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session),
-) -> User:
+) -> Principal:
+    # AuthMiddleware уже проверил токен и версию и положил состояние в state;
+    # иначе (роут вне префиксов) — та же проверка здесь, через кэш
+    state_user = getattr(request.state, "user", None)
+    user_state: Optional[UserState] = None
     try:
-        payload = decode_token(token)
-        user_id = int(payload.get("sub"))
+        if state_user is not None:
+            user_id = int(state_user["id"])
+            claims = state_user["claims"]
+            user_state = state_user.get("state")
+        else:
+            claims = decode_token_cached(token)
+            user_id = int(claims.get("sub"))
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         )
 
-    res = await session.execute(select(User).where(User.id == user_id))
+    if user_state is None:
+        user_state = await get_user_state(session, user_id)
+    if not token_is_current(claims, user_state):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found or inactive",
+        )
+    return Principal(id=user_id, role=user_state.role, claims=claims)
+
+
+def require_admin(principal: Principal = Depends(get_principal)) -> Principal:
+    if not principal.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return principal
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_principal),
+    session: AsyncSession = Depends(get_session),
+) -> User:
+    """Полный ORM User — только для ручек, которым он действительно нужен."""
+    res = await session.execute(select(User).where(User.id == principal.id))
     user = res.scalars().first()
     if not user or not user.is_active:
         raise HTTPException(
@@ -37,7 +93,18 @@ async def get_current_user(
     return user
 
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
-    if user.role != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
-    return user
+def parse_cursor(cursor: Optional[str], offset: int) -> Optional[int]:
+    """Курсор keyset-пагинации -> id; offset-режим остаётся для совместимости."""
+    if cursor is None:
+        return None
+    if offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor and offset are mutually exclusive",
+        )
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
@@ -2,29 +2,113 @@ import logging
 import uuid
 from typing import Any, Dict
 
+import orjson
 from fastapi import HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from adapters.logs import bind_request_state, reset_request_state
+from app.responses import json_default
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        cid = request.headers.get("X-Correlation-ID") or uuid.uuid4().hex
-        request.state.correlation_id = cid
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = cid
-        return response
 
+class CorrelationIdMiddleware:
+    """Чистый ASGI: берёт/генерирует X-Correlation-ID и проставляет его в ответ."""
 
-def problem(
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cid = None
+        for key, value in scope["headers"]:
+            if key == b"x-correlation-id":
+                cid = value.decode("latin-1")
+                break
+        cid = cid or uuid.uuid4().hex
+        state = scope.setdefault("state", {})
+        state["correlation_id"] = cid
+
+        async def send_with_cid(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Correlation-ID"] = cid
+            await send(message)
+
+        # все записи лога внутри запроса получают cid и user_id
+        token = bind_request_state(state)
+        try:
+            await self.app(scope, receive, send_with_cid)
+        finally:
+            reset_request_state(token)
+
+
+class StaticProblem:
+    """
+    Заранее сериализованное problem+json тело: от запроса к запросу меняется
+    только correlation_id, поэтому сериализуем один раз. Байты совпадают
+    с тем, что отдал бы problem().
+    """
+
+    def __init__(
+        self, status_code: int, title: str, detail: str, type_: str = "about:blank"
+    ):
+        self.status_code = status_code
+        payload = {
+            "type": type_,
+            "title": title,
+            "status": status_code,
+            "detail": detail,
+            "correlation_id": None,
+        }
+        rendered = _dumps(payload)
+        # correlation_id — последний ключ: отрезаем "null}" и подставляем значение
+        self._prefix = rendered[: -len(b"null}")]
+
+    def render(self, cid: str | None) -> bytes:
+        return self._prefix + _dumps(cid) + b"}"
+
+    async def send(self, send: Send, cid: str | None) -> None:
+        body = self.render(cid)
+        headers = [
+            (b"content-type", b"application/problem+json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if cid:
+            headers.append((b"x-correlation-id", cid.encode("latin-1")))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def _dumps(value: Any) -> bytes:
+    # ctx ошибок валидации может содержать исключения — их отдаём строкой
+    return orjson.dumps(value, default=_problem_default)
+
+
+def _problem_default(value: Any) -> Any:
+    try:
+        return json_default(value)
+    except TypeError:
+        return str(value)
+
+
+def problem_payload(
     status_code: int,
     title: str,
     detail: str,
     type_: str = "about:blank",
     extras: Dict[str, Any] | None = None,
     cid: str | None = None,
-):
+) -> Dict[str, Any]:
     payload = {
         "type": type_,
         "title": title,
@@ -34,24 +118,53 @@ def problem(
     }
     if extras:
         payload.update(extras)
-    headers = {"X-Correlation-ID": cid} if cid else None
-    return JSONResponse(
-        payload,
+    return payload
+
+
+def problem(
+    status_code: int,
+    title: str,
+    detail: str,
+    type_: str = "about:blank",
+    extras: Dict[str, Any] | None = None,
+    cid: str | None = None,
+    headers: Dict[str, str] | None = None,
+):
+    payload = problem_payload(status_code, title, detail, type_, extras, cid)
+    headers = dict(headers or {})
+    if cid:
+        headers["X-Correlation-ID"] = cid
+    return Response(
+        _dumps(payload),
         status_code=status_code,
         media_type="application/problem+json",
-        headers=headers,
+        headers=headers or None,
     )
 
 
 def http_exc_handler(request: Request, exc: HTTPException):
     cid = getattr(request.state, "correlation_id", None)
-    title = {401: "Unauthorized", 403: "Forbidden"}.get(exc.status_code, "Error")
+    title = {
+        401: "Unauthorized",
+        403: "Forbidden",
+        409: "Conflict",
+        412: "Precondition Failed",
+        413: "Payload Too Large",
+        503: "Service Unavailable",
+    }.get(exc.status_code, "Error")
     # сохраняем исходный detail для совместимости с существующими контрактами
     detail = str(exc.detail)
     logging.getLogger("app.errors").warning(
-        "http_exception status=%s title=%s cid=%s", exc.status_code, title, cid
+        "http_exception", extra={"status": exc.status_code, "title": title}
+    )
+    return problem(
+        exc.status_code,
+        title,
+        detail,
+        type_="urn:errors:http",
+        cid=cid,
+        headers=getattr(exc, "headers", None),
     )
-    return problem(exc.status_code, title, detail, type_="urn:errors:http", cid=cid)
 
 
 def validation_exc_handler(request: Request, exc: RequestValidationError):
@@ -69,7 +182,7 @@ def validation_exc_handler(request: Request, exc: RequestValidationError):
 
 def generic_exc_handler(request: Request, exc: Exception):
     cid = getattr(request.state, "correlation_id", None)
-    logging.getLogger("app.errors").exception("unhandled_exception cid=%s", cid)
+    logging.getLogger("app.errors").exception("unhandled_exception")
     return problem(
         status.HTTP_500_INTERNAL_SERVER_ERROR,
         "Internal Server Error",
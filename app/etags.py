@@ -0,0 +1,30 @@
+import hashlib
+from typing import Any, Optional
+
+
+def entry_etag(entry_id: int, version: int) -> str:
+    return f'"e{entry_id}.{version}"'
+
+
+def list_etag(owner_id: int, version: int, *params: Any) -> str:
+    # одна версия на все списки владельца; параметры запроса различают страницы
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=6).hexdigest()
+    return f'"l{owner_id}.{version}.{digest}"'
+
+
+def _tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: Optional[str], etag: str) -> bool:
+    """If-None-Match совпал (ответ 304): слабое сравнение, W/ игнорируется."""
+    if not header:
+        return False
+    tags = _tags(header)
+    return "*" in tags or etag in {t.removeprefix("W/") for t in tags}
+
+
+def if_match(header: str, etag: str) -> bool:
+    """If-Match выполнен: строгое сравнение, слабые теги не совпадают никогда."""
+    tags = _tags(header)
+    return "*" in tags or etag in tags
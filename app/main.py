@@ -1,33 +1,83 @@
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
+from adapters import db, metrics, query_recorder
+from adapters.hashing import hasher_pool
+from adapters.logs import async_logging
+from adapters.profiling import request_profiles
 from app.errors import (
     CorrelationIdMiddleware,
     generic_exc_handler,
     http_exc_handler,
     validation_exc_handler,
 )
-from app.middleware import AuthMiddleware, RequestLoggingMiddleware
+from app.middleware import (
+    AuthMiddleware,
+    DBSessionMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestLoggingMiddleware,
+)
+from app.responses import FastJSONResponse
 from app.routers import admin as admin_router
 from app.routers import auth as auth_router
 from app.routers import entries as entries_router
 from config import settings
+from services.purge import purger
+from services.revocation import revocation_index
+from services.token_writer import token_writer
 
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
-    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+async_logging.configure(
+    level=settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    queue_size=settings.LOG_QUEUE_SIZE,
 )
 
-app = FastAPI(title="Reading List API", version="1.0.0")
+logger = logging.getLogger("app.main")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # прогреваем индекс отзывов: дальше проверки блэклиста идут из памяти
+    if revocation_index.enabled:
+        try:
+            async with db.async_session_factory() as session:
+                loaded = await revocation_index.load(session)
+            logger.info("revocation_index warmed", extra={"entries": loaded})
+        except Exception:
+            logger.warning(
+                "revocation_index warm-up failed, falling back to DB", exc_info=True
+            )
+    # фоновая очистка просроченных refresh/revoked строк
+    if settings.PURGE_ENABLED:
+        purger.start()
+    # group commit учёта токенов; без него сервисы пишут напрямую
+    if settings.TOKEN_WRITER_ENABLED:
+        token_writer.start()
+    yield
+    await token_writer.stop()
+    await purger.stop()
+    hasher_pool.shutdown()
+    async_logging.shutdown()
+
+
+app = FastAPI(
+    title="Reading List API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
     allow_credentials=True,
 )
 
@@ -41,8 +91,21 @@ app.add_middleware(
         f"{auth_router.router.prefix}/logout",
     ],
 )
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(CorrelationIdMiddleware)  # outermost: runs first
+app.add_middleware(DBSessionMiddleware)  # сессия запроса: снаружи AuthMiddleware
+if settings.PROFILING_SECRET:
+    # без секрета middleware нет в стеке — ноль накладных расходов
+    app.add_middleware(
+        ProfilingMiddleware,
+        secret=settings.PROFILING_SECRET,
+        profiles=request_profiles,
+    )
+query_recorder.install()
+app.add_middleware(RequestLoggingMiddleware)  # число SQL на запрос — в строку лога
+app.add_middleware(CorrelationIdMiddleware)
+if settings.METRICS_ENABLED:
+    metrics.instrument_statements()
+    metrics.instrument_pool(db.engine)
+    app.add_middleware(MetricsMiddleware)  # outermost: время всего стека
 app.add_exception_handler(HTTPException, http_exc_handler)
 app.add_exception_handler(RequestValidationError, validation_exc_handler)
 app.add_exception_handler(Exception, generic_exc_handler)
@@ -56,3 +119,11 @@ app.include_router(admin_router.router)
 async def health_check():
     """Health check endpoint for container orchestration"""
     return {"status": "healthy", "service": "reading-list-api"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_ep():
+    """Prometheus exposition; закрывается на уровне сети, а не токеном."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,145 +1,372 @@
 import logging
+import random
+import time
+import uuid
 
-from fastapi import Request, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from adapters.db import get_db_session
-from adapters.security import decode_token
-from app.errors import problem
+from adapters import metrics
+from adapters.db import RequestSession, get_db_session
+from adapters.profiling import RequestProfiles, verify_profile_header
+from adapters.query_recorder import QueryRecorder, record_queries
+from adapters.security import decode_token_cached
+from adapters.timing import Timings, record_timings
+from app.errors import StaticProblem
+from config import settings
 from services.tokens import is_jti_blacklisted
+from services.user_state import get_user_state, token_is_current
 
+_PUBLIC_PATHS = frozenset(("/docs", "/openapi.json", "/redoc"))
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, prefixes: list[str]):
-        super().__init__(app)
-        self.prefixes = prefixes
+# 401-ответы AuthMiddleware: тела сериализованы один раз при импорте
+_MISSING_AUTH = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "Missing Authorization header",
+    type_="urn:errors:auth:missing-authorization",
+)
+_INVALID_SCHEME = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "Invalid Authorization scheme",
+    type_="urn:errors:auth:invalid-scheme",
+)
+_EMPTY_BEARER = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "Empty bearer token",
+    type_="urn:errors:auth:empty-bearer",
+)
+_INVALID_TOKEN = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "Invalid or expired token",
+    type_="urn:errors:auth:invalid-token",
+)
+_ACCESS_REQUIRED = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "Access token required",
+    type_="urn:errors:auth:access-required",
+)
+_REVOKED = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "Token revoked",
+    type_="urn:errors:auth:revoked",
+)
+_INACTIVE_USER = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "User not found or inactive",
+    type_="urn:errors:auth:inactive-user",
+)
+_INVALID_SUBJECT = StaticProblem(
+    status.HTTP_401_UNAUTHORIZED,
+    "Unauthorized",
+    "Invalid token subject",
+    type_="urn:errors:auth:invalid-subject",
+)
 
-    async def dispatch(self, request: Request, call_next):
-        # служебные/публичные пути
-        if request.method == "OPTIONS" or request.url.path in (
-            "/docs",
-            "/openapi.json",
-            "/redoc",
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class AuthMiddleware:
+    def __init__(self, app: ASGIApp, prefixes: list[str]):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        # служебные/публичные пути и не защищённые префиксы — пропускаем
+        if (
+            scope["method"] == "OPTIONS"
+            or path in _PUBLIC_PATHS
+            or not path.startswith(self.prefixes)
         ):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
-        # если путь не защищён — пропускаем
-        if not any(request.url.path.startswith(p) for p in self.prefixes):
-            return await call_next(request)
+        state = scope.setdefault("state", {})
+        cid = state.get("correlation_id")
 
         # Authorization: Bearer <token>
-        auth_header = request.headers.get("Authorization")
+        auth_header = _header(scope, b"authorization")
         if not auth_header:
-            cid = getattr(request.state, "correlation_id", None)
-            return problem(
-                status.HTTP_401_UNAUTHORIZED,
-                "Unauthorized",
-                "Missing Authorization header",
-                type_="urn:errors:auth:missing-authorization",
-                cid=cid,
-            )
+            await _MISSING_AUTH.send(send, cid)
+            return
 
         parts = auth_header.split(" ", 1)
         if len(parts) != 2 or parts[0].lower() != "bearer":
-            cid = getattr(request.state, "correlation_id", None)
-            return problem(
-                status.HTTP_401_UNAUTHORIZED,
-                "Unauthorized",
-                "Invalid Authorization scheme",
-                type_="urn:errors:auth:invalid-scheme",
-                cid=cid,
-            )
+            await _INVALID_SCHEME.send(send, cid)
+            return
 
         token = parts[1].strip()
         if not token:
-            cid = getattr(request.state, "correlation_id", None)
-            return problem(
-                status.HTTP_401_UNAUTHORIZED,
-                "Unauthorized",
-                "Empty bearer token",
-                type_="urn:errors:auth:empty-bearer",
-                cid=cid,
-            )
+            await _EMPTY_BEARER.send(send, cid)
+            return
 
         # валидация токена
         try:
-            payload = decode_token(token)
+            payload = decode_token_cached(token)
         except Exception:
-            cid = getattr(request.state, "correlation_id", None)
-            return problem(
-                status.HTTP_401_UNAUTHORIZED,
-                "Unauthorized",
-                "Invalid or expired token",
-                type_="urn:errors:auth:invalid-token",
-                cid=cid,
-            )
+            await _INVALID_TOKEN.send(send, cid)
+            return
 
         if payload.get("type") != "access":
-            cid = getattr(request.state, "correlation_id", None)
-            return problem(
-                status.HTTP_401_UNAUTHORIZED,
-                "Unauthorized",
-                "Access token required",
-                type_="urn:errors:auth:access-required",
-                cid=cid,
-            )
+            await _ACCESS_REQUIRED.send(send, cid)
+            return
 
         jti = payload.get("jti")
-        sub = payload.get("sub")
         role = payload.get("role") or "user"
+        try:
+            user_id = int(payload.get("sub"))
+        except Exception:
+            await _INVALID_SUBJECT.send(send, cid)
+            return
 
-        # проверка блэклиста (аккуратно закрываем генератор-сессию)
-        agen = get_db_session()
+        # сессия запроса (та же, что получит хендлер); соединение берётся
+        # только если чего-то нет в памяти
+        uow: RequestSession | None = state.get("db")
+        agen = None
         try:
-            session = await agen.__anext__()  # взять первую yield-сессию
-            blacklisted = await is_jti_blacklisted(session, jti)
+            if uow is not None:
+                session = uow.session
+            else:
+                agen = get_db_session()
+                session = await agen.__anext__()  # взять первую yield-сессию
+
+            # 1) поколение токенов пользователя: logout-all, блокировка, смена
+            # роли — сравнение целых из кэша
+            user_state = await get_user_state(session, user_id)
+            if user_state is None or not user_state.is_active:
+                await _INACTIVE_USER.send(send, cid)
+                return
+            if not token_is_current(payload, user_state):
+                await _REVOKED.send(send, cid)
+                return
+
+            # 2) точечный отзыв (logout одного девайса) — индекс отзывов
+            if await is_jti_blacklisted(session, jti):
+                await _REVOKED.send(send, cid)
+                return
         finally:
-            await agen.aclose()
-
-        if blacklisted:
-            cid = getattr(request.state, "correlation_id", None)
-            return problem(
-                status.HTTP_401_UNAUTHORIZED,
-                "Unauthorized",
-                "Token revoked",
-                type_="urn:errors:auth:revoked",
-                cid=cid,
-            )
+            if agen is not None:
+                await agen.aclose()
 
-        try:
-            user_id = int(sub)
-        except Exception:
-            cid = getattr(request.state, "correlation_id", None)
-            return problem(
-                status.HTTP_401_UNAUTHORIZED,
-                "Unauthorized",
-                "Invalid token subject",
-                type_="urn:errors:auth:invalid-subject",
-                cid=cid,
-            )
+        # кладём компактного пользователя в state — дальше токен не декодируется
+        state["user"] = {
+            "id": user_id,
+            "role": role,
+            "claims": payload,
+            "state": user_state,  # для Principal: без повторного похода в кэш/БД
+        }
+
+        await self.app(scope, receive, send)
 
-        # кладём компактного пользователя в state
-        request.state.user = {"id": user_id, "role": role, "claims": payload}
 
-        return await call_next(request)
+class DBSessionMiddleware:
+    """
+    Чистый ASGI: кладёт ленивую RequestSession в scope["state"]["db"]
+    и закрывает её после того, как ответ (включая тело) отправлен.
+    """
 
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        uow = RequestSession()
+        scope.setdefault("state", {})["db"] = uow
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await uow.close()
+
+
+class RequestLoggingMiddleware:
+    """
+    Строка лога на запрос: число SQL, время в БД и фазы adapters.timing
+    (jwt, user_state, revocation, bcrypt, serialize). В DEBUG число SQL уходит
+    в X-DB-Queries / X-DB-Time-ms, при SERVER_TIMING_ENABLED фазы — в
+    Server-Timing; заголовки считаются на момент начала ответа.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.logger = logging.getLogger("app.request")
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        cid = getattr(request.state, "correlation_id", None)
-        user = getattr(request.state, "user", None)
-        user_id = user.get("id") if isinstance(user, dict) else None
-        self.logger.info(
-            "method=%s path=%s status=%s cid=%s user_id=%s",
-            request.method,
-            request.url.path,
-            response.status_code,
-            cid,
-            user_id,
-        )
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500  # исключение до http.response.start
+
+        with record_queries() as queries, record_timings() as timings:
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if settings.DEBUG:
+                        headers = MutableHeaders(scope=message)
+                        headers["X-DB-Queries"] = str(queries.count)
+                        headers["X-DB-Time-ms"] = f"{queries.duration * 1000:.2f}"
+                    if settings.SERVER_TIMING_ENABLED:
+                        MutableHeaders(scope=message).append(
+                            "Server-Timing",
+                            timings.header(
+                                db=queries.duration, total=timings.elapsed()
+                            ),
+                        )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._log(scope, status_code, queries, timings)
+
+    def _log(
+        self, scope: Scope, status_code: int, queries: QueryRecorder, timings: Timings
+    ) -> None:
+        # 4xx/5xx пишем всегда, успешные — с вероятностью LOG_SAMPLE_RATE;
+        # sample_rate в записи позволяет восстановить полные счётчики
+        rate = settings.LOG_SAMPLE_RATE
+        failed = status_code >= 400
+        if (
+            failed or rate >= 1.0 or random.random() < rate
+        ) and self.logger.isEnabledFor(logging.INFO):
+            state = scope.get("state", {})
+            user = state.get("user")
+            fields = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "cid": state.get("correlation_id"),
+                "user_id": user.get("id") if isinstance(user, dict) else None,
+                "queries": queries.count,
+                "db_ms": round(queries.duration * 1000, 2),
+                "total_ms": round(timings.elapsed() * 1000, 2),
+                **timings.log_fields(),
+            }
+            if not failed and rate < 1.0:
+                fields["sample_rate"] = rate
+            self.logger.info("request", extra=fields)
+
+        threshold = settings.QUERY_REPEAT_WARN_THRESHOLD
+        if threshold > 0:
+            for statement, count in queries.repeated(threshold):
+                self.logger.warning(
+                    "possible N+1",
+                    extra={
+                        "path": scope["path"],
+                        "repeats": count,
+                        "statement": " ".join(statement.split())[:200],
+                    },
+                )
+
+
+class MetricsMiddleware:
+    """
+    Длительность запроса по шаблону маршрута (а не сырому пути — иначе
+    кардинальность растёт с каждым id) и число запросов в работе.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500  # исключение до http.response.start
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = metrics.http_requests_in_flight.labels()
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            # роутер FastAPI кладёт сматченный маршрут в scope; 401 от
+            # AuthMiddleware и 404 до роутинга не доходят
+            route = scope.get("route")
+            metrics.http_request_duration.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status_code,
+            ).observe(elapsed)
+
+
+class ProfilingMiddleware:
+    """
+    cProfile одного запроса по подписанному X-Profile (см. adapters.profiling);
+    id профиля — в X-Profile-Id, отчёт — GET /api/v1/admin/profiles/{id}.
+    Подключается, только если задан секрет.
+    """
+
+    def __init__(self, app: ASGIApp, secret: str, profiles: RequestProfiles):
+        self.app = app
+        self.secret = secret
+        self.profiles = profiles
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        header = _header(scope, b"x-profile") if scope["type"] == "http" else None
+        if header is None:
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        if not verify_profile_header(self.secret, header, method, path):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self.profiles.begin()
+        if profiler is None:
+            # уже профилируется другой запрос — отвечаем без профиля
+
+            async def send_busy(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message)["X-Profile-Status"] = "busy"
+                await send(message)
+
+            await self.app(scope, receive, send_busy)
+            return
+
+        profile_id: str | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal profile_id
+            if message["type"] == "http.response.start":
+                # id известен заранее: профиль закрывается после тела ответа
+                profile_id = uuid.uuid4().hex
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiles.end(profiler, f"{method} {path}", profile_id)
@@ -0,0 +1,41 @@
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+from adapters.timing import span
+
+
+def json_default(value: Any) -> Any:
+    # вложенные pydantic-модели (dict-ответ batch, отданный как FastJSONResponse) —
+    # через их собственный сериализатор; остальное orjson умеет сам
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """orjson: компактный UTF-8 без ensure_ascii, как JSONResponse, но быстрее."""
+    return orjson.dumps(value, default=json_default)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Ответ по умолчанию: pydantic-модель отдаётся байтами её скомпилированного
+    сериализатора, всё прочее — через orjson. jsonable_encoder не участвует,
+    если хендлер возвращает Response сам (см. model_response).
+    """
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            if isinstance(content, BaseModel):
+                return content.__pydantic_serializer__.to_json(content)
+            return dumps(content)
+
+
+def model_response(
+    model: BaseModel, status_code: int = 200, headers: dict[str, str] | None = None
+) -> Response:
+    # готовый Response: FastAPI пропускает повторную валидацию и jsonable_encoder
+    return FastJSONResponse(model, status_code=status_code, headers=headers)
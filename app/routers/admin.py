@@ -1,28 +1,160 @@
-from typing import Optional
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_session, oauth2_scheme
-from domain.schemas import UserListItem
+from adapters.hashing import hasher_pool
+from adapters.logs import async_logging
+from adapters.profiling import request_profiles, sampling_profiler
+from adapters.security import claims_cache
+from app.deps import Principal, get_session, parse_cursor, require_admin
+from domain.schemas import AdminUserUpdate, UserListItem
 from services.admin import list_users
+from services.entry_cache import entry_list_cache
+from services.pagination import next_cursor
+from services.purge import purger
+from services.revocation import revocation_index
+from services.token_writer import token_writer
+from services.user_state import bump_token_version, user_state_cache
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
 
 
 @router.get("", response_model=list[UserListItem])
 async def list_users_ep(
-    req: Request,
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     q: Optional[str] = Query(
         None, description="Search by email (substring, case-insensitive)"
     ),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination: X-Next-Cursor from the previous page"
+    ),
     session: AsyncSession = Depends(get_session),
-    _=Depends(oauth2_scheme),
+    admin: Principal = Depends(require_admin),
 ) -> list[UserListItem]:
-    if req.state.user["claims"]["role"] != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    after_id = parse_cursor(cursor, offset)
 
-    users = await list_users(session, limit=limit, offset=offset, q=q)
+    users = await list_users(
+        session, limit=limit, offset=offset, q=q, after_id=after_id
+    )
+    # тело — голый список (контракт), поэтому курсор отдаём заголовком
+    nxt = next_cursor(users, limit)
+    if nxt:
+        response.headers["X-Next-Cursor"] = nxt
     return users
+
+
+@router.patch("/users/{user_id}")
+async def update_user_ep(
+    user_id: int,
+    patch: AdminUserUpdate,
+    session: AsyncSession = Depends(get_session),
+    admin: Principal = Depends(require_admin),
+) -> dict[str, Any]:
+    """
+    Блокировка/разблокировка и смена роли. Любое изменение повышает
+    token_version — все выданные пользователю токены перестают приниматься.
+    """
+    if patch.is_active is None and patch.role is None:
+        # пустой PATCH не должен отзывать токены пользователя
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Nothing to update"
+        )
+    try:
+        state = await bump_token_version(
+            session, user_id, is_active=patch.is_active, role=patch.role
+        )
+    except ValueError as e:
+        if str(e) == "USER_NOT_FOUND":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        raise
+    return {
+        "id": user_id,
+        "role": state.role,
+        "is_active": state.is_active,
+        "token_version": state.version,
+    }
+
+
+@router.get("/stats")
+async def runtime_stats_ep(
+    admin: Principal = Depends(require_admin),
+) -> dict[str, Any]:
+    """Внутренние счётчики процесса (для подбора размеров пулов и кэшей)."""
+    return {
+        "password_hasher": hasher_pool.stats(),
+        "revocation_index": revocation_index.stats(),
+        "jwt_cache": claims_cache.stats(),
+        "token_purge": purger.stats(),
+        "token_writer": token_writer.stats(),
+        "user_state_cache": user_state_cache.stats(),
+        "entry_list_cache": entry_list_cache.stats(),
+        "logging": async_logging.stats(),
+    }
+
+
+@router.get("/profiler")
+async def profiler_status_ep(
+    admin: Principal = Depends(require_admin),
+) -> dict[str, Any]:
+    return {**sampling_profiler.stats(), "request_profiles": request_profiles.ids()}
+
+
+@router.post("/profiler/start")
+async def profiler_start_ep(
+    interval_ms: float = Query(10.0, ge=1.0, le=1000.0),
+    admin: Principal = Depends(require_admin),
+) -> dict[str, Any]:
+    """
+    Сэмплирующий профайлер потока event loop этого воркера; сам
+    останавливается через PROFILER_MAX_SECONDS.
+    """
+    try:
+        sampling_profiler.start(interval_ms)
+    except ValueError as e:
+        if str(e) == "PROFILER_RUNNING":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Profiler already running"
+            )
+        raise
+    return sampling_profiler.stats()
+
+
+@router.post("/profiler/stop", response_class=PlainTextResponse)
+async def profiler_stop_ep(
+    admin: Principal = Depends(require_admin),
+) -> PlainTextResponse:
+    """Collapsed stacks (`frame;frame;frame count`) для flamegraph.pl / speedscope."""
+    try:
+        collapsed = await sampling_profiler.stop()
+    except ValueError as e:
+        if str(e) == "PROFILER_NOT_RUNNING":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Profiler is not running"
+            )
+        raise
+    return PlainTextResponse(collapsed)
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def request_profile_ep(
+    profile_id: str,
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(60, ge=1, le=1000),
+    admin: Principal = Depends(require_admin),
+) -> PlainTextResponse:
+    """Отчёт cProfile запроса, профилированного по заголовку X-Profile."""
+    try:
+        report = request_profiles.report(profile_id, limit=limit, sort=sort)
+    except ValueError as e:
+        if str(e) == "PROFILE_NOT_FOUND":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+            )
+        raise
+    return PlainTextResponse(report)
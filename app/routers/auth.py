@@ -4,25 +4,25 @@ from uuid import uuid4
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, Field
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from adapters.models import User
+from adapters.hashing import PasswordHasherBusy
 from adapters.security import (
     create_access_token,
     create_refresh_payload,
     decode_token,
+    decode_token_cached,
     encode_token,
 )
-from app.deps import get_session, oauth2_scheme
+from app.deps import Principal, get_principal, get_session
 from services.auth import authenticate_user, register_user
 from services.tokens import (
     blacklist,
     create_refresh_record,
-    is_refresh_revoked,
-    revoke_refresh_by_jti,
     revoke_refresh_for_device,
+    rotate_refresh,
 )
+from services.user_state import bump_token_version
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
@@ -59,6 +59,14 @@ def _device_id_or_new(device_id: Optional[str]) -> str:
     return device_id if device_id else uuid4().hex
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, retry later",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/refresh", response_model=TokenOut)
 async def refresh_token(
     payload: RefreshIn,
@@ -73,33 +81,37 @@ async def refresh_token(
     if claims.get("type") != "refresh":
         raise HTTPException(status_code=400, detail="Not a refresh token")
 
-    # проверка, что он не отозван/неподделан
-    if await is_refresh_revoked(session, claims["jti"]):
-        raise HTTPException(status_code=401, detail="Refresh token revoked")
-
-    user_id = int(claims["sub"])
+    try:
+        user_id = int(claims["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
     device_id = claims.get("device")
 
-    # гасим текущий refresh (ротация)
-    await revoke_refresh_by_jti(session, claims["jti"])
-
-    res = await session.execute(select(User).where(User.id == user_id))
-    user = res.scalars().first()
-    if not user or not user.is_active:
-        raise HTTPException(status_code=401, detail="User not found or inactive")
-
-    access = create_access_token(subject=str(user.id), role=user.role, device=device_id)
-    rc2 = create_refresh_payload(subject=str(user.id), device=device_id)
-    new_refresh = encode_token(rc2)
+    # ротация одним CAS-обновлением: гасим текущий refresh и пишем новый
+    rc2 = create_refresh_payload(subject=str(user_id), device=device_id)
+    try:
+        state = await rotate_refresh(
+            session,
+            jti=claims["jti"],
+            user_id=user_id,
+            version=int(claims.get("ver", 0)),
+            new_jti=rc2["jti"],
+            new_exp_ts=rc2["exp"],
+            device_id=device_id,
+            user_agent=user_agent,
+        )
+    except ValueError as e:
+        if str(e) == "REFRESH_REVOKED":
+            raise HTTPException(status_code=401, detail="Refresh token revoked")
+        if str(e) == "USER_INACTIVE":
+            raise HTTPException(status_code=401, detail="User not found or inactive")
+        raise
 
-    await create_refresh_record(
-        session,
-        user_id=user.id,
-        jti=rc2["jti"],
-        exp_ts=rc2["exp"],
-        device_id=device_id,
-        user_agent=user_agent,
+    access = create_access_token(
+        subject=str(user_id), role=state.role, device=device_id, version=state.version
     )
+    rc2["ver"] = state.version  # jti/exp записаны в БД, версию знаем только теперь
+    new_refresh = encode_token(rc2)
 
     return TokenOut(access_token=access, refresh_token=new_refresh, device_id=device_id)
 
@@ -116,10 +128,19 @@ async def register(
         if str(e) == "EMAIL_TAKEN":
             raise HTTPException(status_code=409, detail="Email already registered")
         raise
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
     device_id = _device_id_or_new(payload.device_id)
-    access = create_access_token(subject=str(user.id), role=user.role, device=device_id)
-    rc = create_refresh_payload(subject=str(user.id), device=device_id)
+    access = create_access_token(
+        subject=str(user.id),
+        role=user.role,
+        device=device_id,
+        version=user.token_version,
+    )
+    rc = create_refresh_payload(
+        subject=str(user.id), device=device_id, version=user.token_version
+    )
     refresh = encode_token(rc)
 
     await create_refresh_record(
@@ -141,15 +162,25 @@ async def login(
     user_agent: str | None = Header(default=None, alias="User-Agent"),
     x_device_id: Optional[str] = Header(default=None, alias="X-Device-Id"),
 ):
-    user = await authenticate_user(session, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(session, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
 
     device_id = _device_id_or_new(x_device_id)
-    access = create_access_token(subject=str(user.id), role=user.role, device=device_id)
-    rc = create_refresh_payload(subject=str(user.id), device=device_id)
+    access = create_access_token(
+        subject=str(user.id),
+        role=user.role,
+        device=device_id,
+        version=user.token_version,
+    )
+    rc = create_refresh_payload(
+        subject=str(user.id), device=device_id, version=user.token_version
+    )
     refresh = encode_token(rc)
 
     await create_refresh_record(
@@ -165,11 +196,8 @@ async def login(
 
 
 @router.get("/me")
-async def me(
-    req: Request,
-    _=Depends(oauth2_scheme),
-):
-    return {"id": req.state.user["id"], "role": req.state.user["claims"]["role"]}
+async def me(principal: Principal = Depends(get_principal)):
+    return {"id": principal.id, "role": principal.role}
 
 
 @router.post("/logout", status_code=204)
@@ -183,7 +211,7 @@ async def logout(
     if auth and " " in auth:
         token = auth.split(" ", 1)[1].strip()
         try:
-            ac = decode_token(token)
+            ac = decode_token_cached(token)  # уже проверен AuthMiddleware
             if ac.get("type") == "access" and ac.get("device") == payload.device_id:
                 await blacklist(
                     session,
@@ -225,3 +253,18 @@ async def logout(
             pass
 
     return None
+
+
+@router.post("/logout-all", status_code=204)
+async def logout_all(
+    principal: Principal = Depends(get_principal),
+    session: AsyncSession = Depends(get_session),
+):
+    """Выход на всех устройствах: одно повышение token_version."""
+    try:
+        await bump_token_version(session, principal.id)
+    except ValueError as e:
+        if str(e) == "USER_NOT_FOUND":
+            raise HTTPException(status_code=401, detail="User not found or inactive")
+        raise
+    return None
@@ -1,111 +1,297 @@
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_session, oauth2_scheme
-from domain.schemas import EntryCreate, EntryStatus, EntryUpdate
+from adapters.models import Entry
+from app.deps import Principal, get_principal, get_session, parse_cursor
+from app.errors import problem_payload
+from app.etags import entry_etag, if_match, list_etag, none_match
+from app.responses import FastJSONResponse, model_response
+from config import settings
+from domain.schemas import (
+    EntryBatchRequest,
+    EntryCreate,
+    EntryInDB,
+    EntryPage,
+    EntryStatus,
+    EntryUpdate,
+)
 from services.entries import (
+    apply_batch,
     create_entry,
     delete_entry,
     get_entry_any,
     get_entry_for_owner,
+    get_entry_version,
+    get_list_version,
     list_entries_admin,
     list_entries_user,
+    stream_entries,
     update_entry,
 )
+from services.entry_cache import entry_list_cache
+from services.export import EXPORT_MEDIA_TYPES, EXPORT_WRITERS
+from services.pagination import next_cursor
 
 router = APIRouter(prefix="/api/v1/entries", tags=["entries"])
 
+# коды ошибок apply_batch -> (status, title, detail, type) для RFC 7807 элемента
+_BATCH_ERRORS = {
+    "NOT_FOUND": (404, "Not Found", "Entry not found", "urn:errors:batch:not-found"),
+    "DUPLICATE_ID": (
+        409,
+        "Conflict",
+        "Entry is referenced by more than one operation",
+        "urn:errors:batch:duplicate-id",
+    ),
+    "STATUS_CONFLICT": (
+        409,
+        "Conflict",
+        "Entry is not in the expected status",
+        "urn:errors:batch:status-conflict",
+    ),
+}
+
+
+async def _get_entry_or_404(
+    session: AsyncSession, principal: Principal, entry_id: int
+) -> Entry:
+    if principal.is_admin:
+        item = await get_entry_any(session, entry_id)
+    else:
+        item = await get_entry_for_owner(session, principal.id, entry_id)
+
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Entry not found"
+        )
+    return item
+
+
+def _check_if_match(header: Optional[str], item: Entry) -> None:
+    if header is not None and not if_match(header, entry_etag(item.id, item.version)):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Entry has been modified",
+        )
+
+
+def _version_conflict(header: Optional[str]) -> HTTPException:
+    # запись изменили между чтением и UPDATE ... AND version=?
+    return HTTPException(
+        status_code=(
+            status.HTTP_412_PRECONDITION_FAILED
+            if header is not None
+            else status.HTTP_409_CONFLICT
+        ),
+        detail="Entry has been modified",
+    )
+
 
-@router.post("", status_code=201)
+def _entry_response(item: Entry, status_code: int = 200) -> Response:
+    return model_response(
+        EntryInDB.model_validate(item),
+        status_code=status_code,
+        headers={"ETag": entry_etag(item.id, item.version)},
+    )
+
+
+@router.post("", status_code=201, response_model=EntryInDB)
 async def create_entry_ep(
-    req: Request,
     payload: EntryCreate,
     session: AsyncSession = Depends(get_session),
-    _=Depends(oauth2_scheme),
-):
-    return await create_entry(session, req.state.user["id"], payload)
+    principal: Principal = Depends(get_principal),
+) -> Response:
+    item = await create_entry(session, principal.id, payload)
+    return _entry_response(item, status_code=201)
+
+
+@router.post(":batch")
+async def batch_entries_ep(
+    payload: EntryBatchRequest,
+    session: AsyncSession = Depends(get_session),
+    principal: Principal = Depends(get_principal),
+) -> Response:
+    if len(payload.ops) > settings.ENTRY_BATCH_MAX_OPS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many operations (max {settings.ENTRY_BATCH_MAX_OPS})",
+        )
+
+    user_id = principal.id
+    is_admin = principal.is_admin
+    outcome = await apply_batch(
+        session, payload.ops, user_id, None if is_admin else user_id
+    )
 
+    results = []
+    for index, (op, res) in enumerate(zip(payload.ops, outcome)):
+        item = {"index": index, "op": op.op, "id": res["id"]}
+        if "error" in res:
+            code, title, detail, type_ = _BATCH_ERRORS[res["error"]]
+            item.update(problem_payload(code, title, detail, type_))
+            del item["correlation_id"]  # он один на весь ответ — в заголовке
+        else:
+            item["status"] = res["status"]
+            if "entry" in res:
+                item["entry"] = EntryInDB.model_validate(res["entry"])
+        results.append(item)
 
-@router.get("")
+    failed = sum(1 for item in results if item["status"] >= 400)
+    # готовый Response: без jsonable_encoder, EntryInDB внутри — через json_default
+    return FastJSONResponse(
+        {"results": results, "succeeded": len(results) - failed, "failed": failed}
+    )
+
+
+@router.get("", response_model=EntryPage)
 async def list_entries_ep(
-    req: Request,
     entry_status: Optional[EntryStatus] = Query(None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     owner_id: Optional[int] = Query(None, description="Admin only: filter by owner_id"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination: next_cursor from the previous page"
+    ),
+    if_none_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
-    _=Depends(oauth2_scheme),
-):
-    if req.state.user["claims"]["role"] == "admin":
-        items = await list_entries_admin(session, entry_status, limit, offset, owner_id)
+    principal: Principal = Depends(get_principal),
+) -> Response:
+    if owner_id is not None and not principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can filter by owner_id",
+        )
+    after_id = parse_cursor(cursor, offset)
+
+    # списки одного владельца: ETag и кэш страниц по версии списка (без строк)
+    list_owner = owner_id if principal.is_admin else principal.id
+    etag = cache_key = None
+    if list_owner is not None:
+        version = await get_list_version(session, list_owner)
+        params = (entry_status and entry_status.value, limit, offset, cursor)
+        etag = list_etag(list_owner, version, *params)
+        if none_match(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+        cache_key = entry_list_cache.key(list_owner, version, *params)
+        body = entry_list_cache.get(cache_key)
+        if body is not None:
+            return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    if principal.is_admin:
+        items = await list_entries_admin(
+            session, entry_status, limit, offset, owner_id, after_id=after_id
+        )
     else:
+        items = await list_entries_user(
+            session,
+            principal.id,
+            entry_status,
+            limit,
+            offset,
+            after_id=after_id,
+        )
+    page = EntryPage(
+        items=items,
+        limit=limit,
+        offset=offset,
+        count=len(items),
+        next_cursor=next_cursor(items, limit),
+    )
+    response = model_response(page, headers={"ETag": etag} if etag else None)
+    if cache_key is not None:
+        entry_list_cache.put(cache_key, response.body)
+    return response
+
+
+@router.get("/export")
+async def export_entries_ep(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    entry_status: Optional[EntryStatus] = Query(None),
+    owner_id: Optional[int] = Query(None, description="Admin only: filter by owner_id"),
+    session: AsyncSession = Depends(get_session),
+    principal: Principal = Depends(get_principal),
+):
+    # скоуп как у списка: пользователь — только свои, админ — все или owner_id
+    if not principal.is_admin:
         if owner_id is not None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only admins can filter by owner_id",
             )
-        items = await list_entries_user(
-            session, req.state.user["id"], entry_status, limit, offset
-        )
-    return {"items": items, "limit": limit, "offset": offset, "count": len(items)}
+        owner_id = principal.id
+
+    batches = stream_entries(
+        session, owner_id, entry_status, settings.EXPORT_BATCH_SIZE
+    )
+    return StreamingResponse(
+        EXPORT_WRITERS[export_format](batches),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="entries.{export_format}"'
+        },
+    )
 
 
-@router.get("/{entry_id}")
+@router.get("/{entry_id}", response_model=EntryInDB)
 async def get_entry_ep(
-    req: Request,
     entry_id: int,
+    if_none_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
-    _=Depends(oauth2_scheme),
-):
-    if req.state.user["claims"]["role"] == "admin":
-        item = await get_entry_any(session, entry_id)
-    else:
-        item = await get_entry_for_owner(session, req.state.user["id"], entry_id)
-
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Entry not found"
+    principal: Principal = Depends(get_principal),
+) -> Response:
+    if if_none_match:
+        # сверяем только версию: строку не грузим и не сериализуем
+        version = await get_entry_version(
+            session, entry_id, None if principal.is_admin else principal.id
         )
-    return item
+        if version is not None:
+            etag = entry_etag(entry_id, version)
+            if none_match(if_none_match, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+                )
+
+    item = await _get_entry_or_404(session, principal, entry_id)
+    return _entry_response(item)
 
 
-@router.patch("/{entry_id}")
+@router.patch("/{entry_id}", response_model=EntryInDB)
 async def update_entry_ep(
-    req: Request,
     entry_id: int,
     patch: EntryUpdate,
+    if_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
-    _=Depends(oauth2_scheme),
-):
-    if req.state.user["claims"]["role"] == "admin":
-        item = await get_entry_any(session, entry_id)
-    else:
-        item = await get_entry_for_owner(session, req.state.user["id"], entry_id)
-
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Entry not found"
-        )
-    return await update_entry(session, item, patch)
+    principal: Principal = Depends(get_principal),
+) -> Response:
+    item = await _get_entry_or_404(session, principal, entry_id)
+    _check_if_match(if_match, item)
+    try:
+        item = await update_entry(session, item, patch)
+    except ValueError as e:
+        if str(e) == "VERSION_MISMATCH":
+            raise _version_conflict(if_match)
+        raise
+    return _entry_response(item)
 
 
 @router.delete("/{entry_id}", status_code=204)
 async def delete_entry_ep(
-    req: Request,
     entry_id: int,
+    if_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
-    _=Depends(oauth2_scheme),
+    principal: Principal = Depends(get_principal),
 ):
-    if req.state.user["claims"]["role"] == "admin":
-        item = await get_entry_any(session, entry_id)
-    else:
-        item = await get_entry_for_owner(session, req.state.user["id"], entry_id)
-
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Entry not found"
-        )
-    await delete_entry(session, item)
+    item = await _get_entry_or_404(session, principal, entry_id)
+    _check_if_match(if_match, item)
+    try:
+        await delete_entry(session, item)
+    except ValueError as e:
+        if str(e) == "VERSION_MISMATCH":
+            raise _version_conflict(if_match)
+        raise
     return None
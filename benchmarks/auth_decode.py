@@ -0,0 +1,68 @@
+"""
+Микробенчмарк накладных расходов на аутентификацию одного запроса.
+
+До кэша токен декодировался в AuthMiddleware, в get_current_user и в logout —
+до трёх полных проверок подписи и claims на запрос. Теперь: одна проверка
+на токен за всё время его жизни, остальное — поиск в LRU.
+
+    python -m benchmarks.auth_decode [--tokens 100] [--requests 20000]
+"""
+
+import argparse
+import timeit
+
+from adapters.security import (
+    claims_cache,
+    create_access_token,
+    decode_token,
+    decode_token_cached,
+)
+
+
+def _per_request_uncached(tokens: list[str], decodes: int) -> None:
+    for token in tokens:
+        for _ in range(decodes):
+            decode_token(token)
+
+
+def _per_request_cached(tokens: list[str], decodes: int) -> None:
+    for token in tokens:
+        for _ in range(decodes):
+            decode_token_cached(token)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=100, help="distinct tokens")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument(
+        "--decodes", type=int, default=2, help="decode calls per request (old path)"
+    )
+    args = parser.parse_args()
+
+    tokens = [
+        create_access_token(subject=i, role="user", device="bench")
+        for i in range(args.tokens)
+    ]
+    rounds = max(args.requests // args.tokens, 1)
+    n = rounds * len(tokens)
+
+    before = timeit.timeit(
+        lambda: _per_request_uncached(tokens, args.decodes), number=rounds
+    )
+    claims_cache.clear()
+    after = timeit.timeit(
+        lambda: _per_request_cached(tokens, args.decodes), number=rounds
+    )
+
+    print(
+        f"requests: {n}, distinct tokens: {len(tokens)}, decodes/request: {args.decodes}"
+    )
+    print(f"uncached decode_token:  {before / n * 1e6:8.2f} us/request")
+    print(f"decode_token_cached:    {after / n * 1e6:8.2f} us/request")
+    print(f"speedup:                {before / after:8.1f}x")
+    print(f"cache: {claims_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Горячие пути сервисного слоя на засеянной БД."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from adapters.models import RevokedToken
+from services.entries import list_entries_user
+from services.revocation import revocation_index
+from services.tokens import is_jti_blacklisted
+
+_PAGE = 50
+_REVOKED = 10_000
+
+
+@pytest.fixture(scope="module")
+def revoked_jtis(runner, owners) -> list[str]:
+    from adapters import db
+
+    jtis = [uuid.uuid4().hex for _ in range(_REVOKED)]
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+
+    async def _seed():
+        async with db.engine.begin() as conn:
+            await conn.execute(
+                insert(RevokedToken),
+                [
+                    {
+                        "user_id": 1,
+                        "jti": jti,
+                        "token_type": "access",
+                        "expires_at": expires_at,
+                    }
+                    for jti in jtis
+                ],
+            )
+
+    runner.run(_seed())
+    return jtis
+
+
+@pytest.mark.parametrize("known", [True, False], ids=["revoked", "unknown"])
+@pytest.mark.parametrize("path", ["index", "db"])
+def bench_is_jti_blacklisted(benchmark, runner, session, revoked_jtis, path, known):
+    jti = revoked_jtis[_REVOKED // 2] if known else uuid.uuid4().hex
+    revocation_index.reset()
+    enabled = revocation_index.enabled
+    revocation_index.enabled = path == "index"
+    try:
+        if path == "index":
+            runner.run(revocation_index.load(session))
+        result = benchmark(lambda: runner.run(is_jti_blacklisted(session, jti)))
+    finally:
+        revocation_index.enabled = enabled
+        revocation_index.reset()
+    assert result is known
+
+
+def bench_list_entries_first_page(benchmark, runner, session, owners, dataset):
+    owner_id = owners[dataset]
+    items = benchmark(
+        lambda: runner.run(list_entries_user(session, owner_id, None, _PAGE, 0))
+    )
+    assert len(items) == _PAGE
+
+
+def bench_list_entries_keyset_middle(benchmark, runner, session, owners, dataset):
+    # курсор на середину списка владельца: стоимость не должна зависеть от глубины
+    owner_id = owners[dataset]
+    first = runner.run(list_entries_user(session, owner_id, None, 1, 0))
+    after_id = first[0].id - dataset // 2
+    items = benchmark(
+        lambda: runner.run(
+            list_entries_user(session, owner_id, None, _PAGE, 0, after_id)
+        )
+    )
+    assert len(items) == _PAGE
@@ -0,0 +1,94 @@
+"""
+Общие фикстуры микробенчмарков.
+
+БД — отдельный временный SQLite-файл: DATABASE_URL выставляется до первого
+импорта adapters.db, иначе engine привяжется к рабочей базе. Датасеты для
+list_entries_user засеваются один раз на сессию через sqlite3.executemany.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+_TMP = tempfile.TemporaryDirectory(prefix="bench-")
+_DB_PATH = os.path.join(_TMP.name, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_PATH}"
+
+from adapters import db, models  # noqa: E402,F401  (регистрирует таблицы в metadata)
+
+db.engine.echo = False
+
+# владелец → число записей; владелец с id == размеру датасета
+DATASET_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-max-rows",
+        type=int,
+        default=DATASET_SIZES[-1],
+        help="пропустить датасеты list_entries_user больше этого размера",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "dataset" in metafunc.fixturenames:
+        max_rows = metafunc.config.getoption("--bench-max-rows")
+        sizes = [n for n in DATASET_SIZES if n <= max_rows]
+        metafunc.parametrize("dataset", sizes, ids=[f"rows={n}" for n in sizes])
+
+
+def _seed(path: str, sizes: list[int]) -> None:
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO users (id, email, hashed_password, role, is_active) "
+        "VALUES (?, ?, 'x', 'user', 1)",
+        ((i, f"bench{i}@example.com") for i in range(1, len(sizes) + 1)),
+    )
+    batch = 50_000
+    for owner_id, rows in enumerate(sizes, start=1):
+        for start in range(0, rows, batch):
+            conn.executemany(
+                "INSERT INTO entries (title, kind, status, owner_id) "
+                "VALUES (?, 'book', 'planned', ?)",
+                (
+                    (f"entry {i}", owner_id)
+                    for i in range(start, min(start + batch, rows))
+                ),
+            )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def runner():
+    """Один event loop на сессию: benchmark() вызывает синхронную функцию."""
+    with asyncio.Runner() as r:
+        yield r
+        r.run(db.engine.dispose())
+    _TMP.cleanup()
+
+
+@pytest.fixture(scope="session")
+def owners(runner, pytestconfig) -> dict[int, int]:
+    """Размер датасета → owner_id; схема и строки создаются один раз."""
+
+    async def _create_all():
+        async with db.engine.begin() as conn:
+            await conn.run_sync(db.Base.metadata.create_all)
+
+    runner.run(_create_all())
+    max_rows = pytestconfig.getoption("--bench-max-rows")
+    sizes = [n for n in DATASET_SIZES if n <= max_rows]
+    _seed(_DB_PATH, sizes)
+    return {n: owner_id for owner_id, n in enumerate(sizes, start=1)}
+
+
+@pytest.fixture
+def session(runner, owners):
+    s = db.async_session_factory()
+    yield s
+    runner.run(s.close())
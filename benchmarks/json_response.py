@@ -0,0 +1,196 @@
+"""
+Сериализация GET /api/v1/entries?limit=200: jsonable_encoder + JSONResponse
+против EntryPage (скомпилированный pydantic-сериализатор, байты напрямую).
+
+Два замера: только сериализация страницы из 200 ORM-объектов и целый запрос
+через ASGI-приложение (без сети), где прежний хендлер собран в отдельном app
+с тем же стеком middleware.
+
+    python -m benchmarks.json_response [--rows 200] [--repeat 2000] [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def _entries(rows: int) -> list:
+    from adapters.models import Entry
+
+    return [
+        Entry(
+            id=i,
+            title=f"entry {i}",
+            kind="book",
+            status="planned",
+            link=f"https://example.com/{i}",
+            owner_id=1,
+        )
+        for i in range(rows, 0, -1)
+    ]
+
+
+def _time(fn, repeat: int) -> float:
+    fn()  # прогрев
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def _serialization(rows: int, repeat: int) -> tuple[float, float]:
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+
+    from app.responses import model_response
+    from domain.schemas import EntryPage
+
+    items = _entries(rows)
+
+    def legacy():
+        # то, что FastAPI делал с dict без response_model
+        body = {
+            "items": items,
+            "limit": rows,
+            "offset": 0,
+            "count": rows,
+            "next_cursor": None,
+        }
+        JSONResponse(jsonable_encoder(body))
+
+    def typed():
+        page = EntryPage(
+            items=items, limit=rows, offset=0, count=rows, next_cursor=None
+        )
+        model_response(page)
+
+    return _time(legacy, repeat), _time(typed, repeat)
+
+
+def _build_legacy_app():
+    from fastapi import Depends, FastAPI, HTTPException
+
+    from app.deps import Principal, get_principal, get_session
+    from app.errors import CorrelationIdMiddleware, http_exc_handler
+    from app.middleware import AuthMiddleware, DBSessionMiddleware
+    from services.entries import list_entries_user
+
+    legacy = FastAPI()
+    legacy.add_middleware(AuthMiddleware, prefixes=["/api/v1/entries"])
+    legacy.add_middleware(DBSessionMiddleware)
+    legacy.add_middleware(CorrelationIdMiddleware)
+    legacy.add_exception_handler(HTTPException, http_exc_handler)
+
+    @legacy.get("/api/v1/entries")
+    async def list_entries_ep(
+        limit: int = 50,
+        session=Depends(get_session),
+        principal: Principal = Depends(get_principal),
+    ):
+        items = await list_entries_user(session, principal.id, None, limit, 0)
+        return {
+            "items": items,
+            "limit": limit,
+            "offset": 0,
+            "count": len(items),
+            "next_cursor": None,
+        }
+
+    return legacy
+
+
+async def _call(app, headers, query: bytes) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/entries",
+        "raw_path": b"/api/v1/entries",
+        "root_path": "",
+        "query_string": query,
+        "headers": headers,
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def _run(app, headers, query: bytes, requests: int) -> float:
+    assert await _call(app, headers, query) == 200  # прогрев
+    started = time.perf_counter()
+    for _ in range(requests):
+        await _call(app, headers, query)
+    return (time.perf_counter() - started) / requests
+
+
+async def _main(args) -> None:
+    from adapters import db
+    from adapters.security import create_access_token
+    from app.main import app
+    from services.revocation import revocation_index
+
+    async with db.engine.begin() as conn:
+        await conn.run_sync(db.Base.metadata.create_all)
+        await conn.exec_driver_sql(
+            "INSERT INTO users (id, email, hashed_password, role, is_active) "
+            "VALUES (1, 'bench@example.com', 'x', 'user', 1)"
+        )
+        for i in range(args.rows):
+            await conn.exec_driver_sql(
+                "INSERT INTO entries (title, kind, status, link, owner_id) "
+                f"VALUES ('entry {i}', 'book', 'planned', 'https://example.com/{i}', 1)"
+            )
+    async with db.async_session_factory() as session:
+        await revocation_index.load(session)
+
+    token = create_access_token(subject=1, role="user", device="bench")
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    query = f"limit={args.rows}".encode()
+
+    legacy_ser, typed_ser = _serialization(args.rows, args.repeat)
+    legacy_req = await _run(_build_legacy_app(), headers, query, args.requests)
+    typed_req = await _run(app, headers, query, args.requests)
+
+    print(f"page of {args.rows} entries")
+    print(f"{'':24} {'legacy, ms':>12} {'typed, ms':>12} {'saved, ms':>12}")
+    for name, legacy, typed in (
+        ("serialization only", legacy_ser, typed_ser),
+        ("GET /api/v1/entries", legacy_req, typed_req),
+    ):
+        print(
+            f"{name:24} {legacy * 1000:>12.3f} {typed * 1000:>12.3f} "
+            f"{(legacy - typed) * 1000:>12.3f}"
+        )
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
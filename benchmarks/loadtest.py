@@ -0,0 +1,388 @@
+"""
+Сквозной нагрузочный прогон: register -> login -> list/create/patch -> refresh -> logout.
+
+Виртуальные пользователи идут по сценарию параллельно (--concurrency), действия
+над записями выбираются по весам (--mix) с фиксированным seed — прогон
+воспроизводим. По каждому маршруту считаются p50/p95/p99, среднее, ошибки и
+пропускная способность; результат пишется в JSON вместе с коммитом, чтобы
+сравнивать прогоны (--baseline — дельты p95 и req/s к прошлому файлу).
+
+Цели: in-process ASGI (httpx.ASGITransport, с lifespan приложения) или
+настоящий uvicorn в подпроцессе. БД: временный SQLite-файл или PostgreSQL
+(--database-url, по умолчанию DATABASE_URL из окружения).
+
+    python -m benchmarks.loadtest [--target asgi|uvicorn] [--db sqlite|postgres]
+        [--users 50] [--concurrency 10] [--actions 20] [--mix list=6,create=3,patch=1]
+        [--seed 1] [--output loadtest.json] [--baseline previous.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import httpx
+
+PASSWORD = "loadtest-password"
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Recorder:
+    """Латентности и статусы по шаблону маршрута ("PATCH /api/v1/entries/{id}")."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(
+        self, client: httpx.AsyncClient, route: str, url: str, **kwargs
+    ) -> httpx.Response:
+        method = route.split(" ", 1)[0]
+        started = time.perf_counter()
+        try:
+            res = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.latencies[route].append(time.perf_counter() - started)
+            self.errors[route] += 1
+            raise
+        self.latencies[route].append(time.perf_counter() - started)
+        self.statuses[route][res.status_code] += 1
+        if res.status_code >= 400:
+            self.errors[route] += 1
+        return res
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank перцентиль по отсортированному списку."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples: list[float], errors: int, duration: float) -> dict[str, Any]:
+    values = sorted(samples)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "rps": round(count / duration, 2) if duration else None,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else None,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if count else None,
+    }
+
+
+def _parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("list", "create", "patch"):
+            raise argparse.ArgumentTypeError(f"unknown action: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, rec: Recorder, n: int, run_id: str, args
+) -> None:
+    rnd = random.Random(args.seed * 1_000_003 + n)
+    email = f"load-{run_id}-{n}@example.com"
+    device = f"load-{n}"
+
+    await rec.request(
+        client,
+        "POST /api/v1/auth/register",
+        "/api/v1/auth/register",
+        json={"email": email, "password": PASSWORD, "device_id": device},
+    )
+    res = await rec.request(
+        client,
+        "POST /api/v1/auth/login",
+        "/api/v1/auth/login",
+        data={"username": email, "password": PASSWORD},
+        headers={"X-Device-Id": device},
+    )
+    if res.status_code != 200:
+        return
+    tokens = res.json()
+    auth = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    actions, weights = zip(*args.mix.items())
+    entry_ids: list[int] = []
+    for i in range(args.actions):
+        action = rnd.choices(actions, weights)[0]
+        if action == "patch" and not entry_ids:
+            action = "create"
+        if action == "list":
+            await rec.request(
+                client,
+                "GET /api/v1/entries",
+                "/api/v1/entries",
+                params={"limit": args.page_size},
+                headers=auth,
+            )
+        elif action == "create":
+            res = await rec.request(
+                client,
+                "POST /api/v1/entries",
+                "/api/v1/entries",
+                json={
+                    "title": f"entry {n}-{i}",
+                    "kind": rnd.choice(["book", "article"]),
+                },
+                headers=auth,
+            )
+            if res.status_code == 201:
+                entry_ids.append(res.json()["id"])
+        else:
+            entry_id = rnd.choice(entry_ids)
+            await rec.request(
+                client,
+                "PATCH /api/v1/entries/{entry_id}",
+                f"/api/v1/entries/{entry_id}",
+                json={"status": rnd.choice(["planned", "in_progress", "finished"])},
+                headers=auth,
+            )
+
+    res = await rec.request(
+        client,
+        "POST /api/v1/auth/refresh",
+        "/api/v1/auth/refresh",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    if res.status_code == 200:
+        tokens = res.json()
+        auth = {"Authorization": f"Bearer {tokens['access_token']}"}
+    await rec.request(
+        client,
+        "POST /api/v1/auth/logout",
+        "/api/v1/auth/logout",
+        json={"device_id": device, "refresh_token": tokens["refresh_token"]},
+        headers=auth,
+    )
+
+
+async def run_load(client: httpx.AsyncClient, args) -> tuple[Recorder, float]:
+    rec = Recorder()
+    sem = asyncio.Semaphore(args.concurrency)
+    run_id = uuid.uuid4().hex[:8]
+
+    async def one(n: int) -> None:
+        async with sem:
+            await virtual_user(client, rec, n, run_id, args)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(args.users)))
+    return rec, time.perf_counter() - started
+
+
+async def _create_schema() -> str:
+    from adapters import db, models  # noqa: F401  (регистрирует таблицы в metadata)
+
+    async with db.engine.begin() as conn:
+        await conn.run_sync(db.Base.metadata.create_all)
+    dialect = db.engine.dialect.name
+    await db.engine.dispose()
+    return dialect
+
+
+async def _run_asgi(args) -> tuple[Recorder, float]:
+    from app.main import app
+
+    # ASGITransport не шлёт lifespan: поднимаем его сами (индекс отзывов, writer)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=60
+        ) as client:
+            return await run_load(client, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not become ready in 30s")
+
+
+async def _run_uvicorn(args) -> tuple[Recorder, float]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=os.environ.copy(),
+        cwd=_REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits
+        ) as client:
+            await _wait_ready(client, proc)
+            return await run_load(client, args)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            cwd=_REPO_ROOT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def build_report(
+    rec: Recorder, duration: float, meta: dict[str, Any]
+) -> dict[str, Any]:
+    routes = {
+        route: {
+            **summarize(samples, rec.errors[route], duration),
+            "statuses": {str(k): v for k, v in sorted(rec.statuses[route].items())},
+        }
+        for route, samples in sorted(rec.latencies.items())
+    }
+    every = [s for samples in rec.latencies.values() for s in samples]
+    total = summarize(every, sum(rec.errors.values()), duration)
+    return {
+        "meta": meta,
+        "duration_s": round(duration, 3),
+        "total": total,
+        "routes": routes,
+    }
+
+
+def print_report(report: dict[str, Any], baseline: Optional[dict[str, Any]]) -> None:
+    header = f"{'route':34} {'count':>7} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}"
+    if baseline:
+        header += f" {'Δp95':>9} {'Δrps':>8}"
+    print(header)
+    rows = [*report["routes"].items(), ("TOTAL", report["total"])]
+    for route, r in rows:
+        line = (
+            f"{route:34} {r['count']:>7} {r['errors']:>5} {r['rps'] or 0:>9.1f} "
+            f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+        )
+        if baseline:
+            prev = (
+                baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+            )
+            if prev and prev["p95_ms"] and prev["rps"]:
+                d95 = (r["p95_ms"] - prev["p95_ms"]) / prev["p95_ms"] * 100
+                drps = ((r["rps"] or 0) - prev["rps"]) / prev["rps"] * 100
+                line += f" {d95:>+8.1f}% {drps:>+7.1f}%"
+        print(line)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("LOADTEST_DATABASE_URL") or os.getenv("DATABASE_URL"),
+        help="PostgreSQL URL для --db postgres (схема создаётся, если её нет)",
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--actions", type=int, default=20, help="действий на пользователя"
+    )
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument(
+        "--mix", type=_parse_mix, default=_parse_mix("list=6,create=3,patch=1")
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="loadtest.json")
+    parser.add_argument("--baseline", help="прошлый JSON-отчёт для сравнения")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db == "sqlite":
+            os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/loadtest.db"
+        else:
+            if not args.database_url or not args.database_url.startswith("postgresql"):
+                parser.error("--db postgres needs --database-url postgresql+...://")
+            os.environ["DATABASE_URL"] = args.database_url
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+        dialect = asyncio.run(_create_schema())
+        runner = _run_asgi if args.target == "asgi" else _run_uvicorn
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        rec, duration = asyncio.run(runner(args))
+
+    meta = {
+        "started_at": started_at,
+        "git_commit": _git_commit(),
+        "target": args.target,
+        "database": dialect,
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "actions": args.actions,
+        "page_size": args.page_size,
+        "mix": args.mix,
+        "seed": args.seed,
+        "python": platform.python_version(),
+    }
+    report = build_report(rec, duration, meta)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+    print(f"report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Сравнение стека middleware: старый (три BaseHTTPMiddleware) против чистого ASGI.
+
+ASGI-приложение вызывается напрямую, без сети и HTTP-клиента, так что в цифрах
+только стоимость стека и хендлера GET /api/v1/auth/me.
+
+    python -m benchmarks.middleware_stack [--requests 5000] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+
+def _legacy_middlewares():
+    """Копия прежних BaseHTTPMiddleware-реализаций — эталон для сравнения."""
+    import logging
+
+    from fastapi import Request, status
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from adapters.db import get_db_session
+    from adapters.security import decode_token_cached
+    from app.errors import problem
+    from services.tokens import is_jti_blacklisted
+
+    class CorrelationIdMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            cid = request.headers.get("X-Correlation-ID") or uuid.uuid4().hex
+            request.state.correlation_id = cid
+            response = await call_next(request)
+            response.headers["X-Correlation-ID"] = cid
+            return response
+
+    class AuthMiddleware(BaseHTTPMiddleware):
+        def __init__(self, app, prefixes: list[str]):
+            super().__init__(app)
+            self.prefixes = prefixes
+
+        async def dispatch(self, request: Request, call_next):
+            if not any(request.url.path.startswith(p) for p in self.prefixes):
+                return await call_next(request)
+            cid = getattr(request.state, "correlation_id", None)
+            auth_header = request.headers.get("Authorization") or ""
+            parts = auth_header.split(" ", 1)
+            if len(parts) != 2 or parts[0].lower() != "bearer":
+                return problem(
+                    status.HTTP_401_UNAUTHORIZED, "Unauthorized", "x", cid=cid
+                )
+            try:
+                payload = decode_token_cached(parts[1].strip())
+            except Exception:
+                return problem(
+                    status.HTTP_401_UNAUTHORIZED, "Unauthorized", "x", cid=cid
+                )
+            agen = get_db_session()
+            try:
+                session = await agen.__anext__()
+                blacklisted = await is_jti_blacklisted(session, payload["jti"])
+            finally:
+                await agen.aclose()
+            if blacklisted:
+                return problem(
+                    status.HTTP_401_UNAUTHORIZED, "Unauthorized", "x", cid=cid
+                )
+            request.state.user = {
+                "id": int(payload["sub"]),
+                "role": payload.get("role") or "user",
+                "claims": payload,
+            }
+            return await call_next(request)
+
+    class RequestLoggingMiddleware(BaseHTTPMiddleware):
+        def __init__(self, app):
+            super().__init__(app)
+            self.logger = logging.getLogger("app.request")
+
+        async def dispatch(self, request: Request, call_next):
+            response = await call_next(request)
+            user = getattr(request.state, "user", None)
+            self.logger.info(
+                "method=%s path=%s status=%s cid=%s user_id=%s",
+                request.method,
+                request.url.path,
+                response.status_code,
+                getattr(request.state, "correlation_id", None),
+                user.get("id") if isinstance(user, dict) else None,
+            )
+            return response
+
+    return CorrelationIdMiddleware, AuthMiddleware, RequestLoggingMiddleware
+
+
+def _build_legacy_app():
+    from fastapi import FastAPI, HTTPException
+
+    from app.errors import generic_exc_handler, http_exc_handler
+    from app.routers import auth as auth_router
+
+    correlation, auth, logging_mw = _legacy_middlewares()
+    legacy = FastAPI()
+    legacy.add_middleware(auth, prefixes=[f"{auth_router.router.prefix}/me"])
+    legacy.add_middleware(logging_mw)
+    legacy.add_middleware(correlation)
+    legacy.add_exception_handler(HTTPException, http_exc_handler)
+    legacy.add_exception_handler(Exception, generic_exc_handler)
+    legacy.include_router(auth_router.router)
+    return legacy
+
+
+async def _call(app, headers: list[tuple[bytes, bytes]]) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/auth/me",
+        "raw_path": b"/api/v1/auth/me",
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def _run(app, headers, requests: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            assert await _call(app, headers) == 200
+
+    await _call(app, headers)  # прогрев: роутинг, сборка middleware stack
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def _main(args) -> None:
+    from adapters import db
+    from adapters.security import create_access_token
+    from app.main import app
+    from services.revocation import revocation_index
+
+    async with db.engine.begin() as conn:
+        await conn.run_sync(db.Base.metadata.create_all)
+        # AuthMiddleware сверяет token_version пользователя
+        await conn.exec_driver_sql(
+            "INSERT INTO users (id, email, hashed_password, role, is_active) "
+            "VALUES (1, 'bench@example.com', 'x', 'user', 1)"
+        )
+    async with db.async_session_factory() as session:
+        await revocation_index.load(session)
+
+    token = create_access_token(subject=1, role="user", device="bench")
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+
+    legacy_rps = await _run(
+        _build_legacy_app(), headers, args.requests, args.concurrency
+    )
+    asgi_rps = await _run(app, headers, args.requests, args.concurrency)
+
+    print(
+        f"GET /api/v1/auth/me, {args.requests} requests, concurrency {args.concurrency}"
+    )
+    print(f"BaseHTTPMiddleware stack: {legacy_rps:10.0f} req/s")
+    print(f"pure ASGI stack:          {asgi_rps:10.0f} req/s")
+    print(f"speedup:                  {asgi_rps / legacy_rps:10.2f}x")
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Offset против keyset-пагинации на большом списке одного пользователя.
+
+Засевает SQLite-файл N записями (по умолчанию 1M) и замеряет выборку одной
+страницы list_entries_user на разной глубине: LIMIT/OFFSET растёт линейно,
+курсор (id < last_id) — константа.
+
+    python -m benchmarks.pagination [--rows 1000000] [--limit 50] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+
+def _seed(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO users (id, email, hashed_password, role, is_active) "
+        "VALUES (1, 'bench@example.com', 'x', 'user', 1)"
+    )
+    batch = 50_000
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO entries (title, kind, status, owner_id) "
+            "VALUES (?, 'book', 'planned', 1)",
+            ((f"entry {i}",) for i in range(start, min(start + batch, rows))),
+        )
+    conn.commit()
+    conn.close()
+
+
+async def _time_page(session, repeat: int, **kwargs) -> float:
+    from services.entries import list_entries_user
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = await list_entries_user(session, 1, None, **kwargs)
+        best = min(best, time.perf_counter() - started)
+        assert len(items) == kwargs["limit"]
+    return best
+
+
+async def _main(args, path: str) -> None:
+    from adapters import db, models  # noqa: F401  (регистрирует таблицы в metadata)
+
+    async with db.engine.begin() as conn:
+        await conn.run_sync(db.Base.metadata.create_all)
+    print(f"seeding {args.rows} entries ...", flush=True)
+    _seed(path, args.rows)
+
+    depths = [0, 1_000, 10_000, 100_000, args.rows // 2, args.rows - args.limit]
+    depths = sorted({d for d in depths if 0 <= d <= args.rows - args.limit})
+
+    print(f"{'depth':>10} {'offset, ms':>12} {'keyset, ms':>12}")
+    async with db.async_session_factory() as session:
+        for depth in depths:
+            offset_t = await _time_page(
+                session, args.repeat, limit=args.limit, offset=depth
+            )
+            # id последней строки предыдущей страницы: ids идут подряд, DESC
+            after_id = args.rows - depth + 1
+            keyset_t = await _time_page(
+                session, args.repeat, limit=args.limit, offset=0, after_id=after_id
+            )
+            print(f"{depth:>10} {offset_t * 1000:>12.2f} {keyset_t * 1000:>12.2f}")
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pagination.db")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+        asyncio.run(_main(args, path))
+
+
+if __name__ == "__main__":
+    main()
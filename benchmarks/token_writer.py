@@ -0,0 +1,89 @@
+"""
+Пропускная способность учёта токенов при шторме логинов: commit на каждую
+запись против group commit (services.token_writer).
+
+Каждый «логин» — отдельная сессия, как у HTTP-запроса, и один вызов
+create_refresh_record (bcrypt в замер не входит — он одинаков в обоих режимах).
+
+    python -m benchmarks.token_writer [--logins 2000] [--concurrency 100]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+
+async def _storm(logins: int, concurrency: int) -> float:
+    from adapters import db
+    from services.tokens import create_refresh_record
+
+    sem = asyncio.Semaphore(concurrency)
+    exp_ts = int(time.time()) + 1800
+
+    async def login() -> None:
+        async with sem:
+            async with db.async_session_factory() as session:
+                await create_refresh_record(
+                    session,
+                    user_id=1,
+                    jti=uuid.uuid4().hex,
+                    exp_ts=exp_ts,
+                    device_id="bench",
+                    user_agent="bench",
+                )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return logins / (time.perf_counter() - started)
+
+
+async def _main(args) -> None:
+    from adapters import db, models  # noqa: F401  (регистрирует таблицы в metadata)
+    from services import tokens
+    from services.token_writer import TokenWriter
+
+    async with db.engine.begin() as conn:
+        await conn.run_sync(db.Base.metadata.create_all)
+        await conn.exec_driver_sql(
+            "INSERT INTO users (id, email, hashed_password, role, is_active) "
+            "VALUES (1, 'bench@example.com', 'x', 'user', 1)"
+        )
+
+    direct = await _storm(args.logins, args.concurrency)
+
+    writer = TokenWriter(max_batch=args.max_batch, max_delay_ms=args.max_delay_ms)
+    tokens.token_writer = writer
+    writer.start()
+    grouped = await _storm(args.logins, args.concurrency)
+    await writer.stop()
+    stats = writer.stats()
+
+    print(f"{args.logins} logins, concurrency {args.concurrency}")
+    print(f"commit per record: {direct:10.0f} logins/s")
+    print(
+        f"group commit:      {grouped:10.0f} logins/s"
+        f"  (avg batch {stats['avg_batch']}, {stats['batches']} commits)"
+    )
+    print(f"speedup:           {grouped / direct:10.2f}x")
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,20 @@ class Settings(BaseSettings):
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8000
     LOG_LEVEL: str = "INFO"
+    # json — строка-объект на запись (для сборщика логов), text — key=value
+    LOG_FORMAT: str = "json"
+    # записи сверх очереди фонового writer'а отбрасываются (счётчик в admin/stats)
+    LOG_QUEUE_SIZE: int = 10_000
+    # доля успешных (< 400) запросов в логе; 4xx/5xx пишутся всегда
+    LOG_SAMPLE_RATE: float = 1.0
+    # SQLAlchemy echo: каждый SQL в лог — только для отладки
+    DB_ECHO: bool = False
+    # отладочные заголовки ответа (X-DB-Queries, X-DB-Time-ms); не для продакшена
+    DEBUG: bool = False
+    # WARNING в лог, если один и тот же SQL выполнен за запрос столько раз (0 — выкл)
+    QUERY_REPEAT_WARN_THRESHOLD: int = 10
+    # заголовок Server-Timing (jwt, user_state, revocation, db, bcrypt, serialize)
+    SERVER_TIMING_ENABLED: bool = False
 
     # JWT — принимаем JWT_SECRET_KEY, но кладём в поле JWT_SECRET
     JWT_SECRET: str = "dev-secret-change-me"
@@ -21,6 +35,54 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 5
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 30
+    # LRU уже проверенных access-токенов (0 — выключить)
+    JWT_CACHE_SIZE: int = 10_000
+
+    # Кэш user_id -> (token_version, is_active, role) для проверки токенов
+    USER_STATE_CACHE_SIZE: int = 10_000
+    USER_STATE_TTL_SECONDS: float = 30.0
+
+    # Password hashing (bcrypt в отдельном пуле потоков)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    # In-memory индекс отозванных access-токенов (перед revoked_tokens)
+    REVOCATION_CACHE_ENABLED: bool = True
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    # как часто воркер досинхронизирует индекс (отзывы из других процессов)
+    REVOCATION_SYNC_SECONDS: float = 5.0
+
+    # Group commit для refresh_tokens / revoked_tokens (login, refresh, logout)
+    TOKEN_WRITER_ENABLED: bool = True
+    TOKEN_WRITER_MAX_BATCH: int = 256
+    TOKEN_WRITER_MAX_DELAY_MS: float = 2.0
+
+    # Фоновая очистка просроченных refresh_tokens / revoked_tokens
+    PURGE_ENABLED: bool = True
+    PURGE_INTERVAL_SECONDS: float = 300.0
+    PURGE_BATCH_SIZE: int = 1_000
+    # пауза между батчами — ограничивает нагрузку удаления на БД
+    PURGE_BATCH_PAUSE_SECONDS: float = 0.05
+    # запас после expires_at (рассинхрон часов между воркерами)
+    PURGE_GRACE_SECONDS: int = 60
+
+    # Экспорт списка: строк на одну выборку серверного курсора / один chunk ответа
+    EXPORT_BATCH_SIZE: int = 500
+    # POST /api/v1/entries:batch — максимум операций в одном запросе
+    ENTRY_BATCH_MAX_OPS: int = 500
+    # Кэш готовых страниц GET /api/v1/entries (ключ включает версию списка)
+    ENTRY_LIST_CACHE_ENABLED: bool = True
+    ENTRY_LIST_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Профилирование: секрет подписи заголовка X-Profile (пусто — выключено),
+    # сколько профилей запросов хранить, предел работы сэмплирующего профайлера
+    PROFILING_SECRET: str = ""
+    PROFILE_STORE_SIZE: int = 32
+    PROFILER_MAX_SECONDS: float = 120.0
+
+    # GET /metrics (Prometheus) и инструментирование запросов, SQL, пула и bcrypt
+    METRICS_ENABLED: bool = True
 
     model_config = SettingsConfigDict(
         env_file=".env",
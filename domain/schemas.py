@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import Optional
+from typing import Annotated, Literal, Optional, Union
 
-from pydantic import BaseModel, ConfigDict, EmailStr, HttpUrl
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, HttpUrl
 
 
 class EntryKind(str, Enum):
@@ -39,6 +39,53 @@ class EntryInDB(EntryBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class EntryPage(BaseModel):
+    items: list[EntryInDB]
+    limit: int
+    offset: int
+    count: int
+    next_cursor: Optional[str] = None
+
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    data: EntryCreate
+
+
+class BatchPatch(BaseModel):
+    op: Literal["patch"]
+    id: int
+    data: EntryUpdate
+
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+class BatchTransition(BaseModel):
+    op: Literal["transition"]
+    id: int
+    status: EntryStatus
+    # если задан — переход применяется только из этого статуса (иначе 409)
+    from_status: Optional[EntryStatus] = None
+
+
+BatchOp = Annotated[
+    Union[BatchCreate, BatchPatch, BatchDelete, BatchTransition],
+    Field(discriminator="op"),
+]
+
+
+class EntryBatchRequest(BaseModel):
+    ops: list[BatchOp] = Field(min_length=1)
+
+
+class AdminUserUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    role: Optional[Literal["user", "admin"]] = None
+
+
 class UserListItem(BaseModel):
     id: int
     email: EmailStr
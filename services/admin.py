@@ -4,6 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from adapters.models import User
+from services.search import search_users_clause
 
 
 async def list_users(
@@ -11,17 +12,17 @@ async def list_users(
     limit: int,
     offset: int,
     q: Optional[str] = None,
+    after_id: Optional[int] = None,
 ) -> Sequence[User]:
-    stmt = select(User).order_by(User.id.asc()).limit(limit).offset(offset)
+    stmt = select(User)
     if q:
-        # простой ILIKE фильтр по email
-        stmt = (
-            select(User)
-            .where(User.email.ilike(f"%{q}%"))
-            .order_by(User.id.asc())
-            .limit(limit)
-            .offset(offset)
-        )
+        # индексный поиск по подстроке email (триграммы)
+        stmt = stmt.where(search_users_clause(session, q))
+    if after_id is not None:
+        # keyset: id ASC, следующая страница начинается после курсора
+        stmt = stmt.where(User.id > after_id).order_by(User.id.asc()).limit(limit)
+    else:
+        stmt = stmt.order_by(User.id.asc()).limit(limit).offset(offset)
 
     res = await session.execute(stmt)
     return res.scalars().all()
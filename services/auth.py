@@ -3,8 +3,9 @@ from typing import Optional, Sequence
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from adapters.hashing import hash_password_async, verify_password_async
 from adapters.models import User
-from adapters.security import hash_password, verify_password
+from services.search import search_users_clause
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
@@ -19,9 +20,8 @@ async def register_user(
     if existing:
         raise ValueError("EMAIL_TAKEN")
 
-    user = User(
-        email=email, hashed_password=hash_password(password), role=role, is_active=True
-    )
+    hashed = await hash_password_async(password)
+    user = User(email=email, hashed_password=hashed, role=role, is_active=True)
     session.add(user)
     await session.commit()
     await session.refresh(user)
@@ -34,7 +34,7 @@ async def authenticate_user(
     user = await get_user_by_email(session, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     if not user.is_active:
         return None
@@ -46,13 +46,7 @@ async def list_users(
 ) -> Sequence[User]:
     stmt = select(User).order_by(User.id.asc()).limit(limit).offset(offset)
     if q:
-        stmt = (
-            select(User)
-            .where(User.email.ilike(f"%{q}%"))
-            .order_by(User.id.asc())
-            .limit(limit)
-            .offset(offset)
-        )
+        stmt = stmt.where(search_users_clause(session, q))
 
     res = await session.execute(stmt)
     return res.scalars().all()
@@ -1,36 +1,86 @@
-from typing import Optional, Sequence
+from collections import Counter, defaultdict
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Row, bindparam, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from adapters.models import Entry
-from domain.schemas import EntryCreate, EntryStatus, EntryUpdate
+from adapters.models import Entry, EntryListVersion
+from domain.schemas import BatchOp, EntryCreate, EntryStatus, EntryUpdate
+
+
+def _db_values(data: EntryCreate | EntryUpdate, exclude_unset: bool) -> dict:
+    payload = data.model_dump(exclude_unset=exclude_unset)
+    if payload.get("link") is not None:
+        payload["link"] = str(payload["link"])
+    return payload
+
+
+_UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+async def bump_list_versions(session: AsyncSession, owner_ids: Iterable[int]) -> None:
+    """+1 к версии списков владельцев (ETag списка); коммитит вызывающий."""
+    owner_ids = sorted(set(owner_ids))  # один порядок блокировок строк
+    if not owner_ids:
+        return
+    upsert = _UPSERTS[session.get_bind().dialect.name](EntryListVersion)
+    stmt = upsert.on_conflict_do_update(
+        index_elements=[EntryListVersion.owner_id],
+        set_={"version": EntryListVersion.version + 1},
+    )
+    await session.execute(stmt, [{"owner_id": o, "version": 1} for o in owner_ids])
+
+
+async def get_list_version(session: AsyncSession, owner_id: int) -> int:
+    res = await session.execute(
+        select(EntryListVersion.version).where(EntryListVersion.owner_id == owner_id)
+    )
+    return res.scalar_one_or_none() or 0
+
+
+async def get_entry_version(
+    session: AsyncSession, entry_id: int, owner_id: Optional[int]
+) -> Optional[int]:
+    """Только версия записи (owner_id=None — любого владельца): для If-None-Match."""
+    stmt = select(Entry.version).where(Entry.id == entry_id)
+    if owner_id is not None:
+        stmt = stmt.where(Entry.owner_id == owner_id)
+    return (await session.execute(stmt)).scalar_one_or_none()
 
 
 async def create_entry(
     session: AsyncSession, owner_id: int, data: EntryCreate
 ) -> Entry:
-    payload = data.model_dump()
-    if payload.get("link") is not None:
-        payload["link"] = str(payload["link"])
-    obj = Entry(**payload, owner_id=owner_id)
+    obj = Entry(**_db_values(data, exclude_unset=False), owner_id=owner_id)
     session.add(obj)
+    await bump_list_versions(session, [owner_id])
     await session.commit()
-    await session.refresh(obj)
+    # id, version и default'ы известны после flush, expire_on_commit=False —
+    # повторный SELECT не нужен
     return obj
 
 
+def _paginate(stmt, limit: int, offset: int, after_id: Optional[int]):
+    # списки идут по id DESC; keyset (after_id) не зависит от глубины страницы
+    if after_id is not None:
+        return stmt.where(Entry.id < after_id).order_by(Entry.id.desc()).limit(limit)
+    return stmt.order_by(Entry.id.desc()).limit(limit).offset(offset)
+
+
 async def list_entries_user(
     session: AsyncSession,
     owner_id: int,
     status: Optional[EntryStatus],
     limit: int,
     offset: int,
+    after_id: Optional[int] = None,
 ) -> Sequence[Entry]:
     stmt = select(Entry).where(Entry.owner_id == owner_id)
     if status:
         stmt = stmt.where(Entry.status == status)
-    stmt = stmt.order_by(Entry.id.desc()).limit(limit).offset(offset)
+    stmt = _paginate(stmt, limit, offset, after_id)
     res = await session.execute(stmt)
     return res.scalars().all()
 
@@ -41,17 +91,48 @@ async def list_entries_admin(
     limit: int,
     offset: int,
     owner_id: Optional[int] = None,
+    after_id: Optional[int] = None,
 ) -> Sequence[Entry]:
     stmt = select(Entry)
     if owner_id is not None:
         stmt = stmt.where(Entry.owner_id == owner_id)
     if status:
         stmt = stmt.where(Entry.status == status)
-    stmt = stmt.order_by(Entry.id.desc()).limit(limit).offset(offset)
+    stmt = _paginate(stmt, limit, offset, after_id)
     res = await session.execute(stmt)
     return res.scalars().all()
 
 
+EXPORT_COLUMNS = ("id", "title", "kind", "link", "status", "owner_id")
+_ENTRY_COLUMNS = tuple(getattr(Entry, c) for c in EXPORT_COLUMNS)
+
+
+async def stream_entries(
+    session: AsyncSession,
+    owner_id: Optional[int],
+    status: Optional[EntryStatus],
+    batch_size: int,
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Все записи (owner_id=None — всех владельцев) пачками по batch_size.
+    Серверный курсор + yield_per: в памяти только текущая пачка кортежей,
+    ORM-объекты не создаются.
+    """
+    stmt = select(*_ENTRY_COLUMNS)
+    if owner_id is not None:
+        stmt = stmt.where(Entry.owner_id == owner_id)
+    if status:
+        stmt = stmt.where(Entry.status == status)
+    stmt = stmt.order_by(Entry.id.desc()).execution_options(yield_per=batch_size)
+
+    result = await session.stream(stmt)
+    try:
+        async for batch in result.partitions():
+            yield batch
+    finally:
+        await result.close()
+
+
 async def get_entry_for_owner(
     session: AsyncSession, owner_id: int, entry_id: int
 ) -> Optional[Entry]:
@@ -66,19 +147,165 @@ async def get_entry_any(session: AsyncSession, entry_id: int) -> Optional[Entry]
     return res.scalars().first()
 
 
+async def _flush_versioned(session: AsyncSession) -> None:
+    # UPDATE/DELETE ... AND version=? не нашёл строку — её успели изменить
+    try:
+        await session.flush()
+    except StaleDataError as e:
+        raise ValueError("VERSION_MISMATCH") from e
+
+
 async def update_entry(
     session: AsyncSession, entry: Entry, patch: EntryUpdate
 ) -> Entry:
-    payload = patch.model_dump(exclude_unset=True)
-    if payload.get("link") is not None:
-        payload["link"] = str(payload["link"])
-    for k, v in payload.items():
+    for k, v in _db_values(patch, exclude_unset=True).items():
         setattr(entry, k, v)
+    if session.is_modified(entry):
+        await _flush_versioned(session)
+        await bump_list_versions(session, [entry.owner_id])
     await session.commit()
-    await session.refresh(entry)
     return entry
 
 
 async def delete_entry(session: AsyncSession, entry: Entry) -> None:
+    owner_id = entry.owner_id
     await session.delete(entry)
+    await _flush_versioned(session)
+    await bump_list_versions(session, [owner_id])
+    await session.commit()
+
+
+async def apply_batch(
+    session: AsyncSession,
+    ops: Sequence[BatchOp],
+    owner_id: int,
+    scope_owner_id: Optional[int],
+) -> list[dict[str, Any]]:
+    """
+    Пакет операций над записями в одной транзакции.
+
+    owner_id — владелец создаваемых записей; scope_owner_id — чьи записи можно
+    менять (None — любые, для админа). Права проверяются одним запросом на все
+    id; изменения идут bulk INSERT ... RETURNING и set-based UPDATE/DELETE.
+    Результат — по элементу на операцию: {"status", "id", "entry"} либо
+    {"status", "id", "error"} с кодом ошибки (NOT_FOUND, DUPLICATE_ID,
+    STATUS_CONFLICT); ошибочные операции пропускаются, остальные применяются.
+    """
+    results: list[Optional[dict[str, Any]]] = [None] * len(ops)
+
+    # id, упомянутый несколькими операциями, — конфликт: порядок неоднозначен
+    refs = Counter(op.id for op in ops if op.op != "create")
+    for i, op in enumerate(ops):
+        if op.op != "create" and refs[op.id] > 1:
+            results[i] = {"status": 409, "id": op.id, "error": "DUPLICATE_ID"}
+
+    targets = [entry_id for entry_id, n in refs.items() if n == 1]
+    allowed: dict[int, int] = {}  # id -> owner_id
+    if targets:
+        stmt = select(Entry.id, Entry.owner_id).where(Entry.id.in_(targets))
+        if scope_owner_id is not None:
+            stmt = stmt.where(Entry.owner_id == scope_owner_id)
+        allowed = dict((await session.execute(stmt)).all())
+
+    creates: list[int] = []
+    patches: dict[tuple[str, ...], list[int]] = defaultdict(list)
+    transitions: dict[tuple, list[int]] = defaultdict(list)
+    deletes: list[int] = []
+    patch_values: dict[int, dict] = {}
+    for i, op in enumerate(ops):
+        if results[i] is not None:
+            continue
+        if op.op == "create":
+            creates.append(i)
+        elif op.id not in allowed:
+            # чужая или несуществующая — как и одиночные ручки, отвечаем 404
+            results[i] = {"status": 404, "id": op.id, "error": "NOT_FOUND"}
+        elif op.op == "patch":
+            patch_values[i] = _db_values(op.data, exclude_unset=True)
+            patches[tuple(sorted(patch_values[i]))].append(i)
+        elif op.op == "transition":
+            transitions[(op.from_status, op.status)].append(i)
+        else:
+            deletes.append(i)
+
+    if creates:
+        stmt = insert(Entry).returning(*_ENTRY_COLUMNS)
+        rows = await session.execute(
+            stmt,
+            [
+                {**_db_values(ops[i].data, exclude_unset=False), "owner_id": owner_id}
+                for i in creates
+            ],
+        )
+        # один многострочный INSERT: id выдаются в порядке VALUES, а порядок строк
+        # RETURNING не гарантирован — сопоставляем по возрастанию id
+        # (sort_by_parameter_order на SQLite откатывается к INSERT на строку)
+        for i, row in zip(creates, sorted(rows.all(), key=lambda r: r.id)):
+            results[i] = {"status": 201, "id": row.id, "entry": row}
+
+    touched: dict[int, int] = {}  # id -> индекс операции, чей результат — запись
+    table = Entry.__table__
+    for columns, indexes in patches.items():
+        if columns:
+            # UPDATE по первичному ключу: один executemany на набор колонок;
+            # Core, а не ORM bulk — тот требует версию каждой строки
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(version=table.c.version + 1)
+            )
+            await session.execute(
+                stmt,
+                [{"b_id": ops[i].id, **patch_values[i]} for i in indexes],
+            )
+        touched.update((ops[i].id, i) for i in indexes)
+
+    for (from_status, to_status), indexes in transitions.items():
+        stmt = update(Entry).where(Entry.id.in_([ops[i].id for i in indexes]))
+        if from_status is not None:
+            stmt = stmt.where(Entry.status == from_status)
+        res = await session.execute(
+            stmt.values(status=to_status, version=Entry.version + 1)
+            .returning(Entry.id)
+            .execution_options(synchronize_session=False)
+        )
+        moved = set(res.scalars().all())
+        for i in indexes:
+            if ops[i].id in moved:
+                touched[ops[i].id] = i
+            else:
+                results[i] = {
+                    "status": 409,
+                    "id": ops[i].id,
+                    "error": "STATUS_CONFLICT",
+                }
+
+    if deletes:
+        await session.execute(
+            delete(Entry)
+            .where(Entry.id.in_([ops[i].id for i in deletes]))
+            .execution_options(synchronize_session=False)
+        )
+        for i in deletes:
+            results[i] = {"status": 204, "id": ops[i].id}
+
+    if touched:
+        rows = await session.execute(
+            select(*_ENTRY_COLUMNS).where(Entry.id.in_(list(touched)))
+        )
+        for row in rows.all():
+            results[touched[row.id]] = {"status": 200, "id": row.id, "entry": row}
+        # executemany UPDATE не даёт RETURNING (ни SQLite, ни asyncpg): строка,
+        # удалённая параллельно после проверки прав, видна только здесь
+        for entry_id, i in touched.items():
+            if results[i] is None:
+                results[i] = {"status": 404, "id": entry_id, "error": "NOT_FOUND"}
+
+    owners = {allowed[entry_id] for entry_id in touched}
+    owners.update(allowed[ops[i].id] for i in deletes)
+    if creates:
+        owners.add(owner_id)
+    await bump_list_versions(session, owners)
+
     await session.commit()
+    return results
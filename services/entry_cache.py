@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from config import settings
+
+# грубая оценка памяти на ключ и служебные структуры одной записи
+_ENTRY_OVERHEAD = 256
+
+
+class ByteLRU:
+    """LRU в памяти процесса, ограниченный суммарным размером значений."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, bytes] = OrderedDict()
+        self.nbytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        cost = len(value) + _ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.nbytes -= len(old) + _ENTRY_OVERHEAD
+        while self._data and self.nbytes + cost > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.nbytes -= len(evicted) + _ENTRY_OVERHEAD
+            self.evictions += 1
+        self._data[key] = value
+        self.nbytes += cost
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.nbytes = 0
+        self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class EntryListCache:
+    """
+    Готовые тела страниц списка записей одного владельца.
+
+    В ключ входит версия списка из entry_list_versions: create/update/delete
+    и batch повышают её в своей транзакции, поэтому после записи старые
+    страницы больше не совпадают ни в одном воркере — явная инвалидация не
+    нужна, устаревшие тела уходят из LRU первыми.
+    """
+
+    def __init__(self, backend: ByteLRU, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(owner_id: int, version: int, *params: Any) -> tuple:
+        return ("entries", owner_id, version, *params)
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        body = self.backend.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        if self.enabled:
+            self.backend.set(key, body)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            **self.backend.stats(),
+        }
+
+
+entry_list_cache = EntryListCache(
+    ByteLRU(settings.ENTRY_LIST_CACHE_MAX_BYTES),
+    enabled=settings.ENTRY_LIST_CACHE_ENABLED,
+)
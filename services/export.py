@@ -0,0 +1,60 @@
+"""Сериализация потока записей (services.entries.stream_entries) в NDJSON/CSV."""
+
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Row
+
+from services.entries import EXPORT_COLUMNS
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+# начало ячейки, которое Excel/LibreOffice считают формулой (CSV injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _plain(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def ndjson_chunks(batches: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    # один chunk на пачку курсора: первая пачка уходит клиенту сразу
+    async for batch in batches:
+        yield b"".join(
+            json.dumps(
+                {c: _plain(v) for c, v in zip(EXPORT_COLUMNS, row)},
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ).encode()
+            + b"\n"
+            for row in batch
+        )
+
+
+async def csv_chunks(batches: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buf.getvalue().encode()
+    async for batch in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_csv_cell(v) for v in row] for row in batch)
+        yield buf.getvalue().encode()
+
+
+EXPORT_WRITERS = {"ndjson": ndjson_chunks, "csv": csv_chunks}
@@ -0,0 +1,28 @@
+import base64
+import binascii
+import json
+
+
+def encode_cursor(last_id: int) -> str:
+    """Непрозрачный курсор keyset-пагинации: id последней строки страницы."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = data["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("INVALID_CURSOR")
+    if not isinstance(last_id, int) or isinstance(last_id, bool) or last_id < 0:
+        raise ValueError("INVALID_CURSOR")
+    return last_id
+
+
+def next_cursor(items, limit: int) -> str | None:
+    # полная страница — возможно, есть следующая
+    if len(items) < limit or not items:
+        return None
+    return encode_cursor(items[-1].id)
@@ -0,0 +1,194 @@
+"""
+Очистка просроченных строк refresh_tokens / revoked_tokens.
+
+Строка с expires_at в прошлом больше не нужна: сам JWT уже не пройдёт проверку
+exp. Удаляем небольшими батчами в порядке (expires_at, id) — keyset по индексу
+ix_*_expires_at_id, каждый батч в своей короткой транзакции, с паузой между
+батчами, чтобы не мешать основной нагрузке.
+
+Фоновая задача стартует в lifespan приложения; разовый запуск из CLI:
+
+    python -m services.purge [--batch-size 1000] [--pause 0.05]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from adapters import db
+from adapters.models import RefreshToken, RevokedToken
+from config import settings
+
+logger = logging.getLogger("services.purge")
+
+PURGED_MODELS = (RefreshToken, RevokedToken)
+
+
+async def purge_expired(
+    session: AsyncSession,
+    model,
+    cutoff: datetime,
+    batch_size: int,
+    pause: float = 0.0,
+) -> int:
+    """Удаляет строки model с expires_at < cutoff; возвращает число удалённых."""
+    purged = 0
+    last: Optional[tuple] = None
+    while True:
+        stmt = select(model.expires_at, model.id).where(model.expires_at < cutoff)
+        if last is not None:
+            stmt = stmt.where(tuple_(model.expires_at, model.id) > tuple_(*last))
+        stmt = stmt.order_by(model.expires_at, model.id).limit(batch_size)
+        keys = (await session.execute(stmt)).all()
+        if not keys:
+            break
+
+        await session.execute(
+            delete(model)
+            .where(model.id.in_([k.id for k in keys]))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        purged += len(keys)
+        last = tuple(keys[-1])
+
+        if len(keys) < batch_size:
+            break
+        if pause:
+            await asyncio.sleep(pause)
+    return purged
+
+
+async def table_size(session: AsyncSession, model) -> int:
+    res = await session.execute(select(func.count()).select_from(model))
+    return res.scalar_one()
+
+
+class TokenPurger:
+    """Периодическая очистка в фоне + счётчики для /api/v1/admin/stats."""
+
+    def __init__(
+        self, interval: float, batch_size: int, pause: float, grace_seconds: int
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.grace = timedelta(seconds=grace_seconds)
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.errors = 0
+        self.purged: dict[str, int] = {m.__tablename__: 0 for m in PURGED_MODELS}
+        self.table_rows: dict[str, Optional[int]] = {
+            m.__tablename__: None for m in PURGED_MODELS
+        }
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration = 0.0
+
+    async def run_once(self, session: AsyncSession) -> dict[str, int]:
+        started = time.perf_counter()
+        cutoff = datetime.now(timezone.utc) - self.grace
+        purged = {}
+        for model in PURGED_MODELS:
+            name = model.__tablename__
+            purged[name] = await purge_expired(
+                session, model, cutoff, self.batch_size, self.pause
+            )
+            self.purged[name] += purged[name]
+            self.table_rows[name] = await table_size(session, model)
+
+        self.runs += 1
+        self.last_run_at = datetime.now(timezone.utc)
+        self.last_duration = time.perf_counter() - started
+        logger.info(
+            "token purge done purged=%s rows=%s duration_ms=%.1f",
+            purged,
+            self.table_rows,
+            self.last_duration * 1000,
+        )
+        return purged
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                async with db.async_session_factory() as session:
+                    await self.run_once(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.warning("token purge failed", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._loop(), name="token-purge")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "errors": self.errors,
+            "purged": dict(self.purged),
+            "table_rows": dict(self.table_rows),
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_duration_ms": round(self.last_duration * 1000, 3),
+        }
+
+
+purger = TokenPurger(
+    interval=settings.PURGE_INTERVAL_SECONDS,
+    batch_size=settings.PURGE_BATCH_SIZE,
+    pause=settings.PURGE_BATCH_PAUSE_SECONDS,
+    grace_seconds=settings.PURGE_GRACE_SECONDS,
+)
+
+
+async def _main(args) -> None:
+    runner = TokenPurger(
+        interval=0,
+        batch_size=args.batch_size,
+        pause=args.pause,
+        grace_seconds=args.grace,
+    )
+    async with db.async_session_factory() as session:
+        purged = await runner.run_once(session)
+    for name, count in purged.items():
+        print(f"{name}: purged {count}, remaining {runner.table_rows[name]}")
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=settings.PURGE_BATCH_SIZE)
+    parser.add_argument(
+        "--pause", type=float, default=settings.PURGE_BATCH_PAUSE_SECONDS
+    )
+    parser.add_argument("--grace", type=int, default=settings.PURGE_GRACE_SECONDS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
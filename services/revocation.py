@@ -0,0 +1,200 @@
+import hashlib
+import heapq
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from adapters.models import RevokedToken
+from config import settings
+
+# запас при инкрементальной досинхронизации: строки, закоммиченные чуть позже
+# своего created_at (другие воркеры), всё равно попадут в выборку
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _ts(dt: datetime) -> float:
+    # SQLite возвращает naive datetime — в БД всё хранится в UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class BloomFilter:
+    """Классический Bloom filter: «нет» — точно нет, «да» — возможно."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(
+            int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))), 8
+        )
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationIndex:
+    """
+    In-memory индекс отозванных JTI перед таблицей revoked_tokens.
+
+    Записи живут до expires_at токена: после этого токен всё равно не пройдёт
+    проверку exp, и запись вытесняется. Bloom filter отвечает «не отозван» без
+    обращения к БД; положительный ответ подтверждается по словарю, а если JTI
+    там нет (ложное срабатывание фильтра) — решает БД.
+    Индекс считается авторитетным только после load() (warm).
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        sync_interval: float,
+        enabled: bool = True,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        self._expiry: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._bloom_stale = 0  # вытесненные ключи, чьи биты остались в фильтре
+        self.warm = False
+        self._synced_at = 0.0
+        self._watermark: Optional[datetime] = None
+        self._syncing = False
+        self.hits = 0
+        self.misses = 0
+        self.bloom_negatives = 0
+        self.false_positives = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def add(self, jti: str, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        if jti not in self._expiry:
+            self._bloom.add(jti)
+            heapq.heappush(self._heap, (expires_at, jti))
+        self._expiry[jti] = expires_at
+
+    def add_row(self, jti: str, expires_at: datetime) -> None:
+        self.add(jti, _ts(expires_at))
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        removed = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            exp, jti = heapq.heappop(heap)
+            if self._expiry.get(jti) == exp:
+                del self._expiry[jti]
+                removed += 1
+        if removed:
+            self.evicted += removed
+            self._bloom_stale += removed
+            # из Bloom filter удалять нельзя — пересобираем, когда «мусора» много
+            if self._bloom_stale > max(len(self._expiry), 1024):
+                self._rebuild_bloom()
+        return removed
+
+    def _rebuild_bloom(self) -> None:
+        bloom = BloomFilter(max(self.capacity, len(self._expiry)), self.error_rate)
+        for jti in self._expiry:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._bloom_stale = 0
+
+    def lookup(self, jti: str) -> Optional[bool]:
+        """True/False — ответ из памяти; None — нужно спросить БД."""
+        if jti not in self._bloom:
+            self.hits += 1
+            self.bloom_negatives += 1
+            return False
+
+        exp = self._expiry.get(jti)
+        if exp is None:
+            self.false_positives += 1
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return exp > time.time()
+
+    def needs_sync(self) -> bool:
+        return (
+            self.sync_interval > 0
+            and not self._syncing
+            and time.monotonic() - self._synced_at >= self.sync_interval
+        )
+
+    async def load(self, session: AsyncSession) -> int:
+        """Полная (первый раз) или инкрементальная загрузка из revoked_tokens."""
+        self._syncing = True
+        try:
+            now = datetime.now(timezone.utc)
+            stmt = select(RevokedToken.jti, RevokedToken.expires_at).where(
+                RevokedToken.expires_at > now
+            )
+            if self._watermark is not None:
+                stmt = stmt.where(RevokedToken.created_at >= self._watermark)
+
+            res = await session.execute(stmt)
+            loaded = 0
+            for jti, expires_at in res.all():
+                self.add_row(jti, expires_at)
+                loaded += 1
+
+            self._watermark = now - _SYNC_OVERLAP
+            self._synced_at = time.monotonic()
+            self.warm = True
+        finally:
+            self._syncing = False
+        self.evict_expired()
+        return loaded
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "warm": self.warm,
+            "size": len(self._expiry),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "bloom_negatives": self.bloom_negatives,
+            "false_positives": self.false_positives,
+            "evicted": self.evicted,
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hashes,
+        }
+
+
+revocation_index = RevocationIndex(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+    sync_interval=settings.REVOCATION_SYNC_SECONDS,
+    enabled=settings.REVOCATION_CACHE_ENABLED,
+)
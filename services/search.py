@@ -0,0 +1,49 @@
+"""
+Поиск пользователей по подстроке email (q) — один бэкенд для админки и auth.
+
+Семантика q везде одинаковая: регистронезависимое вхождение подстроки,
+символы % и _ трактуются буквально.
+
+- PostgreSQL: ILIKE '%q%' обслуживается GIN-индексом pg_trgm (ix_users_email_trgm);
+- SQLite: FTS5-таблица users_email_fts с tokenizer trigram, синхронизируется
+  триггерами (см. adapters/models.py);
+- q короче трёх символов триграммами не ищется — обычный ILIKE.
+"""
+
+from sqlalchemy import ColumnElement, literal_column, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from adapters.models import User
+
+TRIGRAM_MIN_LEN = 3
+
+_USERS_EMAIL_FTS = (
+    "SELECT rowid FROM users_email_fts WHERE users_email_fts MATCH :fts_q"
+)
+
+
+def _like_pattern(q: str) -> str:
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _fts_phrase(q: str) -> str:
+    # строка целиком — одна фраза FTS5: кавычки удваиваются, операторы не работают
+    return '"' + q.replace('"', '""') + '"'
+
+
+def email_search_clause(q: str, dialect: str) -> ColumnElement[bool]:
+    """WHERE-условие для User по подстроке q под конкретный диалект."""
+    if dialect == "sqlite" and len(q) >= TRIGRAM_MIN_LEN:
+        matched = (
+            text(_USERS_EMAIL_FTS)
+            .bindparams(fts_q=_fts_phrase(q))
+            .columns(literal_column("rowid"))
+        )
+        return User.id.in_(matched)
+    # postgresql: ILIKE с ведущим % использует gin_trgm_ops-индекс
+    return User.email.ilike(_like_pattern(q), escape="\\")
+
+
+def search_users_clause(session: AsyncSession, q: str) -> ColumnElement[bool]:
+    return email_search_clause(q, session.get_bind().dialect.name)
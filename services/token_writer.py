@@ -0,0 +1,208 @@
+"""
+Group commit для учёта токенов (refresh_tokens / revoked_tokens).
+
+Вместо commit на каждый login/refresh записи копятся в очереди и сбрасываются
+одной транзакцией раз в TOKEN_WRITER_MAX_DELAY_MS или по TOKEN_WRITER_MAX_BATCH
+элементов: подряд идущие однотипные операции — одним многострочным INSERT /
+set-based UPDATE. Вызывающий ждёт future, который разрешается только после
+commit своей пачки, поэтому токен отдаётся клиенту, когда запись уже в БД.
+
+Порядок: очередь FIFO, пачка применяется в порядке постановки, следующая
+пачка — только после commit предыдущей. Поэтому отзыв девайса, поставленный
+после выдачи refresh, гасит и этот refresh.
+"""
+
+import asyncio
+import logging
+import time
+from itertools import groupby
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import insert, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from adapters import db
+from adapters.models import RefreshToken, RevokedToken
+from config import settings
+
+logger = logging.getLogger("services.token_writer")
+
+
+async def _insert_refresh(session: AsyncSession, rows: list[dict]) -> None:
+    await session.execute(insert(RefreshToken).values(rows))
+
+
+async def _insert_revoked(session: AsyncSession, rows: list[dict]) -> None:
+    await session.execute(insert(RevokedToken).values(rows))
+
+
+async def _revoke_devices(session: AsyncSession, pairs: list[tuple]) -> None:
+    await session.execute(
+        update(RefreshToken)
+        .where(
+            tuple_(RefreshToken.user_id, RefreshToken.device_id).in_(pairs),
+            RefreshToken.revoked.is_(False),
+        )
+        .values(revoked=True)
+    )
+
+
+_APPLY: dict[str, Callable[[AsyncSession, list], Awaitable[None]]] = {
+    "refresh": _insert_refresh,
+    "revoked": _insert_revoked,
+    "revoke_device": _revoke_devices,
+}
+
+_Item = tuple[str, Any, asyncio.Future]
+
+
+class TokenWriter:
+    def __init__(self, max_batch: int, max_delay_ms: float):
+        self.max_batch = max(max_batch, 1)
+        self.max_delay = max_delay_ms / 1000
+        self._pending: list[_Item] = []
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._failed = False
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+        self.flush_time_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        return (
+            self._task is not None
+            and not self._task.done()
+            and not self._stopping
+            and not self._failed
+        )
+
+    def start(self) -> None:
+        if self.running:
+            return
+        # события привязываются к текущему event loop
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._failed = False
+        self._task = asyncio.create_task(self._run(), name="token-writer")
+
+    async def stop(self) -> None:
+        """Дописывает очередь и останавливает задачу."""
+        task = self._task
+        if task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._full.set()
+        try:
+            await task
+        finally:
+            self._task = None
+
+    async def submit(self, kind: str, payload: Any) -> None:
+        """Ставит операцию в очередь и ждёт commit пачки, в которую она попала."""
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((kind, payload, fut))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        await fut
+
+    async def _run(self) -> None:
+        batch: list[_Item] = []
+        try:
+            while True:
+                await self._wakeup.wait()
+                if (
+                    not self._stopping
+                    and len(self._pending) < self.max_batch
+                    and self.max_delay > 0
+                ):
+                    # копим пачку: до max_delay или пока не наберётся max_batch
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.max_delay)
+                    except asyncio.TimeoutError:
+                        pass
+
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+                if len(self._pending) < self.max_batch and not self._stopping:
+                    self._full.clear()
+                if not self._pending:
+                    self._wakeup.clear()
+
+                if batch:
+                    await self._flush(batch)
+                    batch = []
+                if self._stopping and not self._pending:
+                    return
+        except BaseException as exc:
+            # задача больше не разбирает очередь: новые записи идут напрямую
+            # (running=False), а ждущие — получают ошибку, а не висят вечно
+            self._failed = True
+            waiting, self._pending = batch + self._pending, []
+            for _, _, fut in waiting:
+                if fut.done():
+                    continue
+                if isinstance(exc, asyncio.CancelledError):
+                    fut.cancel()
+                else:
+                    fut.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            logger.exception("token writer stopped")
+
+    async def _flush(self, batch: list[_Item]) -> None:
+        started = time.perf_counter()
+        try:
+            async with db.async_session_factory() as session:
+                for kind, group in groupby(batch, key=lambda item: item[0]):
+                    await _APPLY[kind](session, [payload for _, payload, _ in group])
+                await session.commit()
+        except Exception as exc:
+            self.failed_batches += 1
+            if len(batch) > 1:
+                # одна плохая запись (например, дубль jti) не должна ронять
+                # остальных — доприменяем по одной, ошибка достанется только ей
+                logger.warning("token batch failed, retrying items one by one")
+                for item in batch:
+                    await self._flush([item])
+                return
+            _, _, fut = batch[0]
+            if not fut.done():
+                fut.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.flush_time_total += time.perf_counter() - started
+        for _, _, fut in batch:
+            if not fut.done():
+                fut.set_result(None)
+
+    def stats(self) -> dict[str, Any]:
+        batches = self.batches or 1
+        return {
+            "running": self.running,
+            "queued": len(self._pending),
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / batches, 2),
+            "largest_batch": self.largest_batch,
+            "failed_batches": self.failed_batches,
+            "flush_ms_avg": round(self.flush_time_total / batches * 1000, 3),
+        }
+
+
+token_writer = TokenWriter(
+    max_batch=settings.TOKEN_WRITER_MAX_BATCH,
+    max_delay_ms=settings.TOKEN_WRITER_MAX_DELAY_MS,
+)
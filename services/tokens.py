@@ -4,7 +4,11 @@ from typing import Optional
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from adapters.models import RefreshToken, RevokedToken
+from adapters.models import RefreshToken, RevokedToken, User
+from adapters.timing import span
+from services.revocation import revocation_index
+from services.token_writer import token_writer
+from services.user_state import UserState
 
 
 def _dt(ts: int) -> datetime:
@@ -20,15 +24,20 @@ async def create_refresh_record(
     device_id: str,
     user_agent: Optional[str],
 ) -> None:
-    session.add(
-        RefreshToken(
-            user_id=user_id,
-            jti=jti,
-            device_id=device_id,
-            user_agent=user_agent,
-            expires_at=_dt(exp_ts),
-        )
-    )
+    values = {
+        "user_id": user_id,
+        "jti": jti,
+        "device_id": device_id,
+        "user_agent": user_agent,
+        "revoked": False,
+        "expires_at": _dt(exp_ts),
+        "created_at": datetime.now(timezone.utc),
+    }
+    # group commit: вернётся, когда пачка с этой записью закоммичена
+    if token_writer.running:
+        await token_writer.submit("refresh", values)
+        return
+    session.add(RefreshToken(**values))
     await session.commit()
 
 
@@ -41,9 +50,76 @@ async def revoke_refresh_by_jti(session: AsyncSession, jti: str) -> None:
     await session.commit()
 
 
+async def rotate_refresh(
+    session: AsyncSession,
+    *,
+    jti: str,
+    user_id: int,
+    version: int,
+    new_jti: str,
+    new_exp_ts: int,
+    device_id: str,
+    user_agent: Optional[str],
+) -> UserState:
+    """
+    Атомарная ротация refresh-токена; возвращает состояние пользователя
+    (для новых токенов).
+
+    Compare-and-swap: UPDATE ... WHERE jti=? AND revoked=false RETURNING версию,
+    активность и роль владельца — из двух одновременных запросов с одним
+    токеном строку получит только один. Гашение старого и вставка нового —
+    одна транзакция, один commit.
+    """
+
+    def _owner(column):
+        return select(column).where(owner).correlate(RefreshToken).scalar_subquery()
+
+    owner = User.id == RefreshToken.user_id
+    res = await session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == jti,
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked.is_(False),
+        )
+        .values(revoked=True)
+        # подзапросы, а не UPDATE ... FROM users: SQLite не отдаёт в RETURNING
+        # колонки присоединённых таблиц
+        .returning(
+            _owner(User.token_version), _owner(User.is_active), _owner(User.role)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    row = res.first()
+    if row is None:
+        # нет записи, уже отозван или повторное использование — одинаково 401;
+        # UPDATE ничего не изменил, откатывать нечего
+        raise ValueError("REFRESH_REVOKED")
+    state = UserState(row[0], bool(row[1]), row[2] or "user")
+    if not state.is_active or version < state.version:
+        # старый токен гасим в любом случае, новый не выдаём
+        await session.commit()
+        raise ValueError("USER_INACTIVE" if not state.is_active else "REFRESH_REVOKED")
+
+    session.add(
+        RefreshToken(
+            user_id=user_id,
+            jti=new_jti,
+            device_id=device_id,
+            user_agent=user_agent,
+            expires_at=_dt(new_exp_ts),
+        )
+    )
+    await session.commit()
+    return state
+
+
 async def revoke_refresh_for_device(
     session: AsyncSession, user_id: int, device_id: str
 ) -> None:
+    if token_writer.running:
+        await token_writer.submit("revoke_device", (user_id, device_id))
+        return
     await session.execute(
         update(RefreshToken)
         .where(
@@ -70,17 +146,38 @@ async def blacklist(
     user_id: int,
     exp_ts: int,
 ) -> None:
-    session.add(
-        RevokedToken(
-            user_id=user_id,
-            jti=jti,
-            token_type=token_type,
-            expires_at=_dt(exp_ts),
-        )
-    )
-    await session.commit()
+    values = {
+        "user_id": user_id,
+        "jti": jti,
+        "token_type": token_type,
+        "expires_at": _dt(exp_ts),
+        "created_at": datetime.now(timezone.utc),
+    }
+    if token_writer.running:
+        await token_writer.submit("revoked", values)
+    else:
+        session.add(RevokedToken(**values))
+        await session.commit()
+    revocation_index.add(jti, exp_ts)
 
 
 async def is_jti_blacklisted(session: AsyncSession, jti: str) -> bool:
+    with span("revocation"):
+        return await _is_jti_blacklisted(session, jti)
+
+
+async def _is_jti_blacklisted(session: AsyncSession, jti: str) -> bool:
+    index = revocation_index
+    if index.enabled and index.warm:
+        if index.needs_sync():
+            await index.load(session)
+        index.evict_expired()
+        known = index.lookup(jti)
+        if known is not None:
+            return known
+
     q = await session.execute(select(RevokedToken).where(RevokedToken.jti == jti))
-    return q.scalar_one_or_none() is not None
+    row = q.scalar_one_or_none()
+    if row is not None and index.enabled:
+        index.add_row(jti, row.expires_at)
+    return row is not None
@@ -0,0 +1,160 @@
+import time
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from adapters.models import User
+from adapters.timing import span
+from config import settings
+
+
+class UserState(NamedTuple):
+    version: int
+    is_active: bool
+    role: str
+
+
+class UserStateCache:
+    """
+    Process-local кэш user_id -> UserState. Записи в этом процессе
+    инвалидируют его сразу; изменения из других воркеров видны не позже TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: dict[int, tuple[float, UserState]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[UserState]:
+        item = self._data.get(user_id)
+        if item is None or item[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item[1]
+
+    def put(self, user_id: int, state: UserState) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        if len(self._data) >= self.maxsize and user_id not in self._data:
+            # вытесняем самую старую запись (dict хранит порядок вставки)
+            del self._data[next(iter(self._data))]
+        self._data[user_id] = (time.monotonic() + self.ttl, state)
+
+    def invalidate(self, user_id: int) -> None:
+        self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+user_state_cache = UserStateCache(
+    maxsize=settings.USER_STATE_CACHE_SIZE, ttl=settings.USER_STATE_TTL_SECONDS
+)
+
+
+_INVALIDATE_KEY = "user_state_invalidate"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_write(mapper, connection, target: User) -> None:
+    # любые ORM-записи в users (не только bump_token_version) сбрасывают кэш,
+    # но после commit: flush ещё не виден другим соединениям, и параллельный
+    # запрос успел бы положить в кэш старую закоммиченную строку
+    session = object_session(target)
+    if session is None:
+        user_state_cache.invalidate(target.id)
+        return
+    session.info.setdefault(_INVALIDATE_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop(_INVALIDATE_KEY, ()):
+        user_state_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_INVALIDATE_KEY, None)
+
+
+async def get_user_state(session: AsyncSession, user_id: int) -> Optional[UserState]:
+    """Версия токенов, активность и роль пользователя; None — пользователя нет."""
+    state = user_state_cache.get(user_id)
+    if state is not None:
+        return state
+
+    with span("user_state"):
+        res = await session.execute(
+            select(User.token_version, User.is_active, User.role).where(
+                User.id == user_id
+            )
+        )
+        row = res.first()
+    if row is None:
+        return None
+    state = UserState(row.token_version, bool(row.is_active), row.role or "user")
+    user_state_cache.put(user_id, state)
+    return state
+
+
+async def bump_token_version(
+    session: AsyncSession,
+    user_id: int,
+    *,
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+) -> UserState:
+    """
+    Одно UPDATE: token_version + 1 (и, если заданы, is_active/role). Все ранее
+    выданные токены пользователя становятся устаревшими.
+    """
+    values: dict[str, Any] = {"token_version": User.token_version + 1}
+    if is_active is not None:
+        values["is_active"] = is_active
+    if role is not None:
+        values["role"] = role
+
+    res = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(**values)
+        .returning(User.token_version, User.is_active, User.role)
+        .execution_options(synchronize_session=False)
+    )
+    row = res.first()
+    if row is None:
+        raise ValueError("USER_NOT_FOUND")
+    await session.commit()
+
+    state = UserState(row.token_version, bool(row.is_active), row.role or "user")
+    user_state_cache.invalidate(user_id)
+    return state
+
+
+def token_is_current(claims: dict[str, Any], state: Optional[UserState]) -> bool:
+    """Токен выдан для текущей версии активного пользователя (без "ver" — версия 0)."""
+    return (
+        state is not None
+        and state.is_active
+        and int(claims.get("ver", 0)) >= state.version
+    )
@@ -1,7 +1,9 @@
 # ruff: noqa: E402
 import asyncio
 import os
+import re
 import sys
+from contextlib import contextmanager
 from typing import AsyncGenerator
 
 import pytest
@@ -14,10 +16,14 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
-from adapters import models
+from adapters import db, models
 from adapters.db import Base, get_db_session
+from adapters.query_recorder import record_queries
 from adapters.security import hash_password
+from app.deps import Principal
 from app.main import app
+from services.entry_cache import entry_list_cache
+from services.user_state import user_state_cache
 
 
 # ------------------------
@@ -94,15 +100,39 @@ async def session(engine) -> AsyncGenerator[AsyncSession, None]:
                     await outer.rollback()
 
 
+# ------------------------
+# Process-local кэши: id пользователей переиспользуются после отката теста
+# ------------------------
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    user_state_cache.clear()
+    entry_list_cache.clear()
+    yield
+    user_state_cache.clear()
+    entry_list_cache.clear()
+
+
 # ------------------------
 # Override get_session
 # ------------------------
 @pytest.fixture(autouse=True)
-def override_get_session(session: AsyncSession):
+def override_get_session(session: AsyncSession, monkeypatch):
     async def _dep():
         # отдаём РОВНО тот же объект сессии, что в фикстуре
         yield session
 
+    def _request_session() -> AsyncSession:
+        # на соединении теста, commit -> savepoint; session разрешается лениво —
+        # в синхронных тестах это ещё async-генератор
+        return AsyncSession(
+            bind=session.bind,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+
+    # роуты берут сессию запроса (RequestSession из DBSessionMiddleware и
+    # get_session без middleware), а не get_db_session — подменяем её фабрику
+    monkeypatch.setattr(db, "async_session_factory", _request_session)
     app.dependency_overrides[get_db_session] = _dep
     yield
     app.dependency_overrides.pop(get_db_session, None)
@@ -176,3 +206,41 @@ def entry_factory():
         return e
 
     return _create
+
+
+@pytest.fixture()
+def principal_for():
+    """Principal пользователя, как его собирает get_principal после AuthMiddleware."""
+
+    def _make(user) -> Principal:
+        return Principal(id=user.id, role=user.role, claims={"role": user.role})
+
+    return _make
+
+
+# ------------------------
+# Бюджет SQL на эндпойнт
+# ------------------------
+_HARNESS_STATEMENT = re.compile(r"(RELEASE |ROLLBACK TO )?SAVEPOINT ")
+
+
+@pytest.fixture()
+def assert_max_queries():
+    """
+    with assert_max_queries(3): ... — падает, если внутри выполнено больше
+    statement'ов; в сообщении — сами запросы.
+    """
+
+    @contextmanager
+    def _check(limit: int):
+        with record_queries(capture=True) as recorder:
+            yield recorder
+        # savepoint'ы — от тестовой транзакции (commit сессии запроса), в проде их нет
+        statements = [s for s in recorder.statements if not _HARNESS_STATEMENT.match(s)]
+        if len(statements) > limit:
+            listing = "\n".join(f"  {i}. {s}" for i, s in enumerate(statements, 1))
+            pytest.fail(
+                f"expected at most {limit} queries, got {len(statements)}:\n{listing}"
+            )
+
+    return _check
@@ -145,3 +145,17 @@ async def test_list_entries_admin_with_status(session: AsyncSession, user_factor
     )
     titles_progress = {e.title for e in progress_only}
     assert titles_progress == {"InProgress"}
+
+
+async def test_list_entries_user_keyset_pages(session, user_factory, entry_factory):
+    u = await user_factory(session, "keyset@example.com")
+    for i in range(5):
+        await entry_factory(session, owner_id=u.id, title=f"K{i}")
+
+    first = await list_entries_user(session, u.id, None, 2, 0)
+    second = await list_entries_user(session, u.id, None, 2, 0, after_id=first[-1].id)
+    third = await list_entries_user(session, u.id, None, 2, 0, after_id=second[-1].id)
+
+    ids = [e.id for e in (*first, *second, *third)]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 5
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from fastapi import Response
+from httpx import AsyncClient
+
+from adapters.security import create_access_token
+from app.routers.admin import list_users_ep
+from app.routers.entries import list_entries_ep
+from services.pagination import decode_cursor, encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+def _auth(user) -> dict[str, str]:
+    token = create_access_token(subject=user.id, role=user.role, device="dev")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_cursor_roundtrip_and_garbage():
+    assert decode_cursor(encode_cursor(42)) == 42
+    for bad in ("", "not-base64!", encode_cursor(-1), "eyJpZCI6IngifQ"):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+async def test_list_entries_cursor_pagination(
+    session, user_factory, entry_factory, principal_for
+):
+    u = await user_factory(session, "cursor-api@example.com")
+    for i in range(5):
+        await entry_factory(session, owner_id=u.id, title=f"C{i}")
+
+    seen: list[int] = []
+    cursor = None
+    for _ in range(3):
+        response = await list_entries_ep(
+            principal=principal_for(u),
+            entry_status=None,
+            limit=2,
+            offset=0,
+            owner_id=None,
+            cursor=cursor,
+            if_none_match=None,
+            session=session,
+        )
+        body = json.loads(response.body)
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 5
+    assert seen == sorted(seen, reverse=True)
+    assert cursor is None
+
+
+async def test_list_entries_rejects_bad_cursor(
+    client: AsyncClient, session, user_factory
+):
+    u = await user_factory(session, "cursor-bad@example.com")
+
+    res = await client.get(
+        "/api/v1/entries", params={"cursor": "garbage"}, headers=_auth(u)
+    )
+    assert res.status_code == 400
+
+    res = await client.get(
+        "/api/v1/entries",
+        params={"cursor": encode_cursor(10), "offset": 5},
+        headers=_auth(u),
+    )
+    assert res.status_code == 400
+
+
+async def test_admin_list_users_next_cursor_header(
+    session, user_factory, principal_for
+):
+    admin = await user_factory(session, "cursor-admin@example.com", role="admin")
+    for i in range(4):
+        await user_factory(session, f"cursor-page-{i}@example.com")
+
+    async def page(cursor):
+        response = Response()
+        users = await list_users_ep(
+            response,
+            limit=2,
+            offset=0,
+            q="cursor-page-",
+            cursor=cursor,
+            session=session,
+            admin=principal_for(admin),
+        )
+        return [u.id for u in users], response.headers.get("X-Next-Cursor")
+
+    first, cursor = await page(None)
+    assert len(first) == 2 and cursor
+
+    second, last_cursor = await page(cursor)
+    assert len(second) == 2
+    assert min(second) > max(first)
+
+    rest, _ = await page(last_cursor)
+    assert rest == []
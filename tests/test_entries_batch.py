@@ -0,0 +1,202 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from pydantic import ValidationError
+from sqlalchemy import Select, delete, event, select
+
+from adapters.models import Entry
+from adapters.security import create_access_token
+from app.routers.entries import batch_entries_ep
+from config import settings
+from domain.schemas import EntryBatchRequest
+
+pytestmark = pytest.mark.anyio
+
+
+async def _batch(session, principal, ops):
+    response = await batch_entries_ep(
+        EntryBatchRequest(ops=ops), principal=principal, session=session
+    )
+    return json.loads(response.body)
+
+
+async def test_batch_mixed_operations(
+    session, user_factory, entry_factory, principal_for
+):
+    u = await user_factory(session, "batch-mixed@example.com")
+    to_patch = await entry_factory(session, owner_id=u.id, title="old")
+    to_move = await entry_factory(session, owner_id=u.id, status="planned")
+    to_drop = await entry_factory(session, owner_id=u.id)
+
+    body = await _batch(
+        session,
+        principal_for(u),
+        [
+            {"op": "create", "data": {"title": "n1", "kind": "book"}},
+            {"op": "create", "data": {"title": "n2", "kind": "article"}},
+            {"op": "patch", "id": to_patch.id, "data": {"title": "new"}},
+            {"op": "transition", "id": to_move.id, "status": "in_progress"},
+            {"op": "delete", "id": to_drop.id},
+        ],
+    )
+    results = body["results"]
+
+    assert (body["succeeded"], body["failed"]) == (5, 0)
+    assert [r["status"] for r in results] == [201, 201, 200, 200, 204]
+    assert [r["entry"]["title"] for r in results[:2]] == ["n1", "n2"]
+    assert results[0]["entry"]["owner_id"] == u.id
+    assert results[2]["entry"]["title"] == "new"
+    assert results[3]["entry"]["status"] == "in_progress"
+
+    rows = await session.execute(select(Entry.id).where(Entry.owner_id == u.id))
+    ids = set(rows.scalars().all())
+    assert to_drop.id not in ids
+    assert {results[0]["id"], results[1]["id"], to_patch.id} <= ids
+
+
+async def test_batch_per_item_problems(
+    session, user_factory, entry_factory, principal_for
+):
+    me = await user_factory(session, "batch-me@example.com")
+    other = await user_factory(session, "batch-other@example.com")
+    mine = await entry_factory(session, owner_id=me.id, status="finished")
+    twice = await entry_factory(session, owner_id=me.id)
+    foreign = await entry_factory(session, owner_id=other.id, title="keep")
+
+    body = await _batch(
+        session,
+        principal_for(me),
+        [
+            {"op": "delete", "id": foreign.id},
+            {"op": "patch", "id": twice.id, "data": {"title": "a"}},
+            {"op": "delete", "id": twice.id},
+            {
+                "op": "transition",
+                "id": mine.id,
+                "status": "in_progress",
+                "from_status": "planned",
+            },
+            {"op": "create", "data": {"title": "ok", "kind": "book"}},
+        ],
+    )
+    results = body["results"]
+
+    assert [r["status"] for r in results] == [404, 409, 409, 409, 201]
+    assert (body["succeeded"], body["failed"]) == (1, 4)
+    assert results[0]["type"] == "urn:errors:batch:not-found"
+    assert results[0]["title"] == "Not Found" and results[0]["detail"]
+    assert results[1]["type"] == results[2]["type"] == "urn:errors:batch:duplicate-id"
+    assert results[3]["type"] == "urn:errors:batch:status-conflict"
+
+    # чужая запись не тронута, пропущенные операции не применены
+    assert (await session.get(Entry, foreign.id)) is not None
+    await session.refresh(twice)
+    assert twice.title == "t"
+
+
+async def test_batch_patch_of_row_deleted_after_ownership_check(
+    session, user_factory, entry_factory, principal_for, monkeypatch
+):
+    me = await user_factory(session, "batch-race@example.com")
+    gone = await entry_factory(session, owner_id=me.id)
+    kept = await entry_factory(session, owner_id=me.id)
+
+    execute = session.execute
+    raced: list[bool] = []
+
+    async def execute_with_race(stmt, *args, **kwargs):
+        result = await execute(stmt, *args, **kwargs)
+        if not raced and isinstance(stmt, Select):
+            # параллельный DELETE между проверкой прав и UPDATE
+            raced.append(True)
+            await execute(delete(Entry).where(Entry.id == gone.id))
+        return result
+
+    monkeypatch.setattr(session, "execute", execute_with_race)
+    body = await _batch(
+        session,
+        principal_for(me),
+        [
+            {"op": "patch", "id": gone.id, "data": {"title": "x"}},
+            {"op": "patch", "id": kept.id, "data": {"title": "y"}},
+        ],
+    )
+
+    assert [r["status"] for r in body["results"]] == [404, 200]
+    assert body["results"][0]["type"] == "urn:errors:batch:not-found"
+    assert body["results"][1]["entry"]["title"] == "y"
+
+
+async def test_admin_batch_reaches_any_owner(
+    session, user_factory, entry_factory, principal_for
+):
+    admin = await user_factory(session, "batch-admin@example.com", role="admin")
+    u = await user_factory(session, "batch-owned@example.com")
+    e = await entry_factory(session, owner_id=u.id)
+
+    body = await _batch(
+        session, principal_for(admin), [{"op": "patch", "id": e.id, "data": {}}]
+    )
+    assert body["results"][0]["status"] == 200
+    assert body["results"][0]["entry"]["owner_id"] == u.id
+
+
+async def test_batch_is_set_based(
+    session, engine, user_factory, entry_factory, principal_for
+):
+    u = await user_factory(session, "batch-sql@example.com")
+    existing = [await entry_factory(session, owner_id=u.id) for _ in range(3)]
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()[:3]).upper())
+
+    ops = [
+        {"op": "create", "data": {"title": f"c{i}", "kind": "book"}} for i in range(20)
+    ]
+    ops += [{"op": "delete", "id": e.id} for e in existing]
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    try:
+        await _batch(session, principal_for(u), ops)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+
+    # права одним SELECT, один INSERT ... RETURNING на 20 строк, один DELETE
+    # и один upsert версии списка владельца
+    verbs = [s.split()[0] for s in statements]
+    assert verbs.count("SELECT") == 1
+    assert verbs.count("DELETE") == 1
+    assert statements.count("INSERT INTO ENTRIES") == 1
+    assert statements.count("INSERT INTO ENTRY_LIST_VERSIONS") == 1
+
+
+async def test_batch_limits(session, user_factory, monkeypatch, principal_for):
+    u = await user_factory(session, "batch-limit@example.com")
+    monkeypatch.setattr(settings, "ENTRY_BATCH_MAX_OPS", 1)
+    with pytest.raises(HTTPException) as exc:
+        await _batch(
+            session,
+            principal_for(u),
+            [{"op": "delete", "id": 1}, {"op": "delete", "id": 2}],
+        )
+    assert exc.value.status_code == 413
+
+    with pytest.raises(ValidationError):
+        EntryBatchRequest(ops=[])
+    with pytest.raises(ValidationError):
+        EntryBatchRequest(ops=[{"op": "create", "data": {"title": "x"}}])
+
+
+async def test_batch_route(client: AsyncClient, session, user_factory):
+    u = await user_factory(session, "batch-route@example.com")
+    token = create_access_token(subject=u.id, role=u.role, device="dev")
+
+    res = await client.post(
+        "/api/v1/entries:batch",
+        json={"ops": [{"op": "create", "data": {"title": "r", "kind": "book"}}]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 200
+    assert res.json()["results"][0]["entry"]["title"] == "r"
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.routers.entries import list_entries_ep
+from domain.schemas import EntryCreate, EntryUpdate
+from services.entries import create_entry, update_entry
+from services.entry_cache import (
+    _ENTRY_OVERHEAD,
+    ByteLRU,
+    EntryListCache,
+    entry_list_cache,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def _list(session, principal, owner_id=None):
+    response = await list_entries_ep(
+        entry_status=None,
+        limit=50,
+        offset=0,
+        owner_id=owner_id,
+        cursor=None,
+        if_none_match=None,
+        session=session,
+        principal=principal,
+    )
+    return [item["title"] for item in json.loads(response.body)["items"]]
+
+
+def test_byte_lru_bounded_by_size():
+    lru = ByteLRU(max_bytes=3 * (_ENTRY_OVERHEAD + 10))
+    for key in "abc":
+        lru.set(key, b"x" * 10)
+    assert lru.get("a") == b"x" * 10  # "a" теперь самый свежий
+
+    lru.set("d", b"y" * 10)
+    assert lru.get("b") is None and lru.get("a") is not None
+    assert lru.nbytes == 3 * (_ENTRY_OVERHEAD + 10)
+    assert lru.stats()["evictions"] == 1
+
+    lru.set("huge", b"z" * lru.max_bytes)  # больше всего кэша — не кладём
+    assert lru.get("huge") is None and len(lru) == 3
+
+
+def test_disabled_cache_is_transparent():
+    cache = EntryListCache(ByteLRU(1024), enabled=False)
+    key = cache.key(1, 0, None, 50, 0, None)
+    cache.put(key, b"{}")
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+async def test_list_served_from_cache_until_write(
+    session, engine, user_factory, principal_for
+):
+    user = await user_factory(session, "cache-list@example.com")
+    admin = await user_factory(session, "cache-admin@example.com", role="admin")
+    principal = principal_for(user)
+    item = await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+
+    assert await _list(session, principal) == ["A"]
+    statements: list[str] = []
+
+    def _log(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _log)
+    try:
+        assert await _list(session, principal) == ["A"]
+        # админский список того же владельца — та же страница
+        admin_principal = principal_for(admin)
+        assert await _list(session, admin_principal, owner_id=user.id) == ["A"]
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _log)
+
+    assert not any("FROM entries" in s for s in statements)
+    assert entry_list_cache.stats()["hits"] == 2
+
+    await update_entry(session, item, EntryUpdate(title="B"))
+    assert await _list(session, principal) == ["B"]
+    await create_entry(session, user.id, EntryCreate(title="C", kind="book"))
+    assert await _list(session, principal) == ["C", "B"]
@@ -0,0 +1,182 @@
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import event, update
+
+from adapters.models import Entry
+from adapters.security import create_access_token
+from app.etags import entry_etag, if_match, none_match
+from app.routers.entries import (
+    delete_entry_ep,
+    get_entry_ep,
+    list_entries_ep,
+    update_entry_ep,
+)
+from domain.schemas import EntryBatchRequest, EntryCreate, EntryUpdate
+from services.entries import apply_batch, create_entry, get_list_version, update_entry
+
+pytestmark = pytest.mark.anyio
+
+
+async def _list(session, principal, if_none_match=None):
+    return await list_entries_ep(
+        entry_status=None,
+        limit=50,
+        offset=0,
+        owner_id=None,
+        cursor=None,
+        if_none_match=if_none_match,
+        session=session,
+        principal=principal,
+    )
+
+
+def test_precondition_matching():
+    etag = entry_etag(5, 3)
+    assert etag == '"e5.3"'
+    assert none_match('"x", "e5.3"', etag)
+    assert none_match('W/"e5.3"', etag)
+    assert none_match("*", etag)
+    assert not none_match(None, etag) and not none_match('"e5.2"', etag)
+
+    assert if_match('"e5.3"', etag) and if_match("*", etag)
+    assert not if_match('W/"e5.3"', etag)  # If-Match — строгое сравнение
+    assert not if_match('"e5.2"', etag)
+
+
+async def test_list_not_modified_without_loading_rows(
+    session, engine, user_factory, principal_for
+):
+    user = await user_factory(session, "etag-list@example.com")
+    await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+
+    first = await _list(session, principal_for(user))
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    statements: list[str] = []
+
+    def _log(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _log)
+    try:
+        cached = await _list(session, principal_for(user), if_none_match=etag)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _log)
+
+    assert cached.status_code == 304 and cached.body == b""
+    assert cached.headers["ETag"] == etag
+    assert len(statements) == 1 and "entry_list_versions" in statements[0]
+
+    # любая запись владельца меняет версию списка
+    await create_entry(session, user.id, EntryCreate(title="B", kind="book"))
+    fresh = await _list(session, principal_for(user), if_none_match=etag)
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+
+
+async def test_get_entry_conditional(session, user_factory, principal_for):
+    user = await user_factory(session, "etag-get@example.com")
+    item = await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+    etag = entry_etag(item.id, item.version)
+
+    async def get(header):
+        return await get_entry_ep(
+            item.id,
+            if_none_match=header,
+            session=session,
+            principal=principal_for(user),
+        )
+
+    assert (await get(None)).headers["ETag"] == etag
+    assert (await get(etag)).status_code == 304
+    assert (await get('"e0.0"')).status_code == 200
+
+
+async def test_if_match_on_patch_and_delete(session, user_factory, principal_for):
+    user = await user_factory(session, "etag-patch@example.com")
+    item = await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+    principal = principal_for(user)
+    old = entry_etag(item.id, item.version)
+    list_version = await get_list_version(session, user.id)
+
+    res = await update_entry_ep(
+        item.id,
+        EntryUpdate(title="B"),
+        if_match=old,
+        session=session,
+        principal=principal,
+    )
+    assert res.status_code == 200
+    assert res.headers["ETag"] == entry_etag(item.id, 2)
+    assert await get_list_version(session, user.id) == list_version + 1
+
+    for call in (
+        update_entry_ep(
+            item.id,
+            EntryUpdate(title="C"),
+            if_match=old,
+            session=session,
+            principal=principal,
+        ),
+        delete_entry_ep(item.id, if_match=old, session=session, principal=principal),
+    ):
+        with pytest.raises(HTTPException) as exc:
+            await call
+        assert exc.value.status_code == 412
+
+    await delete_entry_ep(
+        item.id,
+        if_match=res.headers["ETag"],
+        session=session,
+        principal=principal,
+    )
+
+
+async def test_concurrent_write_is_detected(session, user_factory):
+    user = await user_factory(session, "etag-race@example.com")
+    item = await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+
+    # другой запрос успел изменить строку после того, как мы её прочитали
+    await session.execute(
+        update(Entry)
+        .where(Entry.id == item.id)
+        .values(version=Entry.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    with pytest.raises(ValueError, match="VERSION_MISMATCH"):
+        await update_entry(session, item, EntryUpdate(title="B"))
+
+
+async def test_batch_bumps_versions(session, user_factory):
+    user = await user_factory(session, "etag-batch@example.com")
+    item = await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+    before = await get_list_version(session, user.id)
+
+    ops = EntryBatchRequest(
+        ops=[
+            {"op": "patch", "id": item.id, "data": {"title": "B"}},
+            {"op": "create", "data": {"title": "C", "kind": "book"}},
+        ]
+    ).ops
+    results = await apply_batch(session, ops, user.id, user.id)
+    await session.refresh(item)
+    assert results[0]["status"] == 200
+    assert item.version == 2
+    assert await get_list_version(session, user.id) == before + 1
+
+
+async def test_conditional_get_over_http(client: AsyncClient, session, user_factory):
+    user = await user_factory(session, "etag-http@example.com")
+    item = await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+    token = create_access_token(subject=user.id, role=user.role, device="d")
+
+    res = await client.get(
+        f"/api/v1/entries/{item.id}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "If-None-Match": entry_etag(item.id, item.version),
+        },
+    )
+    assert res.status_code == 304
+    assert res.headers["ETag"] == entry_etag(item.id, item.version)
@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+
+from adapters.security import create_access_token
+from app.routers.entries import export_entries_ep
+from config import settings
+from domain.schemas import EntryStatus
+
+pytestmark = pytest.mark.anyio
+
+
+async def _export(session, principal, fmt="ndjson", **params) -> list[bytes]:
+    response = await export_entries_ep(
+        principal=principal,
+        export_format=fmt,
+        entry_status=params.get("entry_status"),
+        owner_id=params.get("owner_id"),
+        session=session,
+    )
+    return [chunk async for chunk in response.body_iterator]
+
+
+def _ndjson(chunks: list[bytes]) -> list[dict]:
+    return [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+async def test_export_ndjson_streams_own_entries_in_batches(
+    session, user_factory, entry_factory, monkeypatch, principal_for
+):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    me = await user_factory(session, "export-me@example.com")
+    other = await user_factory(session, "export-other@example.com")
+    for i in range(5):
+        await entry_factory(session, owner_id=me.id, title=f"Книга {i}")
+    await entry_factory(session, owner_id=other.id, title="чужая")
+
+    chunks = await _export(session, principal_for(me))
+    rows = _ndjson(chunks)
+
+    assert len(chunks) == 3  # 2 + 2 + 1: отдаётся пачками курсора
+    assert [r["title"] for r in rows] == [f"Книга {i}" for i in reversed(range(5))]
+    assert {r["owner_id"] for r in rows} == {me.id}
+    assert rows[0]["kind"] == "article" and rows[0]["status"] == "planned"
+
+
+async def test_export_csv_has_header_and_status_filter(
+    session, user_factory, entry_factory, principal_for
+):
+    me = await user_factory(session, "export-csv@example.com")
+    await entry_factory(session, owner_id=me.id, title='a, "quoted"', status="finished")
+    await entry_factory(session, owner_id=me.id, title="b")
+
+    chunks = await _export(
+        session, principal_for(me), "csv", entry_status=EntryStatus.finished
+    )
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+
+    assert rows[0] == ["id", "title", "kind", "link", "status", "owner_id"]
+    assert [r[1] for r in rows[1:]] == ['a, "quoted"']
+    assert rows[1][4] == "finished"
+
+
+async def test_export_csv_neutralizes_formulas(
+    session, user_factory, entry_factory, principal_for
+):
+    me = await user_factory(session, "export-formula@example.com")
+    await entry_factory(session, owner_id=me.id, title='=HYPERLINK("http://x")')
+    await entry_factory(session, owner_id=me.id, title="-1 chapter")
+
+    chunks = await _export(session, principal_for(me), "csv")
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert [r[1] for r in rows[1:]] == ["'-1 chapter", '\'=HYPERLINK("http://x")']
+
+    # NDJSON — не таблица: значения как есть
+    titles = {r["title"] for r in _ndjson(await _export(session, principal_for(me)))}
+    assert titles == {"-1 chapter", '=HYPERLINK("http://x")'}
+
+
+async def test_export_scoping(session, user_factory, entry_factory, principal_for):
+    admin = await user_factory(session, "export-admin@example.com", role="admin")
+    u = await user_factory(session, "export-owner@example.com")
+    await entry_factory(session, owner_id=u.id, title="x")
+
+    with pytest.raises(HTTPException) as exc:
+        await _export(session, principal_for(u), owner_id=admin.id)
+    assert exc.value.status_code == 403
+
+    rows = _ndjson(await _export(session, principal_for(admin), owner_id=u.id))
+    assert [r["title"] for r in rows] == ["x"]
+
+
+async def test_export_route_is_not_shadowed_by_entry_id(
+    client: AsyncClient, session, user_factory
+):
+    u = await user_factory(session, "export-route@example.com")
+    token = create_access_token(subject=u.id, role=u.role, device="dev")
+
+    res = await client.get(
+        "/api/v1/entries/export",
+        params={"format": "csv"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert "entries.csv" in res.headers["content-disposition"]
+
+    res = await client.get(
+        "/api/v1/entries/export",
+        params={"format": "xml"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 422
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+from adapters.hashing import (
+    PasswordHasherBusy,
+    PasswordHasherPool,
+    hash_password_async,
+    hasher_pool,
+    verify_password_async,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_hash_and_verify_async_roundtrip():
+    hashed = await hash_password_async("secret123")
+    assert hashed != "secret123"
+    assert await verify_password_async("secret123", hashed) is True
+    assert await verify_password_async("wrong", hashed) is False
+
+    stats = hasher_pool.stats()
+    assert stats["completed"] >= 3
+    assert stats["in_flight"] == 0
+
+
+async def test_pool_rejects_when_queue_is_full():
+    pool = PasswordHasherPool(workers=1, queue_size=1)
+    gate = threading.Event()
+
+    try:
+        first = asyncio.ensure_future(pool.run(gate.wait))
+        second = asyncio.ensure_future(pool.run(gate.wait))
+        await asyncio.sleep(0)
+
+        assert pool.stats()["in_flight"] == 2
+        assert pool.queue_depth == 1
+        with pytest.raises(PasswordHasherBusy):
+            await pool.run(gate.wait)
+
+        gate.set()
+        await asyncio.gather(first, second)
+    finally:
+        gate.set()
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+
+
+async def test_cancelled_caller_keeps_slot_until_job_finishes():
+    pool = PasswordHasherPool(workers=1, queue_size=0)
+    gate = threading.Event()
+
+    try:
+        task = asyncio.ensure_future(pool.run(gate.wait))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # bcrypt в потоке всё ещё идёт — слот занят
+        assert pool.stats()["in_flight"] == 1
+        with pytest.raises(PasswordHasherBusy):
+            await pool.run(gate.wait)
+
+        gate.set()
+        for _ in range(100):
+            if pool.stats()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        gate.set()
+        pool.shutdown()
+
+    assert pool.stats()["in_flight"] == 0
@@ -0,0 +1,95 @@
+import io
+import json
+import logging
+
+import pytest
+from httpx import AsyncClient
+
+from adapters.logs import (
+    AsyncLogging,
+    KeyValueFormatter,
+    bind_request_state,
+    reset_request_state,
+)
+from app.middleware import RequestLoggingMiddleware
+from config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def _configured(fmt: str, name: str, queue_size: int = 100):
+    stream = io.StringIO()
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logs = AsyncLogging()
+    logs.configure(fmt=fmt, queue_size=queue_size, stream=stream, logger=logger)
+    return logs, logger, stream
+
+
+def test_json_lines_with_request_context():
+    logs, logger, stream = _configured("json", "test.logs.json")
+    token = bind_request_state({"correlation_id": "cid-1", "user": {"id": 7}})
+    try:
+        logger.info("request %s", "done", extra={"status": 200, "db_ms": 1.5})
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.exception("failed")
+    finally:
+        reset_request_state(token)
+    logs.shutdown()  # дописывает очередь
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["msg"] == "request done" and first["level"] == "INFO"
+    assert first["cid"] == "cid-1" and first["user_id"] == 7
+    assert first["status"] == 200 and first["db_ms"] == 1.5
+    assert "RuntimeError: boom" in second["exc"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    logs, logger, _ = _configured("text", "test.logs.full", queue_size=1)
+    logs.listener.stop()  # поток не разбирает очередь
+    for i in range(3):
+        logger.info("line %s", i)
+    assert logs.stats()["dropped"] == 2
+    logs.listener = None
+
+
+def test_key_value_formatter():
+    record = logging.LogRecord(
+        "app.request", logging.INFO, "", 0, "request", None, None
+    )
+    record.status = 204
+    assert KeyValueFormatter().format(record).endswith("app.request request status=204")
+
+
+async def test_successful_requests_are_sampled(
+    client: AsyncClient, monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATE", 0.0)
+    with caplog.at_level(logging.INFO, logger="app.request"):
+        res = await client.get("/health")
+    assert res.status_code == 200
+    assert not [r for r in caplog.records if r.name == "app.request"]
+
+
+async def test_errors_are_always_logged(client: AsyncClient, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATE", 0.0)
+    with caplog.at_level(logging.INFO):
+        res = await client.get("/api/v1/entries")
+    assert res.status_code == 401
+    record = [r for r in caplog.records if r.name == "app.request"][-1]
+    assert record.status == 401 and record.cid == res.headers["X-Correlation-ID"]
+
+
+async def test_unhandled_exception_is_logged_as_500(monkeypatch, caplog):
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATE", 0.0)
+    scope = {"type": "http", "method": "GET", "path": "/boom", "state": {}}
+    with caplog.at_level(logging.INFO, logger="app.request"):
+        with pytest.raises(RuntimeError):
+            await RequestLoggingMiddleware(failing_app)(scope, None, None)
+    record = [r for r in caplog.records if r.name == "app.request"][-1]
+    assert record.status == 500 and record.path == "/boom"
@@ -0,0 +1,91 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from adapters import db
+from adapters.hashing import hash_password_async
+from adapters.metrics import (
+    Histogram,
+    Registry,
+    db_pool_checkouts,
+    db_pool_connect,
+    db_pool_hold,
+    db_statement_duration,
+    http_request_duration,
+    password_hash_duration,
+    statement_operation,
+)
+from app.main import metrics_ep
+
+pytestmark = pytest.mark.anyio
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = Registry()
+    hist = registry.register(
+        Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    )
+    child = hist.labels('/a"b')
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP t_seconds Test.", "# TYPE t_seconds histogram"]
+    assert 't_seconds_bucket{route="/a\\"b",le="0.1"} 2' in lines
+    assert 't_seconds_bucket{route="/a\\"b",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 't_seconds_count{route="/a\\"b"} 4' in lines
+
+    with pytest.raises(ValueError):
+        hist.labels()
+
+
+def test_statement_operation():
+    assert statement_operation("  select 1") == "select"
+    assert statement_operation("INSERT INTO x VALUES (1)") == "insert"
+    assert statement_operation("PRAGMA foreign_keys") == "other"
+    assert statement_operation("") == "other"
+
+
+async def test_request_observed_by_route_template(client: AsyncClient):
+    child = http_request_duration.labels("GET", "/health", 200)
+    before = child.count
+
+    res = await client.get("/health")
+
+    assert res.status_code == 200
+    assert child.count == before + 1
+
+
+async def test_db_and_bcrypt_observed(session):
+    select_ = db_statement_duration.labels("select")
+    before = select_.count
+    await session.execute(text("SELECT 1"))
+    assert select_.count == before + 1
+
+    hashed = password_hash_duration.labels("hash_password")
+    before = hashed.count
+    await hash_password_async("secret123")
+    assert hashed.count == before + 1
+
+
+async def test_pool_events_observed():
+    # db.engine инструментирован в app.main; dispose — чтобы соединение открылось заново
+    await db.engine.dispose()
+    checkouts = db_pool_checkouts.labels().value
+    connects, holds = db_pool_connect.labels().count, db_pool_hold.labels().count
+
+    async with db.engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+    assert db_pool_checkouts.labels().value == checkouts + 1
+    assert db_pool_connect.labels().count == connects + 1
+    assert db_pool_hold.labels().count == holds + 1
+
+
+async def test_metrics_endpoint_renders_text_format():
+    res = await metrics_ep()
+    body = res.body.decode()
+    assert res.media_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert "db_pool_checkouts_total" in body
@@ -0,0 +1,76 @@
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from adapters.security import create_access_token
+from app.deps import Principal, get_principal
+from services.user_state import UserState, get_user_state, user_state_cache
+
+pytestmark = pytest.mark.anyio
+
+
+def _bare_request() -> Request:
+    """Request без state.user — роут вне префиксов AuthMiddleware."""
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+
+async def test_entries_hot_path_does_not_touch_users(
+    client: AsyncClient, session: AsyncSession, engine, user_factory, entry_factory
+):
+    user = await user_factory(session, "principal-hot@example.com")
+    await entry_factory(session, owner_id=user.id, title="hot")
+    await get_user_state(session, user.id)  # прогретый кэш
+    token = create_access_token(subject=user.id, role=user.role, device="d")
+
+    statements: list[str] = []
+
+    def _log(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _log)
+    try:
+        res = await client.get(
+            "/api/v1/entries", headers={"Authorization": f"Bearer {token}"}
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _log)
+
+    assert res.status_code == 200
+    assert [item["title"] for item in res.json()["items"]] == ["hot"]
+    assert statements and not any("users" in s for s in statements)
+
+
+async def test_orm_write_invalidates_cached_state(session: AsyncSession, user_factory):
+    user = await user_factory(session, "principal-orm@example.com")
+    assert await get_user_state(session, user.id) == UserState(0, True, "user")
+
+    user.is_active = False
+    await session.flush()
+    # flush ещё не commit: другие соединения видят старую строку
+    assert user_state_cache.get(user.id) == UserState(0, True, "user")
+    await session.commit()
+    assert user_state_cache.get(user.id) is None
+    assert (await get_user_state(session, user.id)).is_active is False
+
+
+async def test_get_principal_without_middleware(session: AsyncSession, user_factory):
+    user = await user_factory(session, "principal-direct@example.com", role="admin")
+    token = create_access_token(subject=user.id, role=user.role, device="d")
+
+    principal = await get_principal(_bare_request(), token=token, session=session)
+    assert principal == Principal(id=user.id, role="admin", claims=principal.claims)
+    assert principal.is_admin
+
+    stale = create_access_token(subject=user.id, role=user.role, device="d", version=0)
+    user.token_version = 1
+    await session.commit()
+    with pytest.raises(HTTPException) as exc:
+        await get_principal(_bare_request(), token=stale, session=session)
+    assert exc.value.status_code == 401
+
+    with pytest.raises(HTTPException) as exc:
+        await get_principal(_bare_request(), token="garbage", session=session)
+    assert exc.value.status_code == 401
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from adapters.profiling import (
+    RequestProfiles,
+    SamplingProfiler,
+    sign_profile_request,
+    verify_profile_header,
+)
+from app.deps import Principal
+from app.middleware import ProfilingMiddleware
+from app.routers.admin import profiler_start_ep, profiler_stop_ep, request_profile_ep
+
+pytestmark = pytest.mark.anyio
+
+_SECRET = "profile-secret"
+_ADMIN = Principal(id=1, role="admin", claims={})
+
+
+def test_signed_header_is_bound_to_request_and_time():
+    header = sign_profile_request(_SECRET, "get", "/api/v1/entries", ttl=60, now=1000)
+
+    assert verify_profile_header(_SECRET, header, "GET", "/api/v1/entries", now=1000)
+    assert not verify_profile_header(_SECRET, header, "GET", "/api/v1/admin", now=1000)
+    assert not verify_profile_header(
+        _SECRET, header, "GET", "/api/v1/entries", now=1061
+    )
+    assert not verify_profile_header(
+        "other", header, "GET", "/api/v1/entries", now=1000
+    )
+    assert not verify_profile_header(_SECRET, "garbage", "GET", "/", now=1000)
+    assert not verify_profile_header("", header, "GET", "/api/v1/entries", now=1000)
+
+
+def _busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def test_sampling_profiler_collects_collapsed_stacks():
+    profiler = SamplingProfiler(max_seconds=5)
+    profiler.start(interval_ms=1)
+    _busy_loop(0.05)
+    collapsed = await profiler.stop()
+
+    assert profiler.stats()["samples"] > 0 and not profiler.running
+    stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+    assert "_busy_loop" in stack and int(count) > 0
+
+
+async def _call(middleware, headers):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/x", "headers": headers}
+    await middleware(scope, receive, send)
+    return dict(sent[0]["headers"])
+
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def test_profiling_middleware_only_with_valid_signature():
+    profiles = RequestProfiles(max_items=2)
+    middleware = ProfilingMiddleware(_app, secret=_SECRET, profiles=profiles)
+    valid = sign_profile_request(_SECRET, "GET", "/x").encode()
+
+    assert b"x-profile-id" not in await _call(middleware, [])
+    assert b"x-profile-id" not in await _call(middleware, [(b"x-profile", b"1.bad")])
+
+    headers = await _call(middleware, [(b"x-profile", valid)])
+    profile_id = headers[b"x-profile-id"].decode()
+    assert profiles.ids() == [profile_id] and not profiles.busy
+    assert profiles.report(profile_id).startswith("# GET /x")
+
+
+async def test_admin_profiler_endpoints():
+    response = await profiler_start_ep(interval_ms=1, admin=_ADMIN)
+    try:
+        assert response["running"] is True
+        with pytest.raises(HTTPException) as exc:
+            await profiler_start_ep(interval_ms=1, admin=_ADMIN)
+        assert exc.value.status_code == 409
+        _busy_loop(0.02)
+    finally:
+        stopped = await profiler_stop_ep(admin=_ADMIN)
+    assert stopped.media_type == "text/plain" and stopped.body
+
+    with pytest.raises(HTTPException) as exc:
+        await request_profile_ep("missing", sort="cumulative", limit=10, admin=_ADMIN)
+    assert exc.value.status_code == 404
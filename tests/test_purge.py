@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from adapters.models import RefreshToken, RevokedToken
+from services.purge import TokenPurger, purge_expired
+
+pytestmark = pytest.mark.anyio
+
+
+def _at(minutes: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+
+async def _seed(session: AsyncSession, prefix: str, expired: int, live: int) -> None:
+    for i in range(expired):
+        session.add(
+            RevokedToken(
+                user_id=1,
+                jti=f"{prefix}-old-{i}",
+                token_type="access",
+                expires_at=_at(-10 - i),
+            )
+        )
+        session.add(
+            RefreshToken(
+                user_id=1,
+                jti=f"{prefix}-rt-old-{i}",
+                device_id="d",
+                expires_at=_at(-10 - i),
+            )
+        )
+    # живые строки — только в refresh_tokens: живые revoked_tokens попали бы
+    # в прогрев индекса отзывов в других тестах
+    for i in range(live):
+        session.add(
+            RefreshToken(
+                user_id=1, jti=f"{prefix}-live-{i}", device_id="d", expires_at=_at(10)
+            )
+        )
+    await session.commit()
+
+
+async def test_purge_expired_in_batches(session: AsyncSession):
+    await _seed(session, "pb", expired=5, live=2)
+
+    purged = await purge_expired(session, RefreshToken, _at(0), batch_size=2)
+
+    assert purged == 5
+    left = await session.execute(
+        select(RefreshToken.jti).where(RefreshToken.jti.like("pb-%"))
+    )
+    assert set(left.scalars().all()) == {"pb-live-0", "pb-live-1"}
+
+
+async def test_purger_run_once_reports_counts(session: AsyncSession):
+    await _seed(session, "pr", expired=3, live=1)
+    purger = TokenPurger(interval=60, batch_size=2, pause=0, grace_seconds=60)
+
+    purged = await purger.run_once(session)
+
+    assert purged["revoked_tokens"] >= 3
+    assert purged["refresh_tokens"] >= 3
+    stats = purger.stats()
+    assert stats["runs"] == 1 and stats["running"] is False
+    assert stats["purged"] == purged
+    assert stats["table_rows"]["refresh_tokens"] >= 1
+    assert stats["last_run_at"] is not None
+
+
+async def test_purge_respects_grace_period(session: AsyncSession):
+    session.add(
+        RevokedToken(
+            user_id=1, jti="grace-1", token_type="access", expires_at=_at(-0.5)
+        )
+    )
+    await session.commit()
+
+    purger = TokenPurger(interval=60, batch_size=10, pause=0, grace_seconds=120)
+    await purger.run_once(session)
+
+    row = await session.execute(
+        select(RevokedToken.id).where(RevokedToken.jti == "grace-1")
+    )
+    assert row.scalar_one_or_none() is not None
+
+
+async def test_purger_task_start_stop():
+    purger = TokenPurger(interval=3600, batch_size=10, pause=0, grace_seconds=0)
+    purger.start()
+    assert purger.running
+    await purger.stop()
+    assert not purger.running
@@ -0,0 +1,110 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from adapters.query_recorder import QueryRecorder, record_queries
+from adapters.security import create_access_token
+from app.etags import entry_etag
+from config import settings
+from domain.schemas import EntryCreate
+from services.entries import create_entry
+
+pytestmark = pytest.mark.anyio
+
+
+def _auth(user) -> dict[str, str]:
+    token = create_access_token(subject=user.id, role=user.role, device="d")
+    return {"Authorization": f"Bearer {token}"}
+
+
+# состояние пользователя и индекс отзывов в тестах холодные: каждый запрос
+# платит users SELECT и revoked_tokens SELECT в AuthMiddleware
+
+
+async def test_list_entries_budget(
+    client: AsyncClient, session, user_factory, assert_max_queries
+):
+    user = await user_factory(session, "budget-list@example.com")
+    await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+
+    # auth (2) + версия списка + страница
+    with assert_max_queries(4):
+        res = await client.get("/api/v1/entries", headers=_auth(user))
+    assert res.status_code == 200
+
+
+async def test_patch_entry_budget(
+    client: AsyncClient, session, user_factory, assert_max_queries
+):
+    user = await user_factory(session, "budget-patch@example.com")
+    item = await create_entry(session, user.id, EntryCreate(title="A", kind="book"))
+
+    # auth (2) + SELECT записи + UPDATE ... AND version=? + upsert версии списка
+    with assert_max_queries(5) as queries:
+        res = await client.patch(
+            f"/api/v1/entries/{item.id}", json={"title": "B"}, headers=_auth(user)
+        )
+    assert res.status_code == 200 and res.json()["title"] == "B"
+    assert sum(s.lstrip().upper().startswith("SELECT") for s in queries.statements) == 3
+
+
+async def test_create_entry_budget(
+    client: AsyncClient, session, user_factory, assert_max_queries
+):
+    user = await user_factory(session, "budget-create@example.com")
+
+    # auth (2) + INSERT + upsert версии списка, без повторного SELECT
+    with assert_max_queries(4):
+        res = await client.post(
+            "/api/v1/entries", json={"title": "A", "kind": "book"}, headers=_auth(user)
+        )
+    assert res.status_code == 201
+    assert res.headers["ETag"] == entry_etag(res.json()["id"], 1)
+
+
+def test_nested_recorder_and_repeats():
+    outer = QueryRecorder()
+    inner = QueryRecorder(capture=True, parent=outer)
+    for _ in range(3):
+        inner.add("SELECT 1", 0.001)
+    inner.add("UPDATE t", 0.002)
+
+    assert outer.count == 4 and inner.statements[-1] == "UPDATE t"
+    assert inner.repeated(3) == [("SELECT 1", 3)]
+    assert round(outer.duration, 3) == 0.005
+
+
+async def test_failed_statement_is_not_counted(session):
+    with record_queries(capture=True) as queries:
+        with pytest.raises(OperationalError):
+            await session.execute(text("SELECT * FROM no_such_table"))
+        await session.rollback()
+        await session.execute(text("SELECT 1"))
+
+    # savepoint'ы тестовой сессии учитываются, упавший SELECT — нет
+    assert queries.statements[-1] == "SELECT 1"
+    assert not [s for s in queries.statements if "no_such_table" in s]
+    conn = await session.connection()
+    assert not any(key.endswith("_started") for key in conn.info)
+
+
+async def test_request_log_has_query_fields(client: AsyncClient, caplog):
+    with caplog.at_level(logging.INFO, logger="app.request"):
+        res = await client.get("/health")
+    assert res.status_code == 200
+    records = [r for r in caplog.records if r.name == "app.request"]
+    assert records and records[-1].queries == 0 and records[-1].db_ms == 0
+
+
+async def test_debug_headers(client: AsyncClient, session, user_factory, monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG", True)
+    user = await user_factory(session, "budget-debug@example.com")
+
+    res = await client.get("/api/v1/auth/me", headers=_auth(user))
+
+    assert res.status_code == 200
+    assert int(res.headers["X-DB-Queries"]) >= 1
+    assert float(res.headers["X-DB-Time-ms"]) >= 0
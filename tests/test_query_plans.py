@@ -0,0 +1,140 @@
+"""
+Регрессия планов запросов: горячие запросы services.entries / services.tokens
+должны идти по индексу. Реальные SQL и параметры снимаются событием
+before_cursor_execute и прогоняются через EXPLAIN QUERY PLAN (SQLite).
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.schemas import EntryStatus
+from services import entries, purge, tokens
+from services.revocation import revocation_index
+
+pytestmark = pytest.mark.anyio
+
+_TABLES = ("entries", "users", "refresh_tokens", "revoked_tokens")
+_FULL_SCAN = re.compile(rf"^SCAN ({'|'.join(_TABLES)})$")
+
+
+@pytest.fixture
+def captured(engine):
+    seen: list[tuple[str, tuple]] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            seen.append((statement, tuple(parameters or ())))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before)
+    yield seen
+    event.remove(engine.sync_engine, "before_cursor_execute", _before)
+
+
+@pytest.fixture
+def cold_revocation_index():
+    # индекс не прогрет — is_jti_blacklisted идёт в БД, её план и проверяем
+    revocation_index.reset()
+    yield
+    revocation_index.reset()
+
+
+async def _plans(session: AsyncSession, captured) -> list[list[str]]:
+    conn = await session.connection()
+    plans = []
+    for statement, params in captured:
+        res = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params)
+        plans.append([row[-1] for row in res.all()])
+    return plans
+
+
+async def _assert_indexed(session, captured, *, sorted_by_index: bool = False):
+    assert captured, "сервис не выполнил ни одного запроса"
+    for (statement, _), plan in zip(captured, await _plans(session, captured)):
+        full_scans = [step for step in plan if _FULL_SCAN.match(step)]
+        assert not full_scans, f"full scan in {plan} for:\n{statement}"
+        if sorted_by_index:
+            assert not any("TEMP B-TREE" in step for step in plan), plan
+    captured.clear()
+
+
+def _ts(minutes: int) -> int:
+    return int((datetime.now(timezone.utc) + timedelta(minutes=minutes)).timestamp())
+
+
+async def test_entry_list_queries_use_indexes(session, captured):
+    await entries.list_entries_user(session, 1, None, 50, 0)
+    await _assert_indexed(session, captured, sorted_by_index=True)
+
+    await entries.list_entries_user(session, 1, EntryStatus.planned, 50, 0)
+    await _assert_indexed(session, captured, sorted_by_index=True)
+
+    await entries.list_entries_user(
+        session, 1, EntryStatus.planned, 50, 0, after_id=100
+    )
+    await _assert_indexed(session, captured, sorted_by_index=True)
+
+    await entries.list_entries_admin(session, EntryStatus.finished, 50, 0)
+    await _assert_indexed(session, captured, sorted_by_index=True)
+
+    await entries.list_entries_admin(session, EntryStatus.finished, 50, 0, owner_id=1)
+    await _assert_indexed(session, captured, sorted_by_index=True)
+
+
+async def test_entry_lookup_queries_use_indexes(session, captured):
+    await entries.get_entry_for_owner(session, 1, 1)
+    await _assert_indexed(session, captured)
+
+    await entries.get_entry_any(session, 1)
+    await _assert_indexed(session, captured)
+
+    # проверки ETag: версия записи и версия списка владельца
+    await entries.get_entry_version(session, 1, 1)
+    await _assert_indexed(session, captured)
+
+    await entries.get_list_version(session, 1)
+    await _assert_indexed(session, captured)
+
+
+async def test_token_queries_use_indexes(session, captured, cold_revocation_index):
+    await tokens.is_jti_blacklisted(session, "missing")
+    await _assert_indexed(session, captured)
+
+    await tokens.is_refresh_revoked(session, "missing")
+    await _assert_indexed(session, captured)
+
+    await tokens.revoke_refresh_by_jti(session, "missing")
+    await _assert_indexed(session, captured)
+
+    await tokens.revoke_refresh_for_device(session, user_id=1, device_id="dev")
+    await _assert_indexed(session, captured)
+
+    with pytest.raises(ValueError):
+        await tokens.rotate_refresh(
+            session,
+            jti="missing",
+            user_id=1,
+            version=0,
+            new_jti="new",
+            new_exp_ts=_ts(30),
+            device_id="dev",
+            user_agent=None,
+        )
+    await _assert_indexed(session, captured)
+
+
+async def test_purge_queries_use_indexes(session, captured):
+    for model in purge.PURGED_MODELS:
+        await purge.purge_expired(session, model, datetime.now(timezone.utc), 10)
+        await _assert_indexed(session, captured, sorted_by_index=True)
+
+
+async def test_plan_check_detects_full_scan(session, captured):
+    """Sanity: сам харнесс ловит запрос без подходящего индекса."""
+    conn = await session.connection()
+    await conn.exec_driver_sql("SELECT id FROM entries WHERE title = ?", ("x",))
+    with pytest.raises(AssertionError):
+        await _assert_indexed(session, captured)
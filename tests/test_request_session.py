@@ -0,0 +1,63 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from adapters import db
+from adapters.security import create_access_token
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def opened_sessions(engine, monkeypatch):
+    """Считаем сессии, которые приложение открывает через фабрику."""
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    opened: list[AsyncSession] = []
+
+    def _factory() -> AsyncSession:
+        s = maker()
+        opened.append(s)
+        return s
+
+    monkeypatch.setattr(db, "async_session_factory", _factory)
+    return opened
+
+
+@pytest.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def test_protected_request_uses_single_session(
+    client, opened_sessions, session, user_factory
+):
+    user = await user_factory(session, "single-session@example.com")
+    access = create_access_token(subject=user.id, role=user.role, device="dev")
+
+    res = await client.get(
+        "/api/v1/entries", headers={"Authorization": f"Bearer {access}"}
+    )
+    assert res.status_code == 200
+
+    # AuthMiddleware и хендлер работали в одной и той же сессии
+    assert len(opened_sessions) == 1
+
+
+async def test_public_request_opens_no_session(client, opened_sessions):
+    res = await client.get("/health")
+    assert res.status_code == 200
+    assert opened_sessions == []
+
+
+async def test_request_session_closes_once():
+    uow = db.RequestSession()
+    assert uow.opened is False
+    await uow.close()  # ничего не открыто — no-op
+
+    s = uow.session
+    assert uow.session is s
+    await uow.close()
+    assert uow.opened is False
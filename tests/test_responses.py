@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from adapters.models import Entry
+from adapters.security import create_access_token
+from app.errors import problem
+from app.main import app
+from app.responses import FastJSONResponse, dumps, model_response
+from domain.schemas import EntryInDB, EntryPage
+
+pytestmark = pytest.mark.anyio
+
+
+def _entry(entry_id: int) -> Entry:
+    return Entry(
+        id=entry_id,
+        title=f"Заметка {entry_id}",
+        kind="book",
+        status="planned",
+        link="https://example.com/",
+        owner_id=7,
+    )
+
+
+def test_model_response_renders_pydantic_bytes():
+    page = EntryPage(
+        items=[_entry(2), _entry(1)], limit=2, offset=0, count=2, next_cursor="abc"
+    )
+    response = model_response(page, status_code=201)
+
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    body = json.loads(response.body)
+    assert body["next_cursor"] == "abc"
+    assert body["items"][0] == {
+        "title": "Заметка 2",
+        "kind": "book",
+        "link": "https://example.com/",
+        "status": "planned",
+        "id": 2,
+        "owner_id": 7,
+    }
+    assert "Заметка".encode() in response.body  # UTF-8 без \\u-экранирования
+
+
+def test_dumps_handles_nested_models_and_rejects_unknown():
+    nested = {"entry": EntryInDB.model_validate(_entry(1))}
+    assert json.loads(dumps(nested))["entry"]["id"] == 1
+    assert FastJSONResponse({"a": [1, 2]}).body == b'{"a":[1,2]}'
+    with pytest.raises(TypeError):
+        dumps({"x": object()})
+
+
+def test_problem_renders_unserializable_extras_as_strings():
+    response = problem(
+        422,
+        "Unprocessable Entity",
+        "Validation failed",
+        extras={"errors": [{"ctx": {"error": ValueError("bad value")}}]},
+        cid="cid-1",
+    )
+    body = json.loads(response.body)
+    assert response.media_type == "application/problem+json"
+    assert body["errors"][0]["ctx"]["error"] == "bad value"
+    assert body["correlation_id"] == "cid-1"
+
+
+def test_openapi_documents_entry_page():
+    schema = app.openapi()
+    ok = schema["paths"]["/api/v1/entries"]["get"]["responses"]["200"]
+    assert ok["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/EntryPage"
+    }
+
+
+async def test_create_entry_returns_typed_body(
+    client: AsyncClient, session, user_factory
+):
+    user = await user_factory(session, "responses-create@example.com")
+    token = create_access_token(subject=user.id, role=user.role, device="d")
+
+    res = await client.post(
+        "/api/v1/entries",
+        json={"title": "Typed", "kind": "article", "link": "https://example.com"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 201
+    body = res.json()
+    assert body["owner_id"] == user.id
+    assert body["link"] == "https://example.com/"
+    assert set(body) == {"id", "title", "kind", "link", "status", "owner_id"}
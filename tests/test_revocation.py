@@ -0,0 +1,99 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.revocation import BloomFilter, RevocationIndex, revocation_index
+from services.tokens import blacklist, is_jti_blacklisted
+
+pytestmark = pytest.mark.anyio
+
+
+def _ts(minutes: int) -> int:
+    return int((datetime.now(timezone.utc) + timedelta(minutes=minutes)).timestamp())
+
+
+@pytest.fixture
+def warm_index():
+    revocation_index.reset()
+    yield revocation_index
+    revocation_index.reset()
+
+
+@pytest.fixture
+def statements(engine):
+    seen: list[str] = []
+
+    def _before(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before)
+    yield seen
+    event.remove(engine.sync_engine, "before_cursor_execute", _before)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for k in keys:
+        bloom.add(k)
+    assert all(k in bloom for k in keys)
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_index_evicts_by_token_expiry():
+    index = RevocationIndex(capacity=100, error_rate=0.01, sync_interval=0)
+    now = time.time()
+    index.add("short", now + 10)
+    index.add("long", now + 1000)
+
+    assert index.lookup("short") is True
+    assert index.lookup("unknown") in (False, None)
+
+    assert index.evict_expired(now + 100) == 1
+    assert len(index) == 1
+    # запись вытеснена: ответ либо из Bloom, либо «спроси БД»
+    assert index.lookup("short") is None
+    assert index.lookup("long") is True
+
+
+async def test_warm_index_answers_without_db(
+    session: AsyncSession, warm_index, statements
+):
+    await blacklist(
+        session, token_type="access", jti="pre-revoked", user_id=1, exp_ts=_ts(5)
+    )
+    warm_index.reset()
+    await warm_index.load(session)
+    assert warm_index.stats()["size"] == 1
+    warm_index.sync_interval = 0
+
+    statements.clear()
+    assert await is_jti_blacklisted(session, "pre-revoked") is True
+    assert await is_jti_blacklisted(session, "never-revoked") is False
+    assert statements == []
+
+    # blacklist() пополняет индекс инкрементально
+    await blacklist(
+        session, token_type="access", jti="revoked-now", user_id=1, exp_ts=_ts(5)
+    )
+    statements.clear()
+    assert await is_jti_blacklisted(session, "revoked-now") is True
+    assert statements == []
+
+    stats = warm_index.stats()
+    assert stats["hits"] >= 3
+    assert stats["misses"] == 0
+
+
+async def test_cold_index_falls_back_to_db(session: AsyncSession, warm_index):
+    await blacklist(session, token_type="access", jti="cold", user_id=1, exp_ts=_ts(5))
+    warm_index.reset()
+
+    assert warm_index.warm is False
+    assert await is_jti_blacklisted(session, "cold") is True
+    assert await is_jti_blacklisted(session, "cold-missing") is False
@@ -118,3 +118,24 @@ async def test_sql_injection_in_admin_search_filter_does_not_break_query(
         # Should not return all users or crash; parameterized query handles it safely
         # If it found nothing matching the literal string, that's fine
         assert len(body) <= 2  # we only created 2 users
+
+
+def test_static_problem_matches_problem_response_body():
+    from app.errors import StaticProblem, problem
+
+    static = StaticProblem(401, "Unauthorized", "Token revoked", type_="urn:errors:x")
+    for cid in ("abc123", 'we"ird\\cid', None):
+        expected = problem(
+            401, "Unauthorized", "Token revoked", "urn:errors:x", cid=cid
+        )
+        assert static.render(cid) == expected.body
+
+
+async def test_correlation_id_is_propagated_from_request(client: AsyncClient):
+    res = await client.get("/api/v1/entries", headers={"X-Correlation-ID": "cid-42"})
+    assert res.status_code == 401
+    assert res.headers.get_list("X-Correlation-ID") == ["cid-42"]
+    assert res.json()["correlation_id"] == "cid-42"
+
+    ok = await client.get("/health", headers={"X-Correlation-ID": "cid-43"})
+    assert ok.headers["X-Correlation-ID"] == "cid-43"
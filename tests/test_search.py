@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from adapters.models import User
+from services import auth as auth_service
+from services.admin import list_users
+from services.search import email_search_clause
+
+pytestmark = pytest.mark.anyio
+
+
+async def _add(session: AsyncSession, *emails: str) -> list[User]:
+    users = [User(email=e, hashed_password="x") for e in emails]
+    session.add_all(users)
+    await session.flush()
+    return users
+
+
+async def _search(session: AsyncSession, q: str) -> set[str]:
+    return {u.email for u in await list_users(session, limit=100, offset=0, q=q)}
+
+
+async def test_trigram_search_is_case_insensitive_substring(session: AsyncSession):
+    await _add(session, "Search.Alpha@example.com", "search.beta@example.com")
+
+    assert await _search(session, "ALPHA") == {"Search.Alpha@example.com"}
+    assert await _search(session, "search.") == {
+        "Search.Alpha@example.com",
+        "search.beta@example.com",
+    }
+
+
+async def test_short_query_falls_back_to_like(session: AsyncSession):
+    await _add(session, "qz1@search.test", "qz2@search.test")
+    assert await _search(session, "qz") == {"qz1@search.test", "qz2@search.test"}
+
+
+async def test_special_characters_are_literal(session: AsyncSession):
+    await _add(session, 'we"ird_1@search.test', "weirdx1@search.test")
+
+    assert await _search(session, 'we"ird') == {'we"ird_1@search.test'}
+    assert await _search(session, "ird_1") == {'we"ird_1@search.test'}
+    assert await _search(session, "d_") == {'we"ird_1@search.test'}
+    # операторы FTS5 в q — просто текст, а не синтаксис запроса
+    assert await _search(session, "ird OR x*") == set()
+
+
+async def test_fts_index_follows_updates_and_deletes(session: AsyncSession):
+    old, gone = await _add(session, "rename.me@search.test", "delete.me@search.test")
+
+    await session.execute(
+        update(User).where(User.id == old.id).values(email="renamed@search.test")
+    )
+    await session.delete(gone)
+    await session.flush()
+
+    assert await _search(session, "rename.me") == set()
+    assert await _search(session, "renamed") == {"renamed@search.test"}
+    assert await _search(session, "delete.me") == set()
+
+
+async def test_auth_list_users_uses_same_backend(session: AsyncSession):
+    await _add(session, "shared.backend@search.test")
+    res = await auth_service.list_users(session, limit=10, offset=0, q="BACKEND")
+    assert [u.email for u in res] == ["shared.backend@search.test"]
+
+
+async def test_sqlite_search_hits_fts_index(session: AsyncSession):
+    stmt = select(User.id).where(email_search_clause("example", "sqlite"))
+    compiled = stmt.compile(dialect=session.get_bind().dialect)
+    conn = await session.connection()
+    res = await conn.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {compiled}", tuple(compiled.params.values())
+    )
+    plan = [row[-1] for row in res.all()]
+    assert any("users_email_fts VIRTUAL TABLE INDEX" in step for step in plan), plan
+    assert "SCAN users" not in plan
+
+
+def test_postgres_search_is_trigram_indexable_ilike():
+    clause = email_search_clause("50%_off", "postgresql")
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+    assert "ILIKE" in sql
+    assert clause.right.value == "%50\\%\\_off%"
@@ -1,3 +1,6 @@
+import jwt
+import pytest
+
 from adapters import security
 
 
@@ -13,3 +16,32 @@ def test_refresh_token_payload():
     payload = security.create_refresh_payload(subject=1, device="dev")
     assert payload["type"] == "refresh"
     assert "jti" in payload
+
+
+def test_decode_token_cached_hits_after_first_decode():
+    security.claims_cache.clear()
+    token = security.create_access_token(subject=7, role="user", device="dev")
+
+    first = security.decode_token_cached(token)
+    second = security.decode_token_cached(token)
+    assert first == second == security.decode_token(token)
+
+    stats = security.claims_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+    # вызывающий код получает копию
+    second["role"] = "admin"
+    assert security.decode_token_cached(token)["role"] == "user"
+
+
+def test_decode_token_cached_rejects_invalid_and_expired():
+    security.claims_cache.clear()
+    with pytest.raises(jwt.InvalidTokenError):
+        security.decode_token_cached("not-a-jwt")
+    assert security.claims_cache.stats()["size"] == 0
+
+    payload = security.create_refresh_payload(subject=1, device="dev")
+    payload["exp"] = payload["iat"] - 1
+    security.claims_cache.put(b"stale", payload)
+    assert security.claims_cache.get(b"stale") is None
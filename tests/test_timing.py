@@ -0,0 +1,58 @@
+import logging
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from adapters.security import claims_cache, create_access_token
+from adapters.timing import Timings, record_timings, span
+from config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def test_spans_accumulate_only_inside_recorder():
+    with span("outside"):
+        pass
+
+    with record_timings() as timings:
+        for _ in range(2):
+            with span("db"):
+                time.sleep(0.001)
+
+    assert list(timings.spans) == ["db"] and timings.spans["db"] >= 0.002
+    header = timings.header(total=0.0125)
+    assert header.startswith("db;dur=") and header.endswith("total;dur=12.50")
+
+
+def test_log_fields():
+    timings = Timings()
+    assert timings.log_fields() == {}
+    timings.add("jwt", 0.0005)
+    assert timings.log_fields() == {"jwt_ms": 0.5}
+
+
+async def test_server_timing_header(
+    client: AsyncClient, session, user_factory, monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+    user = await user_factory(session, "timing@example.com")
+    token = create_access_token(subject=user.id, role=user.role, device="d")
+    claims_cache.clear()
+
+    with caplog.at_level(logging.INFO, logger="app.request"):
+        res = await client.get(
+            "/api/v1/entries", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    assert res.status_code == 200
+    phases = {item.split(";")[0] for item in res.headers["Server-Timing"].split(", ")}
+    assert {"jwt", "user_state", "revocation", "serialize", "db", "total"} <= phases
+
+    record = [r for r in caplog.records if r.name == "app.request"][-1]
+    assert record.jwt_ms >= 0 and record.revocation_ms >= 0
+
+
+async def test_server_timing_off_by_default(client: AsyncClient):
+    res = await client.get("/health")
+    assert "Server-Timing" not in res.headers
@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from adapters import db
+from adapters.models import RefreshToken
+from services.token_writer import TokenWriter
+from services.tokens import (
+    blacklist,
+    create_refresh_record,
+    is_jti_blacklisted,
+    revoke_refresh_for_device,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def _ts(minutes: int) -> int:
+    return int((datetime.now(timezone.utc) + timedelta(minutes=minutes)).timestamp())
+
+
+@pytest.fixture
+async def writer(session: AsyncSession, monkeypatch):
+    """Writer, пишущий в соединение тестовой транзакции (commit -> savepoint)."""
+    maker = async_sessionmaker(
+        bind=session.bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+    monkeypatch.setattr(db, "async_session_factory", maker)
+
+    w = TokenWriter(max_batch=64, max_delay_ms=20)
+    monkeypatch.setattr("services.tokens.token_writer", w)
+    w.start()
+    yield w
+    await w.stop()
+
+
+def _record(session, jti: str, device: str = "gc-dev"):
+    return create_refresh_record(
+        session,
+        user_id=1,
+        jti=jti,
+        exp_ts=_ts(30),
+        device_id=device,
+        user_agent="pytest",
+    )
+
+
+async def _refresh_rows(session: AsyncSession, prefix: str) -> dict[str, bool]:
+    res = await session.execute(
+        select(RefreshToken.jti, RefreshToken.revoked).where(
+            RefreshToken.jti.like(f"{prefix}%")
+        )
+    )
+    return dict(res.all())
+
+
+async def test_concurrent_inserts_share_one_commit(session, writer):
+    await asyncio.gather(*(_record(session, f"gc-a-{i}") for i in range(20)))
+
+    stats = writer.stats()
+    assert stats["items"] == 20
+    assert stats["batches"] == 1  # все 20 пришли в одно окно max_delay
+    assert len(await _refresh_rows(session, "gc-a-")) == 20
+
+
+async def test_fifo_order_revocation_after_insert(session, writer):
+    # выдача refresh и отзыв девайса в одной пачке: отзыв применяется вторым
+    await asyncio.gather(
+        _record(session, "gc-b-1", device="gc-dev-b"),
+        revoke_refresh_for_device(session, user_id=1, device_id="gc-dev-b"),
+        _record(session, "gc-b-2", device="gc-dev-b"),
+    )
+
+    assert await _refresh_rows(session, "gc-b-") == {"gc-b-1": True, "gc-b-2": False}
+    assert writer.stats()["batches"] == 1
+
+
+async def test_blacklist_goes_through_writer(session, writer):
+    await blacklist(
+        session, token_type="access", jti="gc-acc", user_id=1, exp_ts=_ts(5)
+    )
+    assert writer.stats()["items"] == 1
+    assert await is_jti_blacklisted(session, "gc-acc") is True
+
+
+async def test_failing_item_does_not_fail_batch(session, writer):
+    results = await asyncio.gather(
+        _record(session, "gc-c-1"),
+        _record(session, "gc-c-dup"),
+        _record(session, "gc-c-dup"),
+        _record(session, "gc-c-2"),
+        return_exceptions=True,
+    )
+
+    # ошибка достаётся только второму дублю, остальные записи закоммичены
+    assert results[:2] == [None, None] and results[3] is None
+    assert isinstance(results[2], IntegrityError)
+    assert writer.stats()["failed_batches"] >= 1
+    assert set(await _refresh_rows(session, "gc-c-")) == {
+        "gc-c-1",
+        "gc-c-dup",
+        "gc-c-2",
+    }
+
+
+async def test_stop_drains_queue(session, writer):
+    pending = asyncio.ensure_future(_record(session, "gc-d-1"))
+    await asyncio.sleep(0)  # поставлено в очередь, окно ещё не закрыто
+    await writer.stop()
+
+    await pending
+    assert not writer.running
+    assert await _refresh_rows(session, "gc-d-") == {"gc-d-1": False}
+
+
+async def test_crashed_loop_fails_waiters_and_falls_back(session, writer, monkeypatch):
+    async def broken_flush(batch):
+        raise RuntimeError("writer bug")
+
+    monkeypatch.setattr(writer, "_flush", broken_flush)
+    results = await asyncio.gather(
+        _record(session, "gc-f-1"), _record(session, "gc-f-2"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not writer.running and writer.stats()["queued"] == 0
+    await _record(session, "gc-f-3")  # уже напрямую, мимо упавшей задачи
+    assert await _refresh_rows(session, "gc-f-") == {"gc-f-3": False}
+
+
+async def test_direct_write_when_writer_not_running(session):
+    await _record(session, "gc-e-1")
+    assert await _refresh_rows(session, "gc-e-") == {"gc-e-1": False}
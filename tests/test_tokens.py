@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta, timezone
 
 import pytest
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from services.tokens import (
@@ -10,6 +11,7 @@ from services.tokens import (
     is_refresh_revoked,
     revoke_refresh_by_jti,
     revoke_refresh_for_device,
+    rotate_refresh,
 )
 
 pytestmark = pytest.mark.anyio
@@ -68,3 +70,80 @@ async def test_blacklist_access_and_check(session: AsyncSession):
         exp_ts=_ts(5),
     )
     assert await is_jti_blacklisted(session, jti) is True
+
+
+async def _rotate(
+    session: AsyncSession, user_id: int, jti: str, new_jti: str, version: int = 0
+):
+    return await rotate_refresh(
+        session,
+        jti=jti,
+        user_id=user_id,
+        version=version,
+        new_jti=new_jti,
+        new_exp_ts=_ts(30),
+        device_id="devR",
+        user_agent="UA",
+    )
+
+
+async def test_rotate_refresh_is_single_cas(
+    session: AsyncSession, engine, user_factory
+):
+    user = await user_factory(session, "rotate@example.com", role="admin")
+    await create_refresh_record(
+        session,
+        user_id=user.id,
+        jti="rot-1",
+        exp_ts=_ts(30),
+        device_id="devR",
+        user_agent="UA",
+    )
+    statements: list[str] = []
+
+    def _log(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _log)
+    try:
+        state = await _rotate(session, user.id, "rot-1", "rot-2")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _log)
+
+    assert (state.role, state.version, state.is_active) == ("admin", 0, True)
+    # одно UPDATE ... FROM users RETURNING и одна вставка — без SELECT
+    assert [s for s in statements if s in ("SELECT", "UPDATE", "INSERT")] == [
+        "UPDATE",
+        "INSERT",
+    ]
+    assert await is_refresh_revoked(session, "rot-1") is True
+    assert await is_refresh_revoked(session, "rot-2") is False
+
+    # повторное использование старого токена
+    with pytest.raises(ValueError, match="REFRESH_REVOKED"):
+        await _rotate(session, user.id, "rot-1", "rot-3")
+    assert await is_refresh_revoked(session, "rot-3") is True  # записи нет
+
+
+async def test_rotate_refresh_rejects_foreign_and_inactive(
+    session: AsyncSession, user_factory
+):
+    owner = await user_factory(session, "rotate-owner@example.com", is_active=False)
+    other = await user_factory(session, "rotate-other@example.com")
+    await create_refresh_record(
+        session,
+        user_id=owner.id,
+        jti="rot-x",
+        exp_ts=_ts(30),
+        device_id="devR",
+        user_agent="UA",
+    )
+
+    with pytest.raises(ValueError, match="REFRESH_REVOKED"):
+        await _rotate(session, other.id, "rot-x", "rot-y")
+    assert await is_refresh_revoked(session, "rot-x") is False
+
+    with pytest.raises(ValueError, match="USER_INACTIVE"):
+        await _rotate(session, owner.id, "rot-x", "rot-y")
+    assert await is_refresh_revoked(session, "rot-x") is True
+    assert await is_refresh_revoked(session, "rot-y") is True
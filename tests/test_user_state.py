@@ -0,0 +1,198 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from adapters.security import create_access_token, create_refresh_payload
+from app.deps import require_admin
+from app.main import app
+from app.routers.admin import update_user_ep
+from app.routers.auth import logout_all
+from domain.schemas import AdminUserUpdate
+from services.tokens import create_refresh_record, rotate_refresh
+from services.user_state import (
+    UserState,
+    UserStateCache,
+    bump_token_version,
+    get_user_state,
+    token_is_current,
+    user_state_cache,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+def test_cache_ttl_invalidate_and_bound(monkeypatch):
+    cache = UserStateCache(maxsize=2, ttl=10)
+    state = UserState(1, True, "user")
+    cache.put(1, state)
+    assert cache.get(1) == state
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    cache.put(1, state)
+    cache.put(2, state)
+    cache.put(3, state)
+    assert cache.get(1) is None and cache.get(3) == state  # старейшая вытеснена
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get(3) is None
+
+
+def test_token_is_current():
+    state = UserState(version=2, is_active=True, role="user")
+    assert token_is_current({"ver": 2}, state)
+    assert not token_is_current({"ver": 1}, state)
+    assert not token_is_current({}, state)  # старые токены без ver — версия 0
+    assert token_is_current({}, UserState(0, True, "user"))
+    assert not token_is_current({"ver": 2}, UserState(2, False, "user"))
+    assert not token_is_current({"ver": 0}, None)
+
+
+async def test_user_state_cached_and_bump_invalidates(
+    session: AsyncSession, engine, user_factory
+):
+    user = await user_factory(session, "state-cache@example.com")
+    statements: list[str] = []
+
+    def _log(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _log)
+    try:
+        first = await get_user_state(session, user.id)
+        again = await get_user_state(session, user.id)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _log)
+
+    assert first == again == UserState(0, True, "user")
+    assert len(statements) == 1
+
+    bumped = await bump_token_version(session, user.id, is_active=False, role="admin")
+    assert bumped == UserState(1, False, "admin")
+    assert user_state_cache.get(user.id) is None
+    assert await get_user_state(session, user.id) == bumped
+
+    with pytest.raises(ValueError, match="USER_NOT_FOUND"):
+        await bump_token_version(session, 987654)
+
+
+async def test_stale_access_token_rejected(
+    client: AsyncClient, session: AsyncSession, user_factory
+):
+    user = await user_factory(session, "state-stale@example.com")
+    old = create_access_token(subject=user.id, role=user.role, device="d", version=0)
+    await bump_token_version(session, user.id)
+
+    res = await client.get(
+        "/api/v1/auth/me", headers={"Authorization": f"Bearer {old}"}
+    )
+    assert res.status_code == 401
+    assert res.json()["detail"] == "Token revoked"
+
+
+async def test_current_access_token_accepted(
+    client: AsyncClient, session: AsyncSession, user_factory
+):
+    user = await user_factory(session, "state-current@example.com")
+    await bump_token_version(session, user.id)
+    token = create_access_token(subject=user.id, role=user.role, device="d", version=1)
+
+    res = await client.get(
+        "/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert res.status_code == 200
+
+
+async def test_inactive_user_token_rejected(
+    client: AsyncClient, session: AsyncSession, user_factory
+):
+    user = await user_factory(session, "state-inactive@example.com", is_active=False)
+    token = create_access_token(subject=user.id, role=user.role, device="d")
+
+    res = await client.get(
+        "/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert res.status_code == 401
+    assert res.json()["detail"] == "User not found or inactive"
+
+
+async def test_logout_all_and_admin_update_bump_version(
+    session: AsyncSession, user_factory, principal_for
+):
+    admin = await user_factory(session, "state-admin@example.com", role="admin")
+    user = await user_factory(session, "state-target@example.com")
+
+    await logout_all(principal=principal_for(user), session=session)
+    assert (await get_user_state(session, user.id)).version == 1
+
+    body = await update_user_ep(
+        user.id,
+        AdminUserUpdate(role="admin"),
+        session=session,
+        admin=principal_for(admin),
+    )
+    assert body == {
+        "id": user.id,
+        "role": "admin",
+        "is_active": True,
+        "token_version": 2,
+    }
+
+    with pytest.raises(HTTPException) as exc:
+        require_admin(principal_for(user))
+    assert exc.value.status_code == 403
+
+
+async def test_admin_empty_patch_keeps_tokens(
+    session: AsyncSession, user_factory, principal_for
+):
+    admin = await user_factory(session, "state-empty-admin@example.com", role="admin")
+    user = await user_factory(session, "state-empty@example.com")
+
+    with pytest.raises(HTTPException) as exc:
+        await update_user_ep(
+            user.id, AdminUserUpdate(), session=session, admin=principal_for(admin)
+        )
+    assert exc.value.status_code == 400
+    assert (await get_user_state(session, user.id)).version == 0
+
+
+async def test_refresh_with_stale_version_is_revoked(
+    session: AsyncSession, user_factory
+):
+    user = await user_factory(session, "state-refresh@example.com")
+    rc = create_refresh_payload(subject=user.id, device="d", version=0)
+    await create_refresh_record(
+        session,
+        user_id=user.id,
+        jti=rc["jti"],
+        exp_ts=rc["exp"],
+        device_id="d",
+        user_agent=None,
+    )
+    await bump_token_version(session, user.id)
+
+    with pytest.raises(ValueError, match="REFRESH_REVOKED"):
+        await rotate_refresh(
+            session,
+            jti=rc["jti"],
+            user_id=user.id,
+            version=rc["ver"],
+            new_jti="state-new",
+            new_exp_ts=rc["exp"],
+            device_id="d",
+            user_agent=None,
+        )